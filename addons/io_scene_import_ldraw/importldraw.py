@@ -96,6 +96,9 @@ useLook                       = normal
 useLSynthParts                = True
 useUnofficialParts            = True
 useArchiveLibrary             = False
+useParseCache                 = False
+useParsePool                  = False
+incrementalImport             = False
 verbose                       = 0
 """
 
@@ -371,6 +374,24 @@ class ImportLDrawOps(bpy.types.Operator, ImportHelper):
         default=False
     )
 
+    useParseCache: BoolProperty(
+        name="Use Parse Cache",
+        description="Keep parsed library parts in an on-disk cache so later imports can skip parsing them",
+        default=False
+    )
+
+    useParsePool: BoolProperty(
+        name="Use Parse Processes",
+        description="Read and tokenize the referenced parts in worker processes before they are parsed",
+        default=False
+    )
+
+    incrementalImport: BoolProperty(
+        name="Incremental Import",
+        description="When the same model is imported again, only parse and build the MPD submodels that changed",
+        default=False
+    )
+
     searchAdditionalPaths: BoolProperty(
         name="Search Additional Paths",
         description="Search additional LDraw paths (automatically set for fade previous steps and highlight step)",
@@ -458,6 +479,9 @@ class ImportLDrawOps(bpy.types.Operator, ImportHelper):
         box.label(text="Extras")
         box.prop(self, "useUnofficialParts")
         box.prop(self, "useArchiveLibrary")
+        box.prop(self, "useParseCache")
+        box.prop(self, "useParsePool")
+        box.prop(self, "incrementalImport")
         box.prop(self, "verbose")
 
     def execute(self, context):
@@ -511,6 +535,9 @@ class ImportLDrawOps(bpy.types.Operator, ImportHelper):
             self.resPrims                = ImportLDrawOps.prefs.get("resolution",           self.resPrims)
             self.useArchiveLibrary       = ImportLDrawOps.prefs.get("useArchiveLibrary",    self.useArchiveLibrary)
             self.searchAdditionalPaths   = ImportLDrawOps.prefs.get("searchAdditionalPaths", self.searchAdditionalPaths)
+            self.useParseCache           = ImportLDrawOps.prefs.get("useParseCache",        self.useParseCache)
+            self.useParsePool            = ImportLDrawOps.prefs.get("useParsePool",         self.useParsePool)
+            self.incrementalImport       = ImportLDrawOps.prefs.get("incrementalImport",    self.incrementalImport)
             self.smoothParts             = ImportLDrawOps.prefs.get("smoothShading",        self.smoothParts)
             self.studLogoPath            = ImportLDrawOps.prefs.get("studLogoDirectory",    self.studLogoPath)
             self.useLogoStuds            = ImportLDrawOps.prefs.get("useLogoStuds",         self.useLogoStuds)
@@ -548,6 +575,9 @@ class ImportLDrawOps(bpy.types.Operator, ImportHelper):
             ImportLDrawOps.prefs.set("realScale",              self.realScale)
             ImportLDrawOps.prefs.set("useArchiveLibrary",      self.useArchiveLibrary)
             ImportLDrawOps.prefs.set("searchAdditionalPaths",  self.searchAdditionalPaths)
+            ImportLDrawOps.prefs.set("useParseCache",          self.useParseCache)
+            ImportLDrawOps.prefs.set("useParsePool",           self.useParsePool)
+            ImportLDrawOps.prefs.set("incrementalImport",      self.incrementalImport)
             ImportLDrawOps.prefs.set("smoothShading",          self.smoothParts)
             ImportLDrawOps.prefs.set("studLogoDirectory",      self.studLogoPath)
             ImportLDrawOps.prefs.set("useColourScheme",        self.useColourScheme)
@@ -595,6 +625,9 @@ class ImportLDrawOps(bpy.types.Operator, ImportHelper):
         loadldraw.Options.realScale                   = self.realScale
         loadldraw.Options.useArchiveLibrary           = self.useArchiveLibrary
         loadldraw.Options.searchAdditionalPaths       = self.searchAdditionalPaths
+        loadldraw.Options.useParseCache               = self.useParseCache
+        loadldraw.Options.useParsePool                = self.useParsePool
+        loadldraw.Options.incrementalImport           = self.incrementalImport
         loadldraw.Options.smoothShading               = self.smoothParts
         loadldraw.Options.useColourScheme             = self.useColourScheme
         loadldraw.Options.useLogoStuds                = self.useLogoStuds
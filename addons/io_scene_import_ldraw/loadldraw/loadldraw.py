@@ -47,10 +47,26 @@ import time
 import platform
 import operator
 import zipfile
-import tempfile
+import numpy as np
 
 from pprint import pprint
 
+from io_scene_render_ldraw.ldrawlibrary.archive_library import ArchiveLibrary
+from io_scene_render_ldraw.ldrawlibrary.fingerprint import LibraryFingerprint
+from io_scene_render_ldraw.ldrawlibrary.geometry_arrays import GeometryArrays
+from io_scene_render_ldraw.ldrawlibrary.line_buffer import LineBuffer, LineView
+from io_scene_render_ldraw.ldrawlibrary import mesh_builder
+from io_scene_render_ldraw.ldrawlibrary import meta_parser
+from io_scene_render_ldraw.ldrawlibrary.parse_cache import ParseCache
+from io_scene_render_ldraw.ldrawlibrary.parse_pool import ParsePool
+from io_scene_render_ldraw.ldrawlibrary.polygon_arrays import PolygonArrays
+from io_scene_render_ldraw.ldrawlibrary.prefetch import Prefetcher
+from io_scene_render_ldraw.ldrawlibrary.resolver import LibraryArchives, PathIndex, ResolverStats, locate_file
+from io_scene_render_ldraw.ldrawlibrary.section_history import SectionHistory
+from io_scene_render_ldraw.ldrawlibrary.text_reader import decode_text, read_text, split_lines
+from io_scene_render_ldraw.ldrawlibrary.token_table import TokenTable
+from io_scene_render_ldraw.ldrawlibrary.vertex_weld import weld_faces
+
 # **************************************************************************************
 def internalPrint(message, is_error=False):
     """Print output with identification timestamp."""
@@ -266,6 +282,9 @@ class Options:
     studLogoDirectory  = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '../studs'))
     useArchiveLibrary  = False          # Add any archive (zip) libraries in the LDraw file path to the library search list
     searchAdditionalPaths = False       # Search additional LDraw paths (automatically set for fade previous steps and highlight step)
+    useParseCache      = False          # Keep parsed library files in an on-disk cache that later sessions restore them from
+    useParsePool       = False          # Read and tokenize the referenced files in worker processes before parsing them
+    incrementalImport  = False          # Reuse the unchanged MPD sections, their geometry and meshes of the previous import of the same model
     parameterFile      = r""            # Full file path to file containing slope brick angels, lgeo colours and lighted bricks colours
     customLDConfigFile = r""            # Full directory path to specified custom LDraw colours (LDConfig) file.
     additionalSearchPaths = r""         # Full directory paths, comma delimited, to additional LDraw search paths.
@@ -337,6 +356,8 @@ globalSlopeBricks = {}
 globalLightBricks = {}
 globalSlopeAngles = {}
 
+globalTokens = TokenTable()     # Interned filename and colour code tokens, cache keys use their IDs
+
 
 hasCollections = None
 
@@ -391,7 +412,6 @@ class Configure:
     unofficialSearchPaths = []
 
     warningSuppression = {}
-    tempDir = None
 
     def appendLocalPath(path):
         path = FileSystem.pathInsensitive(path)
@@ -578,33 +598,7 @@ class Configure:
 
     def archiveLibraryFound(path):
         Configure.ldrawInstallDirectory = path
-        for libraryName in os.listdir(Configure.ldrawInstallDirectory):
-            if (libraryName.endswith(".zip") or libraryName.endswith(".bin")) and \
-                libraryName not in CachedLibraries.loadedLibraries():
-                libraryPath = os.path.join(Configure.ldrawInstallDirectory, libraryName)
-                with zipfile.ZipFile(libraryPath) as library:
-                    if not CachedLibraries.hasOfficialLibrary and \
-                       "ldraw/LDConfig.ldr" in library.namelist() and \
-                       "ldraw/p/1-4cyli.dat" in library.namelist():
-                        CachedLibraries.setofficialCache(libraryName, library)
-                        debugPrint("Load official archive library: {0}".format(libraryPath))
-                    else:
-                        if Options.useUnofficialParts:
-                            try:
-                                unofficialLibrary = \
-                                    next(pid for pid in library.namelist()
-                                         if (pid.endswith(".dat") or pid.endswith(".ldr") or pid.endswith(".mpd")))
-                            except StopIteration:
-                                continue
-                            else:
-                                if unofficialLibrary:
-                                    if CachedLibraries.isInitialUpdate():
-                                        CachedLibraries.setUnofficialCache(libraryName, library)
-                                    else:
-                                        CachedLibraries.updateUnofficialCache(libraryName, library)
-                                    debugPrint("Load unofficial archive library: {0}".format(libraryPath))
-
-        result = CachedLibraries.hasOfficialLibrary or CachedLibraries.hasUnofficialLibrary
+        result = LibraryArchives.load(Configure.ldrawInstallDirectory, Options.useUnofficialParts, debugPrint)
         if not result:
             Configure.ldrawInstallDirectory = ""
 
@@ -705,12 +699,43 @@ class Configure:
         assert Configure.ldrawInstallDirectory, "LDraw library path not specified."
         if Configure.ldrawInstallDirectory != "":
             Options.ldrawDirectory = Configure.ldrawInstallDirectory.replace("\\\\", os.path.sep).replace("\\", os.path.sep).replace("/", os.path.sep)
+            # The library archives are shared with the MM importer, so they are loaded for this import's options
+            CachedLibraries.clearCache()
             if Options.useArchiveLibrary is True:
                 haveArchiveLibraries = Configure.archiveLibraryFound(Options.ldrawDirectory)
             debugPrint("The LDraw parts library path: {0}".format(Configure.ldrawInstallDirectory))
         Configure.__setLDrawParameterFile()
         Configure.__setSearchPaths()
 
+    def isLibraryPath(filepath):
+        """Is filepath in one of the search paths, rather than only next to the model?"""
+
+        for path in Configure.localSearchPaths + Configure.officialSearchPaths + Configure.unofficialSearchPaths:
+            if filepath.startswith(os.path.join(path, "")):
+                return True
+        return False
+
+    def libraryFingerprint(modelFilename):
+        """Fingerprint of the library content and options that cached library files depend on"""
+
+        roots = [Configure.ldrawInstallDirectory]
+        roots.extend(Configure.localSearchPaths)
+        roots.extend(Configure.officialSearchPaths)
+        roots.extend(Configure.unofficialSearchPaths)
+
+        archives = list(CachedLibraries.loadedLibraries())
+
+        files = [Configure.parameterFile,
+                 os.path.expanduser(Options.customLDConfigFile),
+                 os.path.join(Configure.ldrawInstallDirectory, "LDConfig.ldr"),
+                 os.path.join(Configure.ldrawInstallDirectory, "LDCfgalt.ldr")]
+
+        # A Stud.io model archive is searched ahead of the official library
+        if os.path.splitext(modelFilename)[1].lower() == ".io":
+            files.append(modelFilename)
+
+        return LibraryFingerprint.compute(roots, archives, files, [Options.meshOptionsString()])
+
     def __init__(self):
         Configure.setLDrawDirectory()
 
@@ -1336,255 +1361,281 @@ class FileSystem:
         "/HOME/Chris/I HOPE this doesn't exist"
         """
 
-        return FileSystem.__pathInsensitive(path) or path
+        return FileSystem.resolvePath(path) or path
 
-    def __pathInsensitive(path):
+    def resolvePath(path):
         """
-        Recursive part of path_insensitive to do the work.
+        Memoized case-insensitive resolution of path, shared with the MM importer.
+        Returns None if path does not resolve to an existing file or directory.
         """
 
-        if path == '' or os.path.exists(path):
-            return path
+        return PathIndex.resolve_path(path)
 
-        base = os.path.basename(path)  # may be a directory or a file
-        dirname = os.path.dirname(path)
+    def readTextFile(filepath):
+        """Read a text file, opening it once and detecting its encoding in memory"""
 
-        suffix = ''
-        if not base:  # dir ends with a slash?
-            if len(dirname) < len(path):
-                suffix = path[:len(path) - len(dirname)]
+        filepath = FileSystem.pathInsensitive(filepath)
 
-            base = os.path.basename(dirname)
-            dirname = os.path.dirname(dirname)
+        text = read_text(filepath)
+        if text is None:
+            return None
+        return split_lines(text)
 
-        if not os.path.exists(dirname):
-            debug_dirname = dirname
-            dirname = FileSystem.__pathInsensitive(dirname)
-            if not dirname:
-                return
+    def locate(filename, rootPath = None, recordMissing = True):
+        """Given a file name of an ldraw file, find the full path.
+        Lookups made ahead of the parser pass recordMissing=False so misses are only counted once parsed."""
 
-        # at this point, the directory exists but not the file
+        partName = filename.lower()
+        partName = partName.replace("\\", os.path.sep).replace("/", os.path.sep)
+        partName = os.path.expanduser(partName)
 
-        try:  # we are expecting dirname to be a directory, but it could be a file
-            files = CachedDirectoryFilenames.getCached(dirname)
-            if files is None:
-                files = os.listdir(dirname)
-                CachedDirectoryFilenames.addToCache(dirname, files)
-        except OSError:
-            return
+        if rootPath is None:
+            rootPath = os.path.dirname(filename.lower())
 
-        baselow = base.lower()
-        try:
-            basefinal = next(fl for fl in files if fl.lower() == baselow)
-        except StopIteration:
-            return
+        # Names already known to be unresolvable are not searched again
+        if recordMissing and CachedMissingFiles.isMissing(partName, rootPath):
+            ResolverStats.negative_hit()
+            return None
 
-        if basefinal:
-            return os.path.join(dirname, basefinal) + suffix
-        else:
-            return
+        # Gather all paths in the order we want to search
+        allSearchPaths = []
+        allSearchPaths.extend(Configure.localSearchPaths)
+        allSearchPaths.extend(Configure.unofficialSearchPaths)
 
-    def __checkEncoding(filepath):
-        """Check the encoding of a file for Endian encoding."""
+        fullPathName = locate_file(partName, allSearchPaths)
+        if fullPathName is not None:
+            return fullPathName
 
-        filepath = FileSystem.pathInsensitive(filepath)
+        # A Stud.io model archive follows the unofficial search paths
+        if CachedLibraries.hasModelLibrary:
+            for path in CachedLibraries.modelPaths:
+                libraryPath = os.path.join(path, partName).replace("\\", "/")
+                if CachedLibraries.modelFileExists(libraryPath):
+                    ResolverStats.archive_hit()
+                    return list([CachedLibraries.modelLibrary, libraryPath])
 
-        # Open it, read just the area containing a possible byte mark
-        with open(filepath, "rb") as encode_check:
-            encoding = encode_check.readline(3)
+        allSearchPaths = []
+        allSearchPaths.extend(Configure.officialSearchPaths)
+        if rootPath not in allSearchPaths and rootPath not in Configure.localSearchPaths and rootPath not in Configure.unofficialSearchPaths:
+            allSearchPaths.append(rootPath)
 
-        # The file uses UCS-2 (UTF-16) Big Endian encoding
-        if encoding == b"\xfe\xff\x00":
-            return "utf_16_be"
+        fullPathName = locate_file(partName, allSearchPaths)
+        if fullPathName is not None:
+            return fullPathName
 
-        # The file uses UCS-2 (UTF-16) Little Endian
-        elif encoding == b"\xff\xfe0":
-            return "utf_16_le"
+        if haveArchiveLibraries is True:
+            resultList = LibraryArchives.locate(partName, CachedLibraries.libraryPaths[:])
+            if resultList is not None:
+                return resultList
 
-        # Use LDraw model standard UTF-8
-        else:
-            return "utf_8"
+        if recordMissing:
+            CachedMissingFiles.addToCache(partName, rootPath)
+            ResolverStats.miss()
+        return None
 
-    def readTextFile(filepath):
-        """Read a text file, with various checks for type of encoding"""
 
-        filepath = FileSystem.pathInsensitive(filepath)
+# **************************************************************************************
+# **************************************************************************************
+class PrefetchedFiles:
+    """Referenced files resolved and read on a thread pool ahead of the parser, keyed by (filename, parentDir)"""
+
+    __prefetcher = None
+
+    def fetch(key):
+        """Runs on the thread pool, so it only resolves and reads the file"""
+
+        (filename, parentDir) = key
+        result = FileSystem.locate(filename, parentDir, recordMissing=False)
+        if result is None:
+            return (None, None)
+        if isinstance(result, (list)):
+            sio = CachedLibraries.getLibraryFile(result[1], library=result[0])
+            return (result, sio.splitlines() if sio is not None else None)
+        return (result, FileSystem.readTextFile(result))
+
+    def prefetchReferences(sections, parentDir):
+        """Queue the type 1 references of all sections that are not cached yet"""
+
+        keys = []
+        for (sectionFilename, lines) in sections:
+            for index in lines.indexes():
+                parameters = lines.buffer.tokens(index)
+                if len(parameters) < 15 or parameters[0] != "1":
+                    continue
+                filename = " ".join(parameters[14:])
+                if os.path.splitext(filename)[1].lower() == ".io":
+                    continue
+                if CachedFiles.getCached(filename) is not None:
+                    continue
+                keys.append((filename, parentDir))
 
-        lines = None
-        if os.path.exists(filepath):
-            # Try to read using the suspected encoding
-            file_encoding = FileSystem.__checkEncoding(filepath)
-            try:
-                with open(filepath, "rt", encoding=file_encoding) as f_in:
-                    lines = f_in.readlines()
-            except:
-                # If all else fails, read using Latin 1 encoding
-                with open(filepath, "rt", encoding="latin_1") as f_in:
-                    lines = f_in.readlines()
+        if keys:
+            if PrefetchedFiles.__prefetcher is None:
+                PrefetchedFiles.__prefetcher = Prefetcher(PrefetchedFiles.fetch)
+            PrefetchedFiles.__prefetcher.prefetch(keys)
 
-        return lines
+    def take(filename, parentDir):
+        if PrefetchedFiles.__prefetcher is None:
+            return None
+        return PrefetchedFiles.__prefetcher.take((filename, parentDir))
 
-    def locate(filename, rootPath = None):
-        """Given a file name of an ldraw file, find the full path"""
+    def clearCache():
+        if PrefetchedFiles.__prefetcher is not None:
+            PrefetchedFiles.__prefetcher.shutdown()
 
-        partName = filename.lower()
-        partName = partName.replace("\\", os.path.sep).replace("/", os.path.sep)
-        partName = os.path.expanduser(partName)
 
-        if rootPath is None:
-            rootPath = os.path.dirname(filename.lower())
+# **************************************************************************************
+# **************************************************************************************
+class TokenizedFiles:
+    """Files referenced by the model, read and tokenized by ParsePool worker processes before
+    they are parsed, keyed by (filename, parentDir) like PrefetchedFiles"""
 
-        # Gather all paths in the order we want to search
-        allSearchPaths = []
-        allSearchPaths.extend(Configure.localSearchPaths)
-        allSearchPaths.extend(Configure.unofficialSearchPaths)
-        allSearchPaths.extend(Configure.officialSearchPaths)
-        if rootPath not in allSearchPaths:
-            allSearchPaths.append(rootPath)
+    __pool = ParsePool()
+    __paths = {}        # Resolved file path of each key, the parent directory of its references
+
+    def tokenizeModel(filepath):
+        """Tokenize the transitive closure of the files referenced by the model at filepath"""
 
-        for path in allSearchPaths:
-            fullPathName = os.path.join(path, partName)
-            fullPathName = FileSystem.pathInsensitive(fullPathName)
+        if not Options.useParsePool or os.path.splitext(filepath)[1].lower() == ".io":
+            return
+        key = (filepath, None)
+        TokenizedFiles.__paths[key] = filepath
+        TokenizedFiles.__pool.tokenize_closure(key, ("path", filepath), TokenizedFiles.__locate)
 
-            if os.path.exists(fullPathName):
-                return fullPathName
+    def __locate(reference, parentKey):
+        """Runs on the main thread while the pool tokenizes"""
 
-        if haveArchiveLibraries is True:
-            libraryPaths = CachedLibraries.libraryPaths[:]
-            for path in libraryPaths:
-                libraryPath = os.path.join(path, partName).replace("\\", "/")
-                library = CachedLibraries.libraryFileExists(libraryPath)
-                
-                if library != CachedLibraries.libraryNotFound:
-                    resultList = list([library, libraryPath])
-                    return resultList
+        filename = " ".join(reference.split())
+        if os.path.splitext(filename)[1].lower() == ".io" or CachedFiles.getCached(filename) is not None:
+            return None
+        parentDir = os.path.dirname(TokenizedFiles.__paths[parentKey])
+        result = FileSystem.locate(filename, parentDir, recordMissing=False)
+        if result is None:
+            return None
 
-        return None
+        key = (filename, parentDir)
+        if isinstance(result, (list)):
+            sio = CachedLibraries.getLibraryFile(result[1], library=result[0])
+            if sio is None:
+                return None
+            TokenizedFiles.__paths[key] = result[1]
+            return (key, ("text", sio))
+        TokenizedFiles.__paths[key] = result
+        return (key, ("path", FileSystem.pathInsensitive(result)))
+
+    def take(filename, parentDir):
+        """Returns (lines, tokens, references) for a tokenized file, or None"""
+
+        return TokenizedFiles.__pool.take((filename, parentDir))
+
+    def clearCache():
+        TokenizedFiles.__pool.shutdown()
+        TokenizedFiles.__paths = {}
 
 
 # **************************************************************************************
 # **************************************************************************************
-class CachedDirectoryFilenames:
-    """Cached dictionary of directory filenames keyed by directory path"""
+class CachedMissingFiles:
+    """Cached dictionary of unresolvable file names and their reference counts"""
 
-    __cache = {}        # Dictionary
+    __cache = {}        # Dictionary of (filename, rootPath) keys, and reference counts as values
 
-    def getCached(key):
-        if key in CachedDirectoryFilenames.__cache:
-            return CachedDirectoryFilenames.__cache[key]
-        return None
+    def isMissing(filename, rootPath):
+        key = (filename, rootPath)
+        if key in CachedMissingFiles.__cache:
+            CachedMissingFiles.__cache[key] += 1
+            return True
+        return False
 
-    def addToCache(key, value):
-        CachedDirectoryFilenames.__cache[key] = value
+    def addToCache(filename, rootPath):
+        CachedMissingFiles.__cache[(filename, rootPath)] = 1
+
+    def printSummary():
+        """Report all missing files and their reference counts in a single warning"""
+
+        counts = {}
+        for (filename, rootPath), count in CachedMissingFiles.__cache.items():
+            counts[filename] = counts.get(filename, 0) + count
+        if not counts:
+            return
+
+        missing = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        summary = ", ".join("{0} ({1})".format(filename, count) for filename, count in missing)
+        printWarningOnce("Missing {0} file(s), {1} reference(s): {2}".format(len(missing), sum(counts.values()), summary))
 
     def clearCache():
-        CachedDirectoryFilenames.__cache = {}
+        CachedMissingFiles.__cache = {}
 
 
 # **************************************************************************************
 # **************************************************************************************
 class CachedLibraries:
-    """Cached dictionary of LDrawLibrary objects"""
+    """The library archives shared with the MM importer, and the Stud.io model archive of this import"""
 
-    libraryNotFound   = -2
-    allLibraries      = -1
-    officialLibrary   = 0
-    unofficialLibrary = 1
+    modelLibrary      = -3
+    libraryNotFound   = LibraryArchives.not_found
+    allLibraries      = LibraryArchives.all_libraries
+    officialLibrary   = LibraryArchives.official_library
+    unofficialLibrary = LibraryArchives.unofficial_library
 
     # List of archive library file paths
     libraryPaths      = []
 
-    # List of loaded archive libraries
-    __loadedLibraries = []
-
-    # Dictionary list - holds populated dictionaries
-    __cache           = []
-
-    # Library Dictionaries
-    __officialCache   = {}
-    __unofficialCache = {}
-
-    initialLibraryUpdate = True
-    hasOfficialLibrary = False
-    hasUnofficialLibrary = False
-    
-    def getFOO():
-        return CachedLibraries.__unofficialCache
-
-    def getEncoding(binIOSlice):
-        # The file uses UCS-2 (UTF-16) Big Endian encoding
-        if binIOSlice == b'\xfe\xff\x00':
-            return "utf_16_be"
-        # The file uses UCS-2 (UTF-16) Little Endian
-        elif binIOSlice == b'\xff\xfe0':
-            return "utf_16_le"
-        # Use LDraw model standard UTF-8
-        else:
-            return "utf_8"
+    # Stud.io model archive, searched in place of its extracted 'CustomParts' directories
+    __modelCache      = ArchiveLibrary()
+    modelPaths        = []
 
-    def isInitialUpdate():
-        return CachedLibraries.initialLibraryUpdate
+    hasModelLibrary = False
 
     def loadedLibraries():
-        return CachedLibraries.__loadedLibraries
+        return LibraryArchives.paths()
     
     def appendLibraryPath(path):
         if not path in CachedLibraries.libraryPaths:
             CachedLibraries.libraryPaths.append(path)
 
     def libraryFileExists(key):
-        if key in CachedLibraries.__officialCache:
-            return CachedLibraries.officialLibrary
-        elif key in CachedLibraries.__unofficialCache:
-            return CachedLibraries.unofficialLibrary
-        else:
-            return CachedLibraries.libraryNotFound
+        return LibraryArchives.file_exists(key)
+
+    def librarySource(key, library):
+        """The (archive path, size, mtime) of the library archive holding key, or None"""
+
+        return LibraryArchives.source(key, library)
 
     def getLibraryFile(key, library=allLibraries):
-        if library != CachedLibraries.allLibraries:
-            if key in CachedLibraries.__cache[library]:
-                binIO = CachedLibraries.__cache[library][key]
-                encoding = CachedLibraries.getEncoding(binIO[:3])
-                return binIO.decode(encoding)
-            else:
+        if library == CachedLibraries.modelLibrary:
+            binIO = CachedLibraries.__modelCache.read(key)
+            if binIO is None:
                 return None
-        else:
-            for library in CachedLibraries.__cache:
-                if key in library:
-                    binIO = library[key]
-                    encoding = CachedLibraries.getEncoding(binIO[:3])
-                    return binIO.decode(encoding)
-                else:
-                    return None
-
-    def setofficialCache(libraryName, library):
-        CachedLibraries.__officialCache = {key.lower(): library.read(key) for key in library.namelist()}
-        CachedLibraries.__cache.append(CachedLibraries.__officialCache)
-        CachedLibraries.__loadedLibraries.append(libraryName)
-        CachedLibraries.hasOfficialLibrary = True
-
-    def setUnofficialCache(libraryName, library):
-        CachedLibraries.__unofficialCache = {key.lower(): library.read(key) for key in library.namelist()}
-        CachedLibraries.__cache.append(CachedLibraries.__unofficialCache)
-        CachedLibraries.initialLibraryUpdate = False
-        CachedLibraries.__loadedLibraries.append(libraryName)
-        CachedLibraries.hasUnofficialLibrary = True
-
-    def updateUnofficialCache(libraryName, library):
-        dictionary = {key.lower(): library.read(key) for key in library.namelist()}
-        CachedLibraries.__unofficialCache.update(dictionary)
-        CachedLibraries.__loadedLibraries.append(libraryName)
+            return decode_text(binIO)
+        return LibraryArchives.read(key, library)
+
+    def setModelCache(libraryPath):
+        CachedLibraries.clearModelCache()
+        CachedLibraries.__modelCache.add(libraryPath, indexed=False)
+        CachedLibraries.hasModelLibrary = True
+
+        # Archive paths relative to the model, in the order they were searched once extracted
+        CachedLibraries.modelPaths = ["", "customparts", "customparts/parts"]
+        if Options.resolution == "High":
+            CachedLibraries.modelPaths.append("customparts/p/48")
+        elif Options.resolution == "Low":
+            CachedLibraries.modelPaths.append("customparts/p/8")
+        CachedLibraries.modelPaths.extend(["customparts/p", "customparts/s", "customparts/s/s"])
+
+    def modelFileExists(key):
+        return key in CachedLibraries.__modelCache
+
+    def clearModelCache():
+        CachedLibraries.__modelCache.close()
+        CachedLibraries.modelPaths = []
+        CachedLibraries.hasModelLibrary = False
 
     def clearCache():
         global haveArchiveLibraries
         haveArchiveLibraries = False
-        CachedLibraries.hasOfficialLibrary = False
-        CachedLibraries.hasUnofficialLibrary = False
-        CachedLibraries.initialLibraryUpdate = True
-        CachedLibraries.__officialCache = {}
-        CachedLibraries.__unofficialCache = {}
-        del CachedLibraries.__cache[:]
-        del CachedLibraries.__loadedLibraries[:]
+        LibraryArchives.clear()
+        CachedLibraries.clearModelCache()
         del CachedLibraries.libraryPaths[:]
 
 
@@ -1596,6 +1647,9 @@ class CachedFiles:
     __cache = {}        # Dictionary of exact filenames as keys, and file contents as values
     __lowercache = {}   # Dictionary of lowercase filenames as keys, and file contents as values
 
+    # Library files stay cached across imports while this is unchanged
+    fingerprint = LibraryFingerprint()
+
     def getCached(key):
         # Look for an exact match in the cache first
         if key in CachedFiles.__cache:
@@ -1610,6 +1664,31 @@ class CachedFiles:
         CachedFiles.__cache[key] = value
         CachedFiles.__lowercache[key.lower()] = value
 
+    def isRetainable(file, retainable):
+        """Is this an unchanged library file whose children are all retainable too?"""
+
+        if id(file) in retainable:
+            return retainable[id(file)]
+
+        retainable[id(file)] = False
+        result = file.isLibraryFile and not file.isModel
+        if result and file.sourceMtime is not None:
+            result = LibraryFingerprint.file_mtime(file.fullFilepath) == file.sourceMtime
+        if result:
+            for child in file.childNodes:
+                if child.file is None or not CachedFiles.isRetainable(child.file, retainable):
+                    result = False
+                    break
+        retainable[id(file)] = result
+        return result
+
+    def clearModelFiles():
+        """Clears all but the library files, which do not change while the library fingerprint is unchanged"""
+
+        retainable = {}
+        CachedFiles.__cache = {key: file for key, file in CachedFiles.__cache.items() if CachedFiles.isRetainable(file, retainable)}
+        CachedFiles.__lowercache = {key: file for key, file in CachedFiles.__lowercache.items() if CachedFiles.isRetainable(file, retainable)}
+
     def clearCache():
         CachedFiles.__cache = {}
         CachedFiles.__lowercache = {}
@@ -1630,12 +1709,116 @@ class CachedGeometry:
     def addToCache(key, value):
         CachedGeometry.__cache[key] = value
 
+    def clearModelGeometry():
+        """Clears the geometry of all files that are no longer cached or kept by ModelSections, call after CachedFiles.clearModelFiles()"""
+
+        CachedGeometry.__cache = {key: geometry for key, geometry in CachedGeometry.__cache.items()
+                                  if CachedFiles.getCached(globalTokens.token(key[0])) is not None or ModelSections.isKept(globalTokens.token(key[0]))}
+
+    def clearFiles(filenames):
+        """Clears the geometry of the files with these lowercase names"""
+
+        CachedGeometry.__cache = {key: geometry for key, geometry in CachedGeometry.__cache.items() if globalTokens.token(key[0]).lower() not in filenames}
+
     def clearCache():
         CachedGeometry.__cache = {}
 
+# **************************************************************************************
+# **************************************************************************************
+class ModelSections:
+    """The MPD sections of the previous import of a model.
+    An incremental import of the same model reuses the parsed sections whose content did not change,
+    and only bakes the geometry and builds the meshes of changed sections and the sections that contain them again."""
+
+    history = SectionHistory()
+    __files = {}            # Dictionary of lowercase section filenames as keys, and the section LDrawFile objects as values
+    __releasedMeshes = set()
+    __previousMeshes = []   # Names of the released meshes that were still in use when they were last checked
+
+    def begin(filepath):
+        """Call before loading a model"""
+
+        ModelSections.__releasedMeshes = set()
+        if not Options.incrementalImport:
+            ModelSections.clearCache()
+        elif not ModelSections.history.begin(filepath):
+            ModelSections.__files = {}
+
+    def getUnchanged(sectionFilename, lines):
+        """Records a section of this import, returns its file of the previous import if the section did not change"""
+
+        if not Options.incrementalImport:
+            return None
+        references = []
+        for index in lines.indexes():
+            parameters = lines.buffer.tokens(index)
+            if len(parameters) >= 15 and parameters[0] == "1":
+                references.append(" ".join(parameters[14:]))
+        if ModelSections.history.add(sectionFilename, lines, references):
+            return ModelSections.__files.get(sectionFilename.lower())
+        return None
+
+    def keep(sectionFilename, file):
+        """Keeps a parsed section for the next import, unless parsing it added cameras or lights to the scene"""
+
+        if Options.incrementalImport and not file.addedSceneItems:
+            ModelSections.__files[sectionFilename.lower()] = file
+
+    def isKept(filename):
+        return filename.lower() in ModelSections.__files
+
+    def isDirty(filename):
+        return Options.incrementalImport and ModelSections.history.is_dirty(filename)
+
+    def finish():
+        """Call after loading a model, clears the geometry of the changed sections and the sections that contain them"""
+
+        if not Options.incrementalImport:
+            return
+        dirty = ModelSections.history.finish()
+        names = ModelSections.history.names()
+        ModelSections.__files = {key: file for key, file in ModelSections.__files.items() if key in names}
+        CachedGeometry.clearFiles(dirty)
+        debugPrint("Incremental import, {0} of {1} sections changed or contain a changed section".format(len(dirty & names), len(names)))
+
+    def releaseMesh(name, meshName):
+        """Renames the mesh a changed section had in the previous import, so it is built again rather than reused"""
+
+        if meshName in ModelSections.__releasedMeshes or not ModelSections.isDirty(name):
+            return
+        ModelSections.__releasedMeshes.add(meshName)
+        if meshName in bpy.data.meshes:
+            mesh = bpy.data.meshes[meshName]
+            mesh.name = meshName + "_previous"
+            ModelSections.__previousMeshes.append(mesh.name)
+
+    def removeReleasedMeshes():
+        """Removes the released meshes that no object uses any more, call after the objects are created"""
+
+        previousMeshes = []
+        for meshName in ModelSections.__previousMeshes:
+            mesh = bpy.data.meshes.get(meshName)
+            if mesh is None:
+                continue
+            if mesh.users == 0:
+                bpy.data.meshes.remove(mesh)
+            else:
+                previousMeshes.append(meshName)
+        ModelSections.__previousMeshes = previousMeshes
+
+    def clearCache():
+        ModelSections.history.clear()
+        ModelSections.__files = {}
+
+
 # **************************************************************************************
 # **************************************************************************************
 class FaceInfo:
+    # PolygonArrays and GeometryArrays flag bits
+    cullingFlag = 1
+    windingCCWFlag = 2
+    grainySlopeFlag = 4
+
     def __init__(self, faceColour, culling, windingCCW, isGrainySlopeAllowed):
         self.faceColour = faceColour
         self.culling = culling
@@ -1646,125 +1829,217 @@ class FaceInfo:
 # **************************************************************************************
 # **************************************************************************************
 class LDrawGeometry:
-    """Stores the geometry for an LDrawFile"""
+    """Stores the geometry for an LDrawFile, or the baked geometry of an LDrawNode.
+    A parsed file keeps its faces and edges in PolygonArrays, which become GeometryArrays when the file
+    is first baked. Baking appends each child's GeometryArrays with one matrix multiply, and the points,
+    faces, faceInfo and edges lists are only created when they are first used."""
 
     def __init__(self):
-        self.points = []
-        self.faces = []
-        self.faceInfo = []
-        self.edges = []
+        self.__facePolygons = None
+        self.__edgePolygons = None
+        self.__arrays = None
+        self.__lists = None
+        self.__edited = False
+        self.__colourViews = None
+        self.__welds = None
+
+    def parseFace(self, parameters, cull, ccw, isGrainySlopeAllowed, coordinates=None):
+        """Parse a face from parameters, or the coordinates of a tokenized line, its points are transformed by finalize()"""
+
+        if self.__facePolygons is None:
+            self.__facePolygons = PolygonArrays()
+        flags = (FaceInfo.cullingFlag if cull else 0) | \
+                (FaceInfo.windingCCWFlag if ccw else 0) | \
+                (FaceInfo.grainySlopeFlag if isGrainySlopeAllowed else 0)
+        self.__facePolygons.add(parameters, flags, coordinates)
+
+    def parseEdge(self, parameters, coordinates=None):
+        """Parse an edge from parameters, or the coordinates of a tokenized line, its points are transformed by finalize()"""
 
-    def parseFace(self, parameters, cull, ccw, isGrainySlopeAllowed):
-        """Parse a face from parameters"""
-
-        num_points = int(parameters[0])
         colourName = parameters[1]
+        if colourName == "24":
+            if self.__edgePolygons is None:
+                self.__edgePolygons = PolygonArrays()
+            self.__edgePolygons.add(parameters, coordinates=coordinates)
+
+    def finalize(self):
+        """Scale all the parsed points in one pass, and fix "bowtie" quadrilaterals
+        (see http://wiki.ldraw.org/index.php?title=LDraw_technical_restrictions#Complex_quadrilaterals)"""
+
+        if self.__facePolygons is not None:
+            self.__facePolygons.finalize(Math.scaleMatrix, fix_bowties=True)
+        if self.__edgePolygons is not None:
+            self.__edgePolygons.finalize(Math.scaleMatrix)
+
+    @property
+    def arrays(self):
+        """The faces and edges as GeometryArrays, built from the parsed PolygonArrays when first used"""
+
+        if self.__arrays is None:
+            self.finalize()
+            self.__arrays = GeometryArrays.from_polygons(self.__facePolygons, self.__edgePolygons)
+        return self.__arrays
+
+    def __materialize(self):
+        """Create the lists of the arrays"""
+
+        if self.__lists is not None:
+            return self.__lists
+
+        arrays = self.arrays
+        points = [mathutils.Vector(point) for point in arrays.vertices.tolist()]
+        faceInfo = [FaceInfo(colourName,
+                             bool(flags & FaceInfo.cullingFlag),
+                             bool(flags & FaceInfo.windingCCWFlag),
+                             bool(flags & FaceInfo.grainySlopeFlag))
+                    for colourName, flags in zip(arrays.colours, arrays.flags.tolist())]
+        edges = [(mathutils.Vector(edge[0]), mathutils.Vector(edge[1]), bool(flags))
+                 for edge, flags in zip(arrays.edges.tolist(), arrays.edge_flags.tolist())]
+        self.__lists = (points, arrays.face_indices(), faceInfo, edges)
+        return self.__lists
+
+    @property
+    def points(self):
+        return self.__materialize()[0]
+
+    @points.setter
+    def points(self, points):
+        self.arrays.vertices = [tuple(point) for point in points]
+        self.__lists = None
+        self.__welds = None
+        self.__edited = True
+
+    @property
+    def faces(self):
+        return self.__materialize()[1]
+
+    @property
+    def faceInfo(self):
+        return self.__materialize()[2]
+
+    @property
+    def edges(self):
+        return self.__materialize()[3]
+
+    @edges.setter
+    def edges(self, edges):
+        self.arrays.edges = [(tuple(edge[0]), tuple(edge[1])) for edge in edges]
+        self.__lists = None
+        self.__edited = True
+
+    def welded(self, weldDistance):
+        """The faces as WeldedFaces, with the vertices within weldDistance welded, created once per distance"""
+
+        if self.__welds is None:
+            self.__welds = {}
+        welded = self.__welds.get(weldDistance)
+        if welded is None:
+            arrays = self.arrays
+            welded = self.__welds[weldDistance] = weld_faces(arrays.vertices, arrays.offsets, weldDistance)
+        return welded
+
+    def faceColour(self, colourName):
+        """The colour of the faces that have colourName in arrays.colours"""
 
-        newPoints = []
-        for i in range(num_points):
-            blenderPos = Math.scaleMatrix @ mathutils.Vector( (float(parameters[i * 3 + 2]),
-                                                               float(parameters[i * 3 + 3]),
-                                                               float(parameters[i * 3 + 4])) )
-            newPoints.append(blenderPos)
-
-        # Fix "bowtie" quadrilaterals (see http://wiki.ldraw.org/index.php?title=LDraw_technical_restrictions#Complex_quadrilaterals)
-        if num_points == 4:
-            nA = (newPoints[1] - newPoints[0]).cross(newPoints[2] - newPoints[0])
-            nB = (newPoints[2] - newPoints[1]).cross(newPoints[3] - newPoints[1])
-            nC = (newPoints[3] - newPoints[2]).cross(newPoints[0] - newPoints[2])
-            if (nA.dot(nB) < 0):
-                newPoints[2], newPoints[3] = newPoints[3], newPoints[2]
-            elif (nB.dot(nC) < 0):
-                newPoints[2], newPoints[1] = newPoints[1], newPoints[2]
-
-        pointCount = len(self.points)
-        newFace = list(range(pointCount, pointCount + num_points))
-        self.points.extend(newPoints)
-        self.faces.append(newFace)
-        self.faceInfo.append(FaceInfo(colourName, cull, ccw, isGrainySlopeAllowed))
-
-    def parseEdge(self, parameters):
-        """Parse an edge from parameters"""
+        return colourName
 
-        colourName = parameters[1]
-        if colourName == "24":
-            blenderPos1 = Math.scaleMatrix @ mathutils.Vector( (float(parameters[2]),
-                                                                float(parameters[3]),
-                                                                float(parameters[4])) )
-            blenderPos2 = Math.scaleMatrix @ mathutils.Vector( (float(parameters[5]),
-                                                                float(parameters[6]),
-                                                                float(parameters[7])) )
-            self.edges.append((blenderPos1, blenderPos2))
-
-    def verify(self, face, numPoints):
-        for i in face:
-            assert i < numPoints
-            assert i >= 0
-
-    def appendGeometry(self, geometry, matrix, isStud, isStudLogo, parentMatrix, cull, invert):
+    def withColour(self, colourName):
+        """This geometry with its default colour 16 faces in colourName, the view is created once per colour"""
+
+        if self.__colourViews is None:
+            self.__colourViews = {}
+        view = self.__colourViews.get(colourName)
+        if view is None:
+            view = self.__colourViews[colourName] = ColouredGeometry(self, colourName)
+        return view
+
+    def toRecord(self):
+        """The parsed faces and edges for the ParseCache, or None once they have been edited"""
+
+        if self.__edited:
+            return None
+        self.finalize()
+        return (None if self.__facePolygons is None else self.__facePolygons.to_record(),
+                None if self.__edgePolygons is None else self.__edgePolygons.to_record())
+
+    def fromRecord(record):
+        """Geometry restored from a toRecord() record"""
+
+        (faceRecord, edgeRecord) = record
+        geometry = LDrawGeometry()
+        if faceRecord is not None:
+            geometry.__facePolygons = PolygonArrays.from_record(faceRecord)
+        if edgeRecord is not None:
+            geometry.__edgePolygons = PolygonArrays.from_record(edgeRecord)
+        return geometry
+
+    def appendGeometry(self, geometry, matrix, isStud, isStudLogo, parentMatrix, cull, invert, colourName="16"):
         combinedMatrix = parentMatrix @ matrix
         isReflected = combinedMatrix.determinant() < 0.0
         reflectStudLogo = isStudLogo and isReflected
 
-        fixedMatrix = matrix.copy()
+        fixedMatrix = matrix
         if reflectStudLogo:
             fixedMatrix = matrix @ Math.reflectionMatrix
             invert = not invert
 
-        # Append face information
-        pointCount = len(self.points)
-        newFaceInfo = []
-        for index, face in enumerate(geometry.faces):
-            # Gather points for this face (and transform points)
-            newPoints = []
-            for i in face:
-                newPoints.append(fixedMatrix @ geometry.points[i])
-
-            # Add clockwise and/or anticlockwise sets of points as appropriate
-            newFace = face.copy()
-            for i in range(len(newFace)):
-                newFace[i] += pointCount
-
-            faceInfo = geometry.faceInfo[index]
-            faceCCW = faceInfo.windingCCW != invert
-            faceCull = faceInfo.culling and cull
-
-            # If we are going to resolve ambiguous normals by "best guess" we will let
-            # Blender calculate that for us later. Just cull with arbitrary winding for now.
-            if not faceCull:
-                if Options.resolveAmbiguousNormals == "guess":
-                    faceCull = True
+        # Add clockwise and/or anticlockwise sets of points as appropriate, in one pass over the child's arrays.
+        # If we are going to resolve ambiguous normals by "best guess" we will let
+        # Blender calculate that for us later. Just cull with arbitrary winding for now.
+        self.arrays.append(geometry.arrays, fixedMatrix, cull, invert,
+                           cull_ambiguous=Options.resolveAmbiguousNormals == "guess",
+                           keep_flags=0 if isStud else FaceInfo.grainySlopeFlag,
+                           edge_flags=0 if isStudLogo else 1,
+                           colour_map=None if colourName == "16" else {"16": colourName})
+        self.__lists = None
+        self.__colourViews = None
+        self.__welds = None
 
-            if faceCCW or not faceCull:
-                self.points.extend(newPoints)
-                self.faces.append(newFace)
 
-                newFaceInfo.append(FaceInfo(faceInfo.faceColour, True, True, not isStud and faceInfo.isGrainySlopeAllowed))
-                self.verify(newFace, len(self.points))
-
-            if not faceCull:
-                newFace = newFace.copy()
-                pointCount += len(newPoints)
-                for i in range(len(newFace)):
-                    newFace[i] += len(newPoints)
-
-            if not faceCCW or not faceCull:
-                self.points.extend(newPoints[::-1])
-                self.faces.append(newFace)
-
-                newFaceInfo.append(FaceInfo(faceInfo.faceColour, True, True, not isStud and faceInfo.isGrainySlopeAllowed))
-                self.verify(newFace, len(self.points))
-
-        self.faceInfo.extend(newFaceInfo)
-        assert len(self.faces) == len(self.faceInfo)
-
-        # Append edge information
-        newEdges = []
-        allowBevelWeight = not isStudLogo
-
-        for edge in geometry.edges:
-            newEdges.append( (fixedMatrix @ edge[0], fixedMatrix @ edge[1], allowBevelWeight) )
-        self.edges.extend(newEdges)
+# **************************************************************************************
+# **************************************************************************************
+class ColouredGeometry:
+    """The baked geometry of a node in one colour.
+    Baked geometry is shared by every colour the node is used in, and its faces that inherit the colour
+    keep the default colour 16. They only take the node's colour here, when the mesh is created."""
+
+    def __init__(self, geometry, colourName):
+        self.geometry = geometry
+        self.colourName = colourName
+        self.__faceInfo = None
+
+    @property
+    def points(self):
+        return self.geometry.points
+
+    @property
+    def faces(self):
+        return self.geometry.faces
+
+    @property
+    def edges(self):
+        return self.geometry.edges
+
+    @property
+    def arrays(self):
+        return self.geometry.arrays
+
+    def welded(self, weldDistance):
+        return self.geometry.welded(weldDistance)
+
+    def faceColour(self, colourName):
+        return self.colourName if colourName == "16" else colourName
+
+    @property
+    def faceInfo(self):
+        if self.__faceInfo is None:
+            if self.colourName == "16":
+                self.__faceInfo = self.geometry.faceInfo
+            else:
+                self.__faceInfo = [faceInfo if faceInfo.faceColour != "16" else
+                                   FaceInfo(self.colourName, faceInfo.culling, faceInfo.windingCCW, faceInfo.isGrainySlopeAllowed)
+                                   for faceInfo in self.geometry.faceInfo]
+        return self.__faceInfo
 
 
 # **************************************************************************************
@@ -1775,11 +2050,12 @@ class LDrawNode:
     def __init__(self, filename, isFullFilepath, parentFilepath, colourName=None,
                  matrix=Math.identityMatrix, bfcCull=True, bfcInverted=False, isLSynthPart=False, isSubPart=False,
                  isRootNode=True, groupNames=[]):
-        self.filename       = filename
+        self.filename       = globalTokens.intern(filename)
+        self.filenameId     = globalTokens.id(filename)
         self.isFullFilepath = isFullFilepath
         self.parentFilepath = parentFilepath
         self.matrix         = matrix
-        self.colourName     = colourName or Options.defaultColour
+        self.colourName     = globalTokens.intern(colourName or Options.defaultColour)
         self.bfcInverted    = bfcInverted
         self.bfcCull        = bfcCull
         self.file           = None
@@ -1901,40 +2177,43 @@ class LDrawNode:
 
         assert self.file is not None
 
+        ourColourName = LDrawNode.resolveColour(self.colourName, realColourName)
+        code = LDrawNode.getBFCCode(accumCull and self.bfcCull, accumInvert != self.bfcInverted, self.bfcCull, self.bfcInverted)
+        meshName = "Mesh_{0}_{1}{2}".format(basename, ourColourName, code)
+        bakedGeometry = self.getBakedGeometry(parentMatrix, accumCull, accumInvert)
+        return (meshName, bakedGeometry.withColour(ourColourName))
+
+    def getBakedGeometry(self, parentMatrix=Math.identityMatrix, accumCull=True, accumInvert=False):
+        """
+        Returns the geometry of this node with the geometry of it's children that are not Blender Object nodes baked in.
+        Faces that inherit the colour keep the default colour 16, so the geometry is only baked once per BFC state,
+        whatever colours the node is used in (see ColouredGeometry).
+        """
+
         accumCull = accumCull and self.bfcCull
         accumInvert = accumInvert != self.bfcInverted
 
-        ourColourName = LDrawNode.resolveColour(self.colourName, realColourName)
-        code = LDrawNode.getBFCCode(accumCull, accumInvert, self.bfcCull, self.bfcInverted)
-        meshName = "Mesh_{0}_{1}{2}".format(basename, ourColourName, code)
-        key = (self.filename, ourColourName, accumCull, accumInvert, self.bfcCull, self.bfcInverted)
+        key = (self.filenameId, accumCull, accumInvert, self.bfcCull, self.bfcInverted)
         bakedGeometry = CachedGeometry.getCached(key)
         if bakedGeometry is None:
             combinedMatrix = parentMatrix @ self.matrix
 
             # Start with a copy of our file's geometry
-            assert len(self.file.geometry.faces) == len(self.file.geometry.faceInfo)
             bakedGeometry = LDrawGeometry()
             bakedGeometry.appendGeometry(self.file.geometry, Math.identityMatrix, self.file.isStud, self.file.isStudLogo, combinedMatrix, self.bfcCull, self.bfcInverted)
 
-            # Replaces the default colour 16 in our faceColours list with a specific colour
-            for faceInfo in bakedGeometry.faceInfo:
-                faceInfo.faceColour = LDrawNode.resolveColour(faceInfo.faceColour, ourColourName)
-
-            # Append each child's geometry
+            # Append each child's geometry, in the child's colour unless it inherits ours
             for child in self.file.childNodes:
                 assert child.file is not None
                 if not child.isBlenderObjectNode():
-                    childColourName = LDrawNode.resolveColour(child.colourName, ourColourName)
-                    childMeshName, bg = child.getBlenderGeometry(childColourName, basename, combinedMatrix, accumCull, accumInvert)
+                    bg = child.getBakedGeometry(combinedMatrix, accumCull, accumInvert)
 
                     isStud = child.file.isStud
                     isStudLogo = child.file.isStudLogo
-                    bakedGeometry.appendGeometry(bg, child.matrix, isStud, isStudLogo, combinedMatrix, self.bfcCull, self.bfcInverted)
+                    bakedGeometry.appendGeometry(bg, child.matrix, isStud, isStudLogo, combinedMatrix, self.bfcCull, self.bfcInverted, child.colourName)
 
             CachedGeometry.addToCache(key, bakedGeometry)
-        assert len(bakedGeometry.faces) == len(bakedGeometry.faceInfo)
-        return (meshName, bakedGeometry)
+        return bakedGeometry
 
 
 # **************************************************************************************
@@ -2051,6 +2330,59 @@ class LDrawLight:
         return light
 
 
+# **************************************************************************************
+class SceneMetas:
+    """Applies the camera and light metas parsed by the shared meta_parser tables to LDrawCamera and LDrawLight.
+    Unknown keywords and invalid values are collected in the report, which is printed when loading completes."""
+
+    report = meta_parser.MetaReport()
+    setterTables = {}
+
+    @staticmethod
+    def toBlender(value, isLPubMeta):
+        (x, y, z) = value
+        if isLPubMeta:
+            # Convert transform from LDraw to Blender, switch Z and Y axis with -Z in the up direction
+            return Math.scaleMatrix @ mathutils.Vector((x, z, -y))
+        return Math.scaleMatrix @ mathutils.Vector((x, y, z))
+
+    @staticmethod
+    def setters(isLPubMeta):
+        def vector(name):
+            return lambda target, value: setattr(target, name, SceneMetas.toBlender(value, isLPubMeta))
+
+        return {
+            "fov":             lambda camera, value: setattr(camera, "fov_degrees", value),
+            "z_near":          lambda camera, value: setattr(camera, "near", globalScaleFactor * value),
+            "z_far":           lambda camera, value: setattr(camera, "far", globalScaleFactor * value),
+            "position":        vector("position"),
+            "target_position": vector("target_position"),
+            "up_vector":       vector("up_vector"),
+            "rotation":        lambda light, value: setattr(light, "rotation", mathutils.Matrix(value)),
+            "color":           lambda light, value: setattr(light, "color", mathutils.Vector(value)),
+        }
+
+    # Returns the name of the camera or light if the line completes it, otherwise None
+    @staticmethod
+    def apply(command, target, parameters, line, isLPubMeta):
+        result = command.parse(parameters, 3, line)
+        SceneMetas.report.record(command.command, result, line.strip())
+        setters = SceneMetas.setterTables.get(isLPubMeta)
+        if setters is None:
+            setters = SceneMetas.setterTables[isLPubMeta] = SceneMetas.setters(isLPubMeta)
+        command.apply(target, result, setters)
+        return result.name
+
+    @staticmethod
+    def printSummary():
+        for message in SceneMetas.report.summary():
+            printWarningOnce(message)
+
+    @staticmethod
+    def clearCache():
+        SceneMetas.report.clear()
+
+
 # **************************************************************************************
 # **************************************************************************************
 class LDrawFile:
@@ -2061,45 +2393,65 @@ class LDrawFile:
     def __loadLDrawFile(self, filepath, isFullFilepath, parentFilepath):
         # Resolve full filepath if necessary
         fromArchive = False
+        lines = None
+        tokenized = None
         if isFullFilepath is False:
             if parentFilepath == "":
                 parentDir = os.path.dirname(filepath)
             else:
                 parentDir = os.path.dirname(parentFilepath)
-            result = FileSystem.locate(filepath, parentDir)
+            tokenized = TokenizedFiles.take(filepath, parentDir)
+            prefetched = PrefetchedFiles.take(filepath, parentDir) if tokenized is None else None
+            if tokenized is not None:
+                result = FileSystem.locate(filepath, parentDir)
+                lines = tokenized[0]
+            elif prefetched is not None and prefetched[0] is not None:
+                (result, lines) = prefetched
+            else:
+                result = FileSystem.locate(filepath, parentDir)
             if result is None:
-                # printWarningOnce("Missing file {0} in path {1}".format(filepath, parentDir))
-                printWarningOnce(f"Missing file {filepath}")
+                # Reported by CachedMissingFiles.printSummary() when loading completes
                 return False
             fromArchive = isinstance(result, (list))
             if fromArchive is True:
                 archiveLibrary = result[0]
                 filepath = result[1]
+                self.isLibraryFile = archiveLibrary != CachedLibraries.modelLibrary
             else:
                 filepath = result
+                self.isLibraryFile = Configure.isLibraryPath(filepath)
+                self.sourceMtime = LibraryFingerprint.file_mtime(filepath)
+
+            # A library file parsed by an earlier session is restored without reading it
+            if Options.useParseCache and self.isLibraryFile:
+                self.cacheKey = LDrawFile.__parseCacheKey(self.filename, self.isSubPart, result)
+                if self.cacheKey is not None and self.__restoreFromCache(filepath):
+                    return True
+        else:
+            tokenized = TokenizedFiles.take(filepath, None)
+            if tokenized is not None:
+                lines = tokenized[0]
+
+        if tokenized is not None:
+            self.tokens = tokenized[1]
 
         if os.path.splitext(filepath)[1] == ".io":
             # Check if the file is encrypted (password protected)
             is_encrypted = False
-            zf = zipfile.ZipFile(filepath)
-            for zinfo in zf.infolist():
-                is_encrypted |= zinfo.flag_bits & 0x1
+            with zipfile.ZipFile(filepath) as zf:
+                for zinfo in zf.infolist():
+                    is_encrypted |= zinfo.flag_bits & 0x1
             if is_encrypted:
                 ShowMessageBox("Oops, this .io file is password protected", "Password protected files are not supported", 'ERROR')
                 return False
 
-            # Get a temporary directory. Store the TemporaryDirectory object in Configure so it's scope lasts long enough
-            Configure.tempDir = tempfile.TemporaryDirectory()
-            directory_to_extract_to = Configure.tempDir.name
-
-            # Decompress to temporary directory
-            with zipfile.ZipFile(filepath, 'r') as zip_ref:
-                zip_ref.extractall(directory_to_extract_to)
+            # Read the model and its 'CustomParts' directly from the archive, which acts as a virtual search root
+            CachedLibraries.setModelCache(filepath)
+            fromArchive = True
+            archiveLibrary = CachedLibraries.modelLibrary
 
             # It's the 'model.ldr' file we want to use
-            filepath = os.path.join(directory_to_extract_to, "model.ldr")
-
-            # Add the subdirectories of the directory to the search paths, notably 'CustomParts' and it's subdirectories
+            filepath = "model.ldr"
 
             # Also add the Stud.io 'local' directory for its 'CustomParts' folder
             if Configure.isWindows:
@@ -2112,23 +2464,24 @@ class LDrawFile:
                 # No Stud.io for Linux
                 localDir = None
 
-            for direct in [directory_to_extract_to, localDir]:
-                if direct:
-                    Configure.appendUnofficialPath(os.path.join(direct, "CustomParts"))
-                    Configure.appendUnofficialPath(os.path.join(direct, "CustomParts", "parts"))
+            if localDir:
+                Configure.appendUnofficialPath(os.path.join(localDir, "CustomParts"))
+                Configure.appendUnofficialPath(os.path.join(localDir, "CustomParts", "parts"))
 
-                    if Options.resolution == "High":
-                        Configure.appendUnofficialPath(os.path.join(direct, "CustomParts", "p", "48"))
-                    elif Options.resolution == "Low":
-                        Configure.appendUnofficialPath(os.path.join(direct, "CustomParts", "p", "8"))
-                    Configure.appendUnofficialPath(os.path.join(direct, "CustomParts", "p"))
-                    Configure.appendUnofficialPath(os.path.join(direct, "CustomParts", "s"))
-                    Configure.appendUnofficialPath(os.path.join(direct, "CustomParts", "s", "s"))
+                if Options.resolution == "High":
+                    Configure.appendUnofficialPath(os.path.join(localDir, "CustomParts", "p", "48"))
+                elif Options.resolution == "Low":
+                    Configure.appendUnofficialPath(os.path.join(localDir, "CustomParts", "p", "8"))
+                Configure.appendUnofficialPath(os.path.join(localDir, "CustomParts", "p"))
+                Configure.appendUnofficialPath(os.path.join(localDir, "CustomParts", "s"))
+                Configure.appendUnofficialPath(os.path.join(localDir, "CustomParts", "s", "s"))
 
         self.fullFilepath = filepath
 
-        # Load text into local lines variable
-        if fromArchive is True:
+        # Load text into local lines variable, unless it was prefetched
+        if lines is not None:
+            pass
+        elif fromArchive is True:
             sio = CachedLibraries.getLibraryFile(filepath, library=archiveLibrary)
             lines = sio.splitlines()
         else:
@@ -2139,7 +2492,10 @@ class LDrawFile:
             lines = []
 
         # MPD files have separate sections between '0 FILE' and '0 NOFILE' lines.
-        # Split into sections between "0 FILE" and "0 NOFILE" lines
+        # Split into sections between "0 FILE" and "0 NOFILE" lines.
+        # Sections are views of one shared line buffer, only lines that start with '0' are split
+        # here and their tokens are kept for parsing the sections.
+        buffer = LineBuffer(lines)
         sections = []
 
         startLine = 0
@@ -2149,45 +2505,117 @@ class LDrawFile:
         foundEnd = False
 
         for line in lines:
-            parameters = line.strip().split()
-            if len(parameters) > 2:
-                if parameters[0] == "0" and parameters[1] == "FILE":
-                    if foundEnd is False:
+            if line.lstrip().startswith("0"):
+                parameters = buffer.tokens(lineCount)
+                if len(parameters) > 2:
+                    if parameters[0] == "0" and parameters[1] == "FILE":
+                        if foundEnd is False:
+                            endLine = lineCount
+                            if endLine > startLine:
+                                sections.append((sectionFilename, buffer.view(startLine, endLine)))
+
+                        startLine = lineCount
+                        foundEnd = False
+                        sectionFilename = " ".join(parameters[2:])
+
+                    if parameters[0] == "0" and parameters[1] == "NOFILE":
                         endLine = lineCount
-                        if endLine > startLine:
-                            sections.append((sectionFilename, lines[startLine:endLine]))
-
-                    startLine = lineCount
-                    foundEnd = False
-                    sectionFilename = " ".join(parameters[2:])
-
-                if parameters[0] == "0" and parameters[1] == "NOFILE":
-                    endLine = lineCount
-                    foundEnd = True
-                    sections.append((sectionFilename, lines[startLine:endLine]))
+                        foundEnd = True
+                        sections.append((sectionFilename, buffer.view(startLine, endLine)))
             lineCount += 1
 
         if foundEnd is False:
             endLine = lineCount
             if endLine > startLine:
-                sections.append((sectionFilename, lines[startLine:endLine]))
+                sections.append((sectionFilename, buffer.view(startLine, endLine)))
 
         if len(sections) == 0:
             return False
 
+        # Only single section files are written to the parse cache
+        if len(sections) > 1:
+            self.cacheKey = None
+
         # First section is the main one
         self.filename = sections[0][0]
         self.lines = sections[0][1]
 
-        # Remaining sections are loaded into the cached files
+        # The first section is always parsed again, since the root model's child matrices are rotated
+        ModelSections.getUnchanged(sections[0][0], sections[0][1])
+
+        # Remaining sections are loaded into the cached files, unless an incremental import can reuse them
         for (sectionFilename, lines) in sections[1:]:
             # Load section
-            file = LDrawFile(sectionFilename, False, filepath, lines, False)
+            file = ModelSections.getUnchanged(sectionFilename, lines)
+            if file is None:
+                file = LDrawFile(sectionFilename, False, filepath, lines, False, self.tokens)
+                ModelSections.keep(sectionFilename, file)
             assert file is not None
 
             # Cache section
             CachedFiles.addToCache(sectionFilename, file)
 
+        # Read the files referenced by all sections ahead of parsing them, unless they were tokenized
+        if tokenized is None:
+            PrefetchedFiles.prefetchReferences(sections, os.path.dirname(filepath))
+
+        return True
+
+    def __parseCacheKey(filename, isSubPart, result):
+        """ParseCache key of a located file, keyed by its source and the values that change how it is parsed"""
+
+        if isinstance(result, (list)):
+            source = CachedLibraries.librarySource(result[1], result[0])
+            if source is None:
+                return None
+            (archivePath, size, mtime) = source
+            source = (archivePath, result[1])
+        else:
+            try:
+                stat = os.stat(result)
+            except OSError:
+                return None
+            (source, size, mtime) = (result, stat.st_size, stat.st_mtime_ns)
+
+        return ParseCache.key("ImportLDraw", source, size, mtime, (filename, isSubPart, globalScaleFactor))
+
+    def __toRecord(self):
+        """The parsed file as built-in types for the ParseCache, child files are stored by name"""
+
+        geometry = self.geometry.toRecord()
+        if geometry is None:
+            return None
+
+        nodes = [(node.filename, node.colourName, tuple(value for row in node.matrix for value in row),
+                  node.bfcCull, node.bfcInverted, node.isLSynthPart, node.isSubPart, node.groupNames)
+                 for node in self.childNodes]
+        return ((self.isPart, self.isSubPart, self.isModel, self.isDoubleSided, self.bfcCertified), nodes, geometry)
+
+    def __restoreFromCache(self, filepath):
+        """Restores the file from its ParseCache record, returns False if there is no valid record"""
+
+        record = ParseCache.load(self.cacheKey)
+        if record is None:
+            return False
+
+        try:
+            (flags, nodes, geometry) = record
+            (isPart, isSubPart, isModel, isDoubleSided, bfcCertified) = flags
+            geometry = LDrawGeometry.fromRecord(geometry)
+            childNodes = [LDrawNode(filename, False, filepath, colourName,
+                                    mathutils.Matrix((matrix[0:4], matrix[4:8], matrix[8:12], matrix[12:16])),
+                                    bfcCull, bfcInverted, isLSynthPart, childIsSubPart, False, groupNames)
+                          for (filename, colourName, matrix, bfcCull, bfcInverted, isLSynthPart, childIsSubPart, groupNames) in nodes]
+        except (TypeError, ValueError):
+            return False
+
+        self.filename = filepath
+        self.fullFilepath = filepath
+        self.lines = []
+        (self.isPart, self.isSubPart, self.isModel, self.isDoubleSided, self.bfcCertified) = (isPart, isSubPart, isModel, isDoubleSided, bfcCertified)
+        self.geometry = geometry
+        self.childNodes = childNodes
+        self.isRestored = True
         return True
 
     def isStud(filename):
@@ -2233,7 +2661,7 @@ class LDrawFile:
 
         return name in ("logo3.dat", "logo4.dat", "logo5.dat", "logotente.dat")
 
-    def __init__(self, filename, isFullFilepath, parentFilepath, lines = None, isSubPart=False):
+    def __init__(self, filename, isFullFilepath, parentFilepath, lines = None, isSubPart=False, tokens=None):
         """Loads an LDraw file (IO, LDR, L3B, DAT or MPD)"""
 
         global globalCamerasToAdd
@@ -2248,20 +2676,29 @@ class LDrawFile:
         self.isStud           = LDrawFile.isStud(filename)
         self.isStudLogo       = LDrawFile.isStudLogo(filename)
         self.isLSynthPart     = False
+        self.isLibraryFile    = False
+        self.sourceMtime      = None
         self.isDoubleSided    = False
         self.geometry         = LDrawGeometry()
         self.childNodes       = []
         self.bfcCertified     = None
+        self.cacheKey         = None
+        self.isRestored       = False
+        self.addedSceneItems  = False       # Added cameras or lights to the scene while parsing
+        self.tokens           = tokens      # Lines tokenized by TokenizedFiles, which are not split again
 
         isGrainySlopeAllowed = not self.isStud
 
         if self.lines is None:
-            # Load the file into self.lines
+            # Load the file into self.lines, or restore it from the parse cache
             if not self.__loadLDrawFile(self.filename, isFullFilepath, parentFilepath):
                 return
+            if self.isRestored:
+                return
         else:
             # We are loading a section of our parent document, so full filepath is that of the parent
             self.fullFilepath = parentFilepath
+            self.lines = LineView.of(self.lines)
 
         # BFC = Back face culling. The rules are arcane and complex, but at least
         #       it's kind of documented: http://www.ldraw.org/article/415.html
@@ -2275,18 +2712,28 @@ class LDrawFile:
 
         currentGroupNames = []
 
+        # Cameras and lights are added to the scene while parsing, so files that have them are not cached
+        sceneItemCount = len(globalCamerasToAdd) + len(globalLightsToAdd)
+
         #debugPrint("Processing file {0}, isSubPart = {1}, found {2} lines".format(self.filename, self.isSubPart, len(self.lines)))
 
-        for line in self.lines:
-            parameters = line.strip().split()
+        # Lines were split at most once by the MPD section scan, their tokens are shared so they are not modified
+        buffer = self.lines.buffer
+        for lineIndex in self.lines.indexes():
+            line = buffer.lines[lineIndex]
+            tokenized = self.tokens.get(line) if self.tokens is not None else None
+            if tokenized is not None:
+                parameters = [tokenized[0], tokenized[1], "", "", "", "", "", "", ""]
+            else:
+                parameters = buffer.tokens(lineIndex)
 
             # Skip empty lines
             if len(parameters) == 0:
                 continue
 
             # Pad with empty values to simplify parsing code
-            while len(parameters) < 9:
-                parameters.append("")
+            if len(parameters) < 9:
+                parameters = parameters + [""] * (9 - len(parameters))
 
             # Parse LDraw comments (some of which have special significance)
             if parameters[0] == "0":
@@ -2339,153 +2786,20 @@ class LDrawFile:
                             currentGroupNames.pop(-1)
                     if parameters[2] == "CAMERA":
                         if Options.importCameras:
-                            parameters = parameters[3:]
-                            while len(parameters) > 0:
-                                if parameters[0] == "LATITUDE":
-                                    camera.latitude = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "LONGITUDE":
-                                    camera.longitude = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "DISTANCE":
-                                    camera.distance = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "FOV":
-                                    camera.fov_degrees = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "ZNEAR":
-                                    camera.near = globalScaleFactor * float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "ZFAR":
-                                    camera.far = globalScaleFactor * float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "POSITION":
-                                    if processingLPubMeta:
-                                        # Convert transform from LDraw to Blender, switch Z and Y axis with -Z in the up direction
-                                        camera.position = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[3]), -float(parameters[2])))
-                                    else:
-                                        camera.position = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[2]), float(parameters[3])))
-                                    parameters = parameters[4:]
-                                elif parameters[0] == "TARGET_POSITION":
-                                    if processingLPubMeta:
-                                        # Convert transform from LDraw to Blender, switch Z and Y axis with -Z in the up direction
-                                        camera.target_position = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[3]), -float(parameters[2])))
-                                    else:
-                                        camera.target_position = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[2]), float(parameters[3])))
-                                    parameters = parameters[4:]
-                                elif parameters[0] == "UP_VECTOR":
-                                    if processingLPubMeta:
-                                        # Convert transform from LDraw to Blender, switch Z and Y axis with -Z in the up direction
-                                        camera.up_vector = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[3]), -float(parameters[2])))     
-                                    else:
-                                        camera.up_vector = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[2]), float(parameters[3])))
-                                    parameters = parameters[4:]
-                                elif parameters[0] == "ORTHOGRAPHIC":
-                                    camera.orthographic = True
-                                    parameters = parameters[1:]
-                                elif parameters[0] == "HIDDEN":
-                                    camera.hidden = True
-                                    parameters = parameters[1:]
-                                elif parameters[0] == "NAME":
-                                    camera.name = "Imported {0}".format(line.split(" NAME ", 1)[1].strip())
-
-                                    globalCamerasToAdd.append(camera)
-                                    camera = LDrawCamera()
-
-                                    # By definition this is the last of the parameters
-                                    parameters = []
-                                else:
-                                    parameters = parameters[1:]
+                            name = SceneMetas.apply(meta_parser.CAMERA, camera, parameters, line, processingLPubMeta)
+                            if name is not None:
+                                camera.name = "Imported {0}".format(name)
+
+                                globalCamerasToAdd.append(camera)
+                                camera = LDrawCamera()
                     elif parameters[2] == "LIGHT":
                         if Options.importLights:
-                            parameters = parameters[3:]
-                            while len(parameters) > 0:
-                                if parameters[0] == "POSITION":
-                                    if processingLPubMeta:
-                                        # Convert transform from LDraw to Blender, switch Z and Y axis with -Z in the up direction
-                                        light.position = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[3]), -float(parameters[2])))
-                                    else:
-                                        light.position = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[2]), float(parameters[3])))
-                                    parameters = parameters[4:]
-                                elif parameters[0] == "TARGET_POSITION":
-                                    if processingLPubMeta:
-                                        # Convert transform from LDraw to Blender, switch Z and Y axis with -Z in the up direction
-                                        light.target_position = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[3]), -float(parameters[2])))
-                                    else:                                    
-                                        light.target_position = Math.scaleMatrix @ mathutils.Vector(
-                                            (float(parameters[1]), float(parameters[2]), float(parameters[3])))
-                                    parameters = parameters[4:]
-                                elif parameters[0] == "ROTATION":
-                                    (x1, y1, z1, x2, y2, z2, x3, y3, z3) = map(float, parameters[1:10])
-                                    light.rotation = mathutils.Matrix(((x1, y1, z1), (x2, y2, z2), (x3, y3, z3)))
-                                    parameters = parameters[10:]
-                                elif parameters[0] == "COLOR" or parameters[0] == "COLOR_RGB":
-                                    light.color = mathutils.Vector(
-                                        (float(parameters[1]), float(parameters[2]), float(parameters[3])))
-                                    parameters = parameters[4:]
-                                elif parameters[0] == "BLENDER_POWER" or parameters[0] == "POWER" or parameters[0] == "STRENGTH":
-                                    light.exponent = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "BLENDER_SUN_ANGLE" or parameters[0] == "BLENDER_ANGLE" or parameters[0] == "BLENDER_DIRECTIONAL_ANGLE" or parameters[0] == "ANGLE":
-                                    light.sun_angle = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "BLENDER_RADIUS" or parameters[0] == "BLENDER_POINT_RADIUS" or parameters[0] == "BLENDER_SPOT_RADIUS" or parameters[0] == "RADIUS":
-                                    light.shadow_radius = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "SPOT_CONE_ANGLE" or parameters[0] == "SPOT_SIZE":
-                                    light.spot_size = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "SPOT_BLEND":
-                                    light.spot_blend = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "SPOT_PENUMBRA_ANGLE":
-                                    penumbra_angle = float(parameters[1])
-                                    if penumbra_angle > 0:
-                                        light.spot_blend = penumbra_angle / light.spot_size
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "AREA_SIZE_X" or parameters[0] == "AREA_SIZE" or parameters[0] == "SIZE" or parameters[0] == "WIDTH":
-                                    light.area_size = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "AREA_SIZE_Y" or parameters[0] == "HEIGHT":
-                                    light.area_size_y = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "AREA_SHAPE" or parameters[0] == "SHAPE":
-                                    light.shape = parameters[1].upper().strip()
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "BLENDER_SPECULAR" or parameters[0] == "SPECULAR":
-                                    light.specular = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "BLENDER_CUTOFF_DISTANCE" or parameters[0] == "CUTOFF_DISTANCE":
-                                    light.use_cutoff = True
-                                    light.cutoff_distance = float(parameters[1])
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "SHADOWLESS":
-                                    light.use_shadow = False
-                                    parameters = parameters[1:]
-                                elif parameters[0] == "TYPE":
-                                    light.type = parameters[1].upper().strip()
-                                    if light.type == "DIRECTIONAL":
-                                        light.type = "SUN"
-                                    parameters = parameters[2:]
-                                elif parameters[0] == "NAME":
-                                    light.name = "Imported {0}".format(line.split(" NAME ", 1)[1].strip())
-
-                                    globalLightsToAdd.append(light)
-                                    light = LDrawLight()
-
-                                    # By definition this is the last of the light parameters
-                                    parameters = []
-                                else:
-                                    parameters = parameters[1:]
+                            name = SceneMetas.apply(meta_parser.LIGHT, light, parameters, line, processingLPubMeta)
+                            if name is not None:
+                                light.name = "Imported {0}".format(name)
+
+                                globalLightsToAdd.append(light)
+                                light = LDrawLight()
             else:
                 if self.bfcCertified is None:
                     self.bfcCertified = False
@@ -2494,11 +2808,15 @@ class LDrawFile:
 
                 # Parse a File reference
                 if parameters[0] == "1":
-                    (x, y, z, a, b, c, d, e, f, g, h, i) = map(float, parameters[2:14])
+                    if tokenized is not None:
+                        (x, y, z, a, b, c, d, e, f, g, h, i) = tokenized[2]
+                        new_filename = " ".join(tokenized[3].split())
+                    else:
+                        (x, y, z, a, b, c, d, e, f, g, h, i) = map(float, parameters[2:14])
+                        new_filename = " ".join(parameters[14:])
                     (x, y, z) = Math.scaleMatrix @ mathutils.Vector((x, y, z))
                     localMatrix = mathutils.Matrix( ((a, b, c, x), (d, e, f, y), (g, h, i, z), (0, 0, 0, 1)) )
 
-                    new_filename = " ".join(parameters[14:])
                     new_colourName = parameters[1]
 
                     det = localMatrix.determinant()
@@ -2514,7 +2832,7 @@ class LDrawFile:
 
                 # Parse an edge
                 elif parameters[0] == "2":
-                    self.geometry.parseEdge(parameters)
+                    self.geometry.parseEdge(parameters, tokenized[2] if tokenized is not None else None)
 
                 # Parse a Face (either a triangle or a quadrilateral)
                 elif parameters[0] == "3" or parameters[0] == "4":
@@ -2524,12 +2842,20 @@ class LDrawFile:
                         printWarningOnce("Found double-sided polygons in file {0}".format(self.filename))
                         self.isDoubleSided = True
 
-                    assert len(self.geometry.faces) == len(self.geometry.faceInfo)
-                    self.geometry.parseFace(parameters, self.bfcCertified and bfcLocalCull, bfcWindingCCW, isGrainySlopeAllowed)
-                    assert len(self.geometry.faces) == len(self.geometry.faceInfo)
+                    self.geometry.parseFace(parameters, self.bfcCertified and bfcLocalCull, bfcWindingCCW, isGrainySlopeAllowed,
+                                            tokenized[2] if tokenized is not None else None)
 
                 bfcInvertNext = False
 
+        self.geometry.finalize()
+        self.tokens = None
+
+        self.addedSceneItems = sceneItemCount != len(globalCamerasToAdd) + len(globalLightsToAdd)
+        if self.cacheKey is not None and not self.isModel and not self.addedSceneItems:
+            record = self.__toRecord()
+            if record is not None:
+                ParseCache.store(self.cacheKey, record)
+
         #debugPrint("File {0} is part = {1}, is subPart = {2}, isModel = {3}".format(filename, self.isPart, isSubPart, self.isModel))
 
 
@@ -3049,15 +3375,17 @@ class BlenderMaterials:
 
     # **********************************************************************************
     def getMaterial(colourName, isSlopeMaterial):
+        # If it's already in the cache, use that. The cache is keyed by the colour token ID,
+        # so no name is formatted for the faces of materials that already exist
+        key = (globalTokens.id(colourName), isSlopeMaterial)
+        if (key in BlenderMaterials.__material_list):
+            result = BlenderMaterials.__material_list[key]
+            return result
+
         pureColourName = colourName
         if isSlopeMaterial:
             colourName = colourName + "_s"
 
-        # If it's already in the cache, use that
-        if (colourName in BlenderMaterials.__material_list):
-            result = BlenderMaterials.__material_list[colourName]
-            return result
-
         # Create a name for the material based on the colour
         if Options.instructionsLook:
             blenderName = "MatInst_{0}".format(colourName)
@@ -3079,7 +3407,7 @@ class BlenderMaterials:
             printWarningOnce("Could not create material for blenderName {0}".format(blenderName))
 
         # Add material to cache
-        BlenderMaterials.__material_list[colourName] = material
+        BlenderMaterials.__material_list[key] = material
         return material
 
     # **********************************************************************************
@@ -3980,7 +4308,7 @@ class BlenderMaterials:
 
 # **************************************************************************************
 def addSharpEdges(bm, ob, geometry, filename):
-    if geometry.edges:
+    if len(geometry.arrays.edges):
         global globalScaleFactor
         epsilon = 1 * globalScaleFactor
 
@@ -3996,7 +4324,7 @@ def addSharpEdges(bm, ob, geometry, filename):
 
         # Create edgeIndices dictionary, which is the list of edges as pairs of indicies into our bm.verts array
         edgeIndices = {}
-        for ind, geomEdge in enumerate(geometry.edges):
+        for ind, geomEdge in enumerate(geometry.arrays.edges.tolist()):
             # Find index of nearest points in bm.verts to geomEdge[0] and geomEdge[1]
             edges0 = [index for (co, index, dist) in kd.find_range(geomEdge[0], epsilon)]
             edges1 = [index for (co, index, dist) in kd.find_range(geomEdge[1], epsilon)]
@@ -4116,7 +4444,7 @@ def addSharpEdges(bm, ob, geometry, filename):
         bm.edges.ensure_lookup_table()
 
 # **************************************************************************************
-def meshIsReusable(meshName, geometry):
+def meshIsReusable(meshName, faceCount):
     meshExists = meshName in bpy.data.meshes
     #debugPrint("meshIsReusable says {0} exists = {1}.".format(meshName, meshExists))
     if meshExists and not Options.overwriteExistingMeshes:
@@ -4126,7 +4454,7 @@ def meshIsReusable(meshName, geometry):
         # A mesh loses it's materials information when it is no longer in use.
         # We must check the number of faces matches, otherwise we can't re-set the
         # materials.
-        if mesh.users == 0 and (len(mesh.polygons) != len(geometry.faces)):
+        if mesh.users == 0 and (len(mesh.polygons) != faceCount):
             #debugPrint("meshIsReusable says no users and num faces changed.")
             return False
 
@@ -4430,53 +4758,114 @@ def slopeAnglesForPart(partName):
     return None
 
 # **************************************************************************************
-def isSlopeFace(slopeAngles, isGrainySlopeAllowed, faceVertices):
+def slopeFaces(slopeAngles, arrays, faces):
     """
-    Checks whether a given face should receive a grainy slope material.
+    Checks which of the faces of arrays should receive a grainy slope material.
     """
 
     # Step 1: Ignore some faces (studs) when checking for a grainy face
-    if not isGrainySlopeAllowed:
-        return False
+    isGrainySlopeAllowed = (arrays.flags[faces] & FaceInfo.grainySlopeFlag) != 0
 
     # Step 2: Calculate angle of face normal to the ground
-    faceNormal = (faceVertices[1] - faceVertices[0]).cross(faceVertices[2]-faceVertices[0])
-    faceNormal.normalize()
+    starts = arrays.offsets[faces]
+    vertices = arrays.vertices
+    faceNormals = np.cross(vertices[starts + 1] - vertices[starts], vertices[starts + 2] - vertices[starts])
+    lengths = np.linalg.norm(faceNormals, axis=1)
 
     # Clamp value to range -1 to 1 (ensure we are in the strict range of the acos function, taking account of rounding errors)
-    cosine = min(max(faceNormal.y, -1.0), 1.0)
+    cosines = np.divide(faceNormals[:, 1], lengths, out=np.zeros(len(lengths)), where=lengths > 0)
+    cosines = np.clip(cosines, -1.0, 1.0)
 
     # Calculate angle of face normal to the ground (-90 to 90 degrees)
-    angleToGroundDegrees = math.degrees(math.acos(cosine)) - 90
-
-    # debugPrint("Angle to ground {0}".format(angleToGroundDegrees))
+    anglesToGroundDegrees = np.degrees(np.arccos(cosines)) - 90
 
     # Step 3: Check angle of normal to ground is within one of the acceptable ranges for this part
-    return any(c[0] <= angleToGroundDegrees <= c[1] for c in slopeAngles)
+    isSlope = np.zeros(len(lengths), dtype=bool)
+    for c in slopeAngles:
+        isSlope |= (c[0] <= anglesToGroundDegrees) & (anglesToGroundDegrees <= c[1])
+    return isSlope & isGrainySlopeAllowed
+
+# **************************************************************************************
+def assignMaterials(name, mesh, geometry, welded, materialIndices):
+    """
+    Sets the material index of each welded face in materialIndices, adding the materials to the mesh.
+    The material and slot of each distinct colour and slope are found once per mesh.
+    """
+
+    faces = welded.faces
+    slopeAngles = slopeAnglesForPart(name)
+    if slopeAngles is not None:
+        isSlopeMaterials = slopeFaces(slopeAngles, geometry.arrays, faces).tolist()
+    else:
+        isSlopeMaterials = [False] * len(faces)
+
+    colours = geometry.arrays.colours
+    slots = {}
+    for i, (faceIndex, isSlopeMaterial) in enumerate(zip(faces.tolist(), isSlopeMaterials)):
+        key = (colours[faceIndex], isSlopeMaterial)
+        if key not in slots:
+            faceColour = geometry.faceColour(key[0])
+            # For debugging purposes, we can make sloped faces blue:
+            # if isSlopeMaterial:
+            #     faceColour = "1"
+            material = BlenderMaterials.getMaterial(faceColour, isSlopeMaterial)
+
+            if material is not None:
+                if mesh.materials.get(material.name) is None:
+                    mesh.materials.append(material)
+                slots[key] = mesh.materials.find(material.name)
+            else:
+                printWarningOnce("Could not find material '{0}' in mesh '{1}'.".format(faceColour, name))
+                slots[key] = None
+
+        # Faces without a material keep their material index
+        slot = slots[key]
+        if slot is not None:
+            materialIndices[i] = slot
+    return materialIndices
 
 # **************************************************************************************
-def createMesh(name, meshName, geometry):
+def createMesh(name, meshName, geometry, weldDistance=None):
     # Are there any points?
-    if not geometry.points:
+    if not len(geometry.arrays.vertices):
         return (None, False)
 
     newMeshCreated = False
 
+    # The mesh of a changed section is not reused
+    ModelSections.releaseMesh(name, meshName)
+
     # Have we already cached this mesh?
     if Options.createInstances and hasattr(geometry, 'mesh'):
         mesh = geometry.mesh
     else:
+        # Weld the vertices within weldDistance before Blender sees the faces,
+        # faces that collapse or repeat another face are dropped
+        welded = geometry.welded(weldDistance)
+
         # Does this mesh already exist in Blender?
-        if meshIsReusable(meshName, geometry):
+        if meshIsReusable(meshName, len(welded)):
             mesh = bpy.data.meshes[meshName]
+
+            # Create materials and assign material to each polygon
+            if mesh.users == 0:
+                assert len(mesh.polygons) == len(welded)
+
+                materialIndices = [0] * len(mesh.polygons)
+                mesh.polygons.foreach_get("material_index", materialIndices)
+                mesh.polygons.foreach_set("material_index", assignMaterials(name, mesh, geometry, welded, materialIndices))
         else:
             # Create new mesh
             # debugPrint("Creating Mesh for node {0}".format(node.filename))
             mesh = bpy.data.meshes.new(meshName)
 
-            points = [p.to_tuple() for p in geometry.points]
-
-            mesh.from_pydata(points, [], geometry.faces)
+            # Create materials and fill the mesh from the welded arrays in bulk, as mesh.from_pydata would.
+            # The material indices are set with the faces, so a face that validate removes takes its index with it
+            materialIndices = assignMaterials(name, mesh, geometry, welded, [0] * len(welded))
+            mesh_builder.build_mesh(mesh, welded.vertices, welded.offsets, loops=welded.loops,
+                                    material_indices=materialIndices,
+                                    loop_totals=bpy.app.version < (4, 0, 0))
+            mesh.update(calc_edges=True)
 
             mesh.validate()
             mesh.update()
@@ -4487,29 +4876,6 @@ def createMesh(name, meshName, geometry):
 
             newMeshCreated = True
 
-        # Create materials and assign material to each polygon
-        if mesh.users == 0:
-            assert len(mesh.polygons) == len(geometry.faces)
-            assert len(geometry.faces) == len(geometry.faceInfo)
-
-            slopeAngles = slopeAnglesForPart(name)
-            isSloped = slopeAngles is not None
-            for i, f in enumerate(mesh.polygons):
-                faceInfo = geometry.faceInfo[i]
-                isSlopeMaterial = isSloped and isSlopeFace(slopeAngles, faceInfo.isGrainySlopeAllowed, [geometry.points[j] for j in geometry.faces[i]])
-                faceColour = faceInfo.faceColour
-                # For debugging purposes, we can make sloped faces blue:
-                # if isSlopeMaterial:
-                #     faceColour = "1"
-                material = BlenderMaterials.getMaterial(faceColour, isSlopeMaterial)
-
-                if material is not None:
-                    if mesh.materials.get(material.name) is None:
-                        mesh.materials.append(material)
-                    f.material_index = mesh.materials.find(material.name)
-                else:
-                    printWarningOnce("Could not find material '{0}' in mesh '{1}'.".format(faceColour, name))
-
     # Cache mesh
     if newMeshCreated:
         geometry.mesh = mesh
@@ -4594,7 +4960,13 @@ def createBlenderObjectsFromNode(node,
     if node.isBlenderObjectNode():
         ourColourName = LDrawNode.resolveColour(node.colourName, realColourName)
         meshName, geometry = node.getBlenderGeometry(ourColourName, name)
-        mesh, newMeshCreated = createMesh(name, meshName, geometry)
+
+        # Remove doubles
+        # Note: The vertices were welded in bmesh scaled up by 1000, since remove_doubles
+        # doesn't work properly with a low distance value, so the distance is scaled down
+        keepDoubleSided = node.file.isDoubleSided and (Options.resolveAmbiguousNormals == "double")
+        weldDistance = globalWeldDistance / 1000 if Options.removeDoubles and not keepDoubleSided else None
+        mesh, newMeshCreated = createMesh(name, meshName, geometry, weldDistance)
 
         # Format a name for the Blender Object
         if Options.numberNodes:
@@ -4647,8 +5019,8 @@ def createBlenderObjectsFromNode(node,
         # Mark object as transparent if any polygon is transparent
         ob["Lego.isTransparent"] = False
         if mesh is not None:
-            for faceInfo in geometry.faceInfo:
-                material = BlenderMaterials.getMaterial(faceInfo.faceColour, False)
+            for faceColour in {geometry.faceColour(colourName) for colourName in set(geometry.arrays.colours)}:
+                material = BlenderMaterials.getMaterial(faceColour, False)
                 if material is not None:
                     if "Lego.isTransparent" in material:
                         if material["Lego.isTransparent"]:
@@ -4682,8 +5054,6 @@ def createBlenderObjectsFromNode(node,
         if newMeshCreated:
             # Calculate what we need to do next
             recalculateNormals = node.file.isDoubleSided and (Options.resolveAmbiguousNormals == "guess")
-            keepDoubleSided    = node.file.isDoubleSided and (Options.resolveAmbiguousNormals == "double")
-            removeDoubles      = Options.removeDoubles and not keepDoubleSided
 
             bm = bmesh.new()
             bm.from_mesh(ob.data)
@@ -4691,18 +5061,6 @@ def createBlenderObjectsFromNode(node,
             bm.verts.ensure_lookup_table()
             bm.edges.ensure_lookup_table()
 
-            # Remove doubles
-            # Note: This doesn't work properly with a low distance value
-            # So we scale up the vertices beforehand and scale them down afterwards
-            for v in bm.verts:
-                v.co = v.co * 1000
-
-            if removeDoubles:
-                bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=globalWeldDistance)
-
-            for v in bm.verts:
-                v.co = v.co / 1000
-
             # Recalculate normals
             if recalculateNormals:
                 bmesh.ops.recalc_face_normals(bm, faces=bm.faces[:])
@@ -5358,6 +5716,10 @@ def loadFromFile(context, filename, isFullFilepath=True):
     globalLightsToAdd = []
     globalContext = context
 
+    # Directory listings are checked against their mtime again for this import
+    PathIndex.begin_session()
+    ResolverStats.reset()
+
     # Make sure we have the latest configuration, including the latest ldraw directory
     # and the colours derived from that.
     Configure()
@@ -5371,9 +5733,20 @@ def loadFromFile(context, filename, isFullFilepath=True):
     Math()
 
     # Clear caches
-    CachedDirectoryFilenames.clearCache()
-    CachedFiles.clearCache()
-    CachedGeometry.clearCache()
+    CachedMissingFiles.clearCache()
+    CachedLibraries.clearModelCache()
+    PrefetchedFiles.clearCache()
+    TokenizedFiles.clearCache()
+    SceneMetas.clearCache()
+    ModelSections.begin(filename)
+    if CachedFiles.fingerprint.update(Configure.libraryFingerprint(filename)):
+        CachedFiles.clearCache()
+        CachedGeometry.clearCache()
+        ModelSections.clearCache()
+    else:
+        debugPrint("Library unchanged, keeping cached library files")
+        CachedFiles.clearModelFiles()
+        CachedGeometry.clearModelGeometry()
     BlenderMaterials.clearCache()
     Configure.warningSuppression = {}
 
@@ -5396,8 +5769,15 @@ def loadFromFile(context, filename, isFullFilepath=True):
     filename = os.path.expanduser(filename)
 
     debugPrint("Loading LDraw part files")
+    if isFullFilepath:
+        TokenizedFiles.tokenizeModel(filename)
     node = LDrawNode(filename, isFullFilepath, os.path.dirname(filename))
     node.load()
+    ModelSections.finish()
+    PathIndex.save()
+    debugPrint("Library {0}".format(ResolverStats.summary()))
+    CachedMissingFiles.printSummary()
+    SceneMetas.printSummary()
     # node.printBFC()
 
     if node.file.isModel:
@@ -5429,6 +5809,7 @@ def loadFromFile(context, filename, isFullFilepath=True):
     # Create Blender objects from the loaded file
     debugPrint("Creating Blender objects")
     rootOb = createBlenderObjectsFromNode(node, node.matrix, name)
+    ModelSections.removeReleasedMeshes()
 
     if not node.file.isModel:
         if rootOb.data:
@@ -5629,9 +6010,10 @@ def loadFromFile(context, filename, isFullFilepath=True):
     else:
         setupRealisticLook()
 
-    # Delete the temporary directory if there was one
-    if Configure.tempDir:
-        Configure.tempDir.cleanup()
+    # Close the Stud.io model archive if there was one
+    CachedLibraries.clearModelCache()
+    PrefetchedFiles.clearCache()
+    TokenizedFiles.clearCache()
 
     ldrawLoadElapsed = time.time() - startTime
     ldrawModelLoaded = True
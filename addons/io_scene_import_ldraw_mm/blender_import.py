@@ -48,13 +48,26 @@ def do_import(filepath, color_code="16", return_mesh=False):
     __scene_setup()
 
     FileSystem.build_search_paths(parent_filepath=filepath)
+    # _*_lp_lc_mod
+    LDrawFile.validate_caches()
+    # _*_mod_end
     LDrawFile.read_color_table()
     BlenderMaterials.create_blender_node_groups()
 
+    # _*_lp_lc_mod
+    LDrawFile.begin_sections(filepath)
+    LDrawFile.tokenize_model(filepath)
+    # _*_mod_end
     ldraw_file = LDrawFile.get_file(filepath)
     if ldraw_file is None:
+        FileSystem.report_missing_files()
         return
 
+    # _*_lp_lc_mod
+    if FileSystem.incremental_import:
+        __release_changed_meshes()
+    # _*_mod_end
+
     if ldraw_file.is_configuration():
         __load_materials(ldraw_file)
         return
@@ -68,6 +81,14 @@ def do_import(filepath, color_code="16", return_mesh=False):
 
     # return root_node.load()
     obj = root_node.load(color_code=color_code, return_mesh=return_mesh)
+    FileSystem.report_missing_files()
+    # _*_lp_lc_mod
+    if FileSystem.incremental_import:
+        __remove_released_meshes()
+    # _*_mod_end
+    # _*_lp_lc_mod
+    ldraw_meta.report_scene_metas()
+    # _*_mod_end
 
     # s = {str(k): v for k, v in sorted(LDrawNode.geometry_datas2.items(), key=lambda ele: ele[1], reverse=True)}
     # helpers.write_json("gs2.json", s, indent=4)
@@ -254,6 +275,27 @@ def __unlink_from_scene(obj):
         bpy.context.collection.objects.unlink(obj)
 # _*_mod_end
 
+# _*_lp_lc_mod
+# meshes are reused by name, so the meshes of the sections that changed since the previous import
+# are renamed out of the way and built again, the objects of the previous import keep them
+def __release_changed_meshes():
+    names = LDrawFile.changed_section_names()
+    if not names:
+        return
+    for mesh in list(bpy.data.meshes):
+        filename = mesh.get(strings.ldraw_filename_key)
+        if filename is not None and filename.lower() in names and "_previous" not in mesh.name:
+            mesh.name = f"{mesh.name}_previous"
+
+
+# the released meshes that no object uses any more, once the objects of this import are created
+def __remove_released_meshes():
+    for mesh in list(bpy.data.meshes):
+        if mesh.users == 0 and "_previous" in mesh.name and mesh.get(strings.ldraw_filename_key) is not None:
+            bpy.data.meshes.remove(mesh)
+# _*_mod_end
+
+
 def __load_materials(file):
     ImportOptions.meta_group = False
     ImportOptions.parent_to_empty = False
@@ -1,11 +1,10 @@
 import os
 import string
-import glob
 from sys import platform
 from pathlib import Path
 # _*_lp_lc_mod
 from . import helpers
-import zipfile
+from io_scene_render_ldraw.ldrawlibrary.resolver import LibraryArchives, PathIndex, ResolverStats, locate_file
 # _*_mod_end
 import tempfile
 
@@ -160,6 +159,18 @@ class FileSystem:
 
     defaults["use_archive_library"] = False
     use_archive_library = defaults["use_archive_library"]
+
+    # parsed library files are kept in the shared on-disk ParseCache
+    defaults["use_parse_cache"] = False
+    use_parse_cache = defaults["use_parse_cache"]
+
+    # the files a model references are tokenized by the shared ParsePool worker processes
+    defaults["use_parse_pool"] = False
+    use_parse_pool = defaults["use_parse_pool"]
+
+    # the unchanged mpd sections of the previous import of the same model are reused, see SectionHistory
+    defaults["incremental_import"] = False
+    incremental_import = defaults["incremental_import"]
     # _*_mod_end
 
     resolution_choices = (
@@ -177,13 +188,28 @@ class FileSystem:
 
     search_dirs = []
     lowercase_paths = {}
+    # unresolvable filenames and how often each was referenced this session
+    missing_files = {}
 
     # _*_lp_lc_mod
     @staticmethod
     def reset_caches():
         FileSystem.search_dirs.clear()
         FileSystem.lowercase_paths.clear()
+        FileSystem.missing_files.clear()
         FileSystem.clear_archives()
+        PathIndex.begin_session()
+        ResolverStats.reset()
+
+    @classmethod
+    def report_missing_files(cls):
+        helpers.render_print(f"Library {ResolverStats.summary()}")
+        if not cls.missing_files:
+            return
+        references = sum(cls.missing_files.values())
+        helpers.render_print(f"missing {len(cls.missing_files)} file(s), {references} reference(s):", True)
+        for filename, count in sorted(cls.missing_files.items(), key=lambda item: (-item[1], item[0])):
+            helpers.render_print(f"  {filename} ({count})", True)
 
     @staticmethod
     def get_basename(filename):
@@ -239,146 +265,45 @@ class FileSystem:
 
         return lgeo_colours
     
-    # Cached dictionary of LDraw archive library objects
+    # LDraw archive libraries, shared with the legacy importer through LibraryArchives
     # **************************************************************************************
 
     # List of archive library file paths
     archive_search_paths  = []
 
-    # List of loaded archive library names
-    __archive_names       = []
-    
-    # Dictionary list - holds populated archives
-    __archives            = []
-
-    # Library Dictionaries
-    __official_archive    = {}
-    __unofficial_archive  = {}
-
-    archive_not_found     = -2
-    all_libraries         = -1
-    official_library      = 0
-    unofficial_library    = 1
+    archive_not_found     = LibraryArchives.not_found
+    all_libraries         = LibraryArchives.all_libraries
+    official_library      = LibraryArchives.official_library
+    unofficial_library    = LibraryArchives.unofficial_library
 
-    is_initial_update      = True
-    has_official_archive   = False
-    has_unofficial_archive = False
     have_archive_libraries = False
 
     @staticmethod
     def loaded_archives():
-        return FileSystem.__archive_names
+        return LibraryArchives.paths()
 
     @staticmethod
     def clear_archives():
-        FileSystem.has_official_archive = False
-        FileSystem.has_unofficial_archive = False
         FileSystem.have_archive_libraries = False
-        FileSystem.is_initial_update = True
-        FileSystem.__official_archive = {}
-        FileSystem.__unofficial_archive = {}
+        LibraryArchives.clear()
         del FileSystem.archive_search_paths[:]
-        del FileSystem.__archive_names[:]
-        del FileSystem.__archives[:]
-        
-    @staticmethod
-    def get_encoding(bin_io_slice):
-        # The file uses UCS-2 (UTF-16) Big Endian encoding
-        if bin_io_slice == b'\xfe\xff\x00':
-            return "utf_16_be"
-        # The file uses UCS-2 (UTF-16) Little Endian
-        elif bin_io_slice == b'\xff\xfe0':
-            return "utf_16_le"
-        # Use LDraw model standard UTF-8
-        else:
-            return "utf_8"
 
     @classmethod
     def archive_file_exists(cls, key):
-        if key in cls.__official_archive:
-            return cls.official_library
-        elif key in cls.__unofficial_archive:
-            return cls.unofficial_library
-        else:
-            return cls.archive_not_found
+        return LibraryArchives.file_exists(key)
 
+    # returns (archive path, size, mtime) of the archive library that holds key, or None
     @classmethod
-    def get_archive(cls, key, library=all_libraries):
-        if library != cls.all_libraries:
-            if key in cls.__archives[library]:
-                bin_io = cls.__archives[library][key]
-                encoding = cls.get_encoding(bin_io[:3])
-                return bin_io.decode(encoding)
-            else:
-                return None
-        elif cls.prefer_unofficial:
-            library = cls.unofficial_library
-            if key not in cls.__archives[library]:
-                library = cls.official_library
-                if key not in cls.__archives[library]:
-                    return None
-            bin_io = cls.__archives[library][key]
-            encoding = cls.get_encoding(bin_io[:3])
-            return bin_io.decode(encoding)
-        else:
-            for library in cls.__archives:
-                if key in library:
-                    bin_io = library[key]
-                    encoding = cls.get_encoding(bin_io[:3])
-                    return bin_io.decode(encoding)
-                else:
-                    return None
+    def archive_source(cls, key, library):
+        return LibraryArchives.source(key, library)
 
     @classmethod
-    def set_official_archive(cls, archive_name, library):
-        cls.__official_archive = {key.lower(): library.read(key) for key in library.namelist()}
-        cls.__archives.append(cls.__official_archive)
-        cls.__archive_names.append(archive_name)
-        cls.has_official_archive = True
-        helpers.render_print(f"Load official archive library: {archive_name}")
-    
-    @classmethod
-    def set_unofficial_archive(cls, archive_name, library):
-        cls.__unofficial_archive = {key.lower(): library.read(key) for key in library.namelist()}
-        cls.__archives.append(cls.__unofficial_archive)
-        cls.__archive_names.append(archive_name)
-        cls.has_unofficial_archive  = True
-        cls.is_initial_update = False
-        helpers.render_print(f"Load unofficial archive library: {archive_name}")
+    def get_archive(cls, key, library=all_libraries):
+        return LibraryArchives.read(key, library, prefer_unofficial=cls.prefer_unofficial)
 
-    @classmethod
-    def update_unofficial_archive(cls, archive_name, library):
-        dictionary = {key.lower(): library.read(key) for key in library.namelist()}
-        cls.__unofficial_archive.update(dictionary)
-        cls.__archive_names.append(archive_name)
-        helpers.render_print(f"Load unofficial archive library: {archive_name}")
-    
     @classmethod
     def archive_library_found(cls, path):
-        for library_name in os.listdir(path):
-            if (library_name.endswith(".zip") or library_name.endswith(".bin")) and \
-                library_name not in cls.loaded_archives():
-                library_path = os.path.join(path, library_name)
-                with zipfile.ZipFile(library_path) as library:
-                    if not cls.has_official_archive and \
-                        "ldraw/LDConfig.ldr" in library.namelist() and \
-                        "ldraw/p/1-4cyli.dat" in library.namelist():
-                        cls.set_official_archive(library_name, library)
-                    else:
-                        try:
-                            is_unofficial_library = \
-                                next(pid for pid in library.namelist()
-                                    if (pid.endswith(".dat") or pid.endswith(".ldr") or pid.endswith(".mpd")))
-                        except StopIteration:
-                            continue
-                        else:
-                            if is_unofficial_library is not None:
-                                if cls.is_initial_update:
-                                    cls.set_unofficial_archive(library_name, library)
-                                else:
-                                    cls.update_unofficial_archive(library_name, library)
-
-        return FileSystem.has_official_archive or FileSystem.has_unofficial_archive
+        return LibraryArchives.load(path, report=helpers.render_print)
     # **************************************************************************************
     # _*_mod_end
 
@@ -512,57 +437,57 @@ class FileSystem:
             path = os.path.join(root, "models")
             cls.append_search_path(path)
 
+        PathIndex.save()
+
     # build a list of folders to search for parts
-    # build a map of lowercase to actual filenames
+    # build a map of lowercase relative filenames to actual filepaths
+    # the first search path to contain a filename wins
     @classmethod
     def append_search_path(cls, path, root=False):
         cls.search_dirs.append(path)
-        if cls.case_sensitive_filesystem:
-            cls.append_lowercase_paths(path, '*')
-            if root:
-                return
-            cls.append_lowercase_paths(path, '**/*')
+        depth = 0 if root else 1
+        for lc_name, name in PathIndex.get_files(path, depth).items():
+            cls.lowercase_paths.setdefault(lc_name, os.path.join(path, name))
 
     @classmethod
-    def append_lowercase_paths(cls, path, pattern):
-        files = glob.glob(os.path.join(path, pattern))
-        for file in files:
-            cls.lowercase_paths.setdefault(file.lower(), file)
+    # record_missing=False leaves misses unrecorded, for lookups made ahead of the parser
+    def locate(cls, filename, record_missing=True):
+        if filename in cls.missing_files:
+            if record_missing:
+                cls.missing_files[filename] += 1
+                ResolverStats.negative_hit()
+            return None
 
-    @classmethod
-    def locate(cls, filename):
         part_path = str(filename).replace("\\", os.path.sep).replace("/", os.path.sep)
         part_path = os.path.expanduser(part_path)
 
         # full path was specified
         if os.path.isfile(part_path):
+            ResolverStats.hit()
             return part_path
 
-        for dir in cls.search_dirs:
-            full_path = os.path.join(dir, part_path)
-            if os.path.isfile(full_path):
-                return full_path
+        full_path = cls.lowercase_paths.get(part_path.lower())
+        if full_path is not None:
+            ResolverStats.hit()
+            return full_path
 
-            lc_path = full_path.lower()
-            if lc_path in cls.lowercase_paths:
-                full_path = cls.lowercase_paths.get(lc_path)
-
-            if os.path.isfile(full_path):
-                return full_path
+        # nested deeper than the indexed search paths
+        full_path = locate_file(part_path, cls.search_dirs)
+        if full_path is not None:
+            return full_path
 
         # _*_lp_lc_mod
         if cls.have_archive_libraries:
-            for path in cls.archive_search_paths:
-                archive_path = os.path.join(path, filename.lower()).replace("\\", "/")
-                archive_library = cls.archive_file_exists(archive_path)
-                
-                if archive_library != cls.archive_not_found:
-                    result_list = list([archive_library, archive_path])
-                    return result_list
+            result_list = LibraryArchives.locate(filename, cls.archive_search_paths)
+            if result_list is not None:
+                return result_list
         # _*_mod_end
-        
+
         # TODO: requests retrieve missing items from ldraw.org
         # _*_lp_lc_mod
-        helpers.render_print(f"missing {filename}", True)
+        # reported once by report_missing_files at the end of the import
+        if record_missing:
+            cls.missing_files[filename] = 1
+            ResolverStats.miss()
         # _*_mod_end
         return None
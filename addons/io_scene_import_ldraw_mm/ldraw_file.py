@@ -4,6 +4,16 @@ import os
 import re
 import zipfile
 
+from io_scene_render_ldraw.ldrawlibrary.fingerprint import LibraryFingerprint
+from io_scene_render_ldraw.ldrawlibrary.header_scan import header_lines
+from io_scene_render_ldraw.ldrawlibrary.line_buffer import LineBuffer, LineView
+from io_scene_render_ldraw.ldrawlibrary.parse_cache import ParseCache
+from io_scene_render_ldraw.ldrawlibrary.parse_pool import ParsePool
+from io_scene_render_ldraw.ldrawlibrary.polygon_arrays import PolygonArrays
+from io_scene_render_ldraw.ldrawlibrary.prefetch import Prefetcher
+from io_scene_render_ldraw.ldrawlibrary.section_history import SectionHistory
+from io_scene_render_ldraw.ldrawlibrary.text_reader import read_text, split_lines
+
 from .import_options import ImportOptions
 from .filesystem import FileSystem
 from .ldraw_node import LDrawNode
@@ -21,11 +31,157 @@ class LDrawFile:
 
     __unparsed_file_cache = {}
     __parsed_file_cache = {}
+    # _*_lp_lc_mod
+    # files of which only the header was scanned, see get_header
+    __header_file_cache = {}
+    __prefetcher = Prefetcher(lambda filename: LDrawFile.__fetch_file(filename))
+    __fingerprint = LibraryFingerprint()
+    __parse_pool = ParsePool()
+    # the mpd sections of the previous import of the model, see begin_sections
+    __section_history = SectionHistory()
+    __section_model = None
+    __previous_sections = {}
+    __changed_sections = []
+    # _*_mod_end
 
+    # _*_lp_lc_mod
+    # parsed files are kept until validate_caches is called once the search paths are built
     @classmethod
     def reset_caches(cls):
         cls.__unparsed_file_cache.clear()
-        cls.__parsed_file_cache.clear()
+        cls.__prefetcher.shutdown()
+        cls.__parse_pool.shutdown()
+
+    # clear the parsed files if the library fingerprint changed,
+    # otherwise keep the unchanged library files and clear the rest
+    @classmethod
+    def validate_caches(cls):
+        if cls.__fingerprint.update(cls.__library_fingerprint()):
+            cls.__parsed_file_cache.clear()
+            cls.__header_file_cache.clear()
+            cls.__section_history.clear()
+            cls.__previous_sections = {}
+            return
+
+        retainable = {}
+        for filename, ldraw_file in list(cls.__parsed_file_cache.items()):
+            if not ldraw_file.__is_retainable(retainable):
+                del cls.__parsed_file_cache[filename]
+        for filename, ldraw_file in list(cls.__header_file_cache.items()):
+            if not ldraw_file.__is_retainable(retainable):
+                del cls.__header_file_cache[filename]
+        helpers.render_print(f"Library unchanged, keeping {len(cls.__parsed_file_cache)} parsed file(s)")
+
+    @staticmethod
+    def __library_fingerprint():
+        archives = list(FileSystem.loaded_archives())
+        files = [
+            FileSystem.locate_parameters_file(),
+            os.path.expanduser(FileSystem.custom_ldconfig_file),
+            os.path.join(FileSystem.ldraw_path, "LDConfig.ldr"),
+            os.path.join(FileSystem.ldraw_path, "LDCfgalt.ldr"),
+            os.path.join(FileSystem.studio_ldraw_path, "LDConfig.ldr"),
+        ]
+        options = [(key, getattr(FileSystem, key)) for key in sorted(FileSystem.defaults)]
+        options.extend((key, getattr(ImportOptions, key)) for key in sorted(ImportOptions.defaults))
+        # search_dirs starts with the top level file's directory, which takes precedence over the library
+        return LibraryFingerprint.compute(FileSystem.search_dirs, archives, files, options)
+
+    # a file is kept if it was located in the search paths or archives, is not a model or configuration file,
+    # has not changed on disk, and all the files it references are kept too
+    def __is_retainable(self, retainable):
+        key = id(self)
+        if key in retainable:
+            return retainable[key]
+
+        retainable[key] = False
+        result = self.is_located and not self.is_like_model() and not self.is_configuration()
+        if result and self.source_mtime is not None:
+            result = LibraryFingerprint.file_mtime(self.source_path) == self.source_mtime
+        if result:
+            for ldraw_node in self.child_nodes:
+                if ldraw_node.file is not None and not ldraw_node.file.__is_retainable(retainable):
+                    result = False
+                    break
+        retainable[key] = result
+        return result
+
+    # with incremental_import, the mpd sections of filepath that did not change since it was last imported
+    # are not parsed again, a changed section is parsed again with every section that contains it
+    @classmethod
+    def begin_sections(cls, filepath):
+        cls.__changed_sections = []
+        if not FileSystem.incremental_import:
+            cls.__section_model = None
+            cls.__section_history.clear()
+            cls.__previous_sections = {}
+            return
+
+        cls.__section_model = filepath
+        if not cls.__section_history.begin(filepath):
+            cls.__previous_sections = {}
+
+    # the names of the sections of this import that were parsed again, as set on their meshes
+    @classmethod
+    def changed_section_names(cls):
+        names = set()
+        for ldraw_file in cls.__changed_sections:
+            names.add(ldraw_file.filename.lower())
+            names.add(ldraw_file.name.lower())
+        return names
+
+    @classmethod
+    def __reuse_sections(cls, buffer, sections):
+        reference_counts = {}
+        for section in sections.values():
+            references = []
+            for index in section.lines.indexes():
+                params = buffer.tokens(index)
+                if len(params) >= 15 and params[0] == "1":
+                    references.append(buffer.lines[index].strip().split(maxsplit=14)[14])
+            reference_counts[section.filename] = len(references)
+            cls.__section_history.add(section.filename, section.lines, references)
+
+        dirty = cls.__section_history.finish()
+        previous = cls.__previous_sections
+        retained = {id(ldraw_file) for ldraw_file in cls.__parsed_file_cache.values()}
+        reusable = {}
+        cls.__previous_sections = {}
+        for filename, section in sections.items():
+            previous_section = previous.get(filename)
+            if previous_section is not None and \
+                    previous_section.__is_reusable(previous, dirty, reference_counts, retained, reusable):
+                cls.__unparsed_file_cache.pop(filename, None)
+                cls.__parsed_file_cache[filename] = previous_section
+                section = previous_section
+            else:
+                cls.__changed_sections.append(section)
+            cls.__previous_sections[filename] = section
+        helpers.render_print(f"Incremental import, reusing {len(sections) - len(cls.__changed_sections)} "
+                             f"of {len(sections)} section(s)")
+
+    # a previous section is reused if neither it nor the sections it contains changed, the library files
+    # it references are still parsed, and every file it references was found when it was parsed
+    def __is_reusable(self, previous, dirty, reference_counts, retained, reusable):
+        key = self.filename
+        if key in reusable:
+            return reusable[key]
+
+        reusable[key] = False
+        result = self.parsed and key not in dirty and previous.get(key) is self
+        if result:
+            subfile_nodes = [ldraw_node for ldraw_node in self.child_nodes if ldraw_node.meta_command == "1"]
+            result = len(subfile_nodes) == reference_counts.get(key)
+            for ldraw_node in subfile_nodes:
+                if not result:
+                    break
+                if ldraw_node.file.is_mpd_section:
+                    result = ldraw_node.file.__is_reusable(previous, dirty, reference_counts, retained, reusable)
+                else:
+                    result = id(ldraw_node.file) in retained
+        reusable[key] = result
+        return result
+    # _*_mod_end
 
     def __init__(self, filename):
         self.filename = filename
@@ -50,9 +206,28 @@ class LDrawFile:
 
         self.child_nodes = []
         self.geometry_commands = {}
+        # _*_lp_lc_mod
+        # line type 2, 3, 4 and 5 vertices, converted in one pass when parsing is done
+        self.polygons = PolygonArrays()
+        # _*_mod_end
 
         self.named = False
 
+        # _*_lp_lc_mod
+        # set by __load_file for the file it located, mpd subfiles are not located
+        self.is_located = False
+        self.source_path = None
+        self.source_mtime = None
+
+        # set by __read_file for the sections of an mpd, which are not written to the parse cache
+        self.is_mpd_section = False
+        self.parsed = False
+        self.cache_key = None
+
+        # type 1 to 5 lines tokenized by the parse pool, see tokenize_model
+        self.tokens = None
+        # _*_mod_end
+
     def __str__(self):
         return "\n".join([
             f"filename: {self.filename}",
@@ -131,43 +306,336 @@ class LDrawFile:
         if ldraw_file is None:
             return ldraw_file
 
-        ldraw_file.__parse_file()
+        # _*_lp_lc_mod
+        # files restored from the parse cache are already parsed
+        if not ldraw_file.parsed:
+            ldraw_file.__parse_file()
+            ldraw_file.parsed = True
+            if ldraw_file.cache_key is not None and ldraw_file.__is_cacheable():
+                ParseCache.store(ldraw_file.cache_key, ldraw_file.__to_record())
+        # _*_mod_end
         cls.__parsed_file_cache[filename] = ldraw_file
+        # _*_lp_lc_mod
+        cls.__header_file_cache.pop(filename, None)
+        # _*_mod_end
         return ldraw_file
 
+    # _*_lp_lc_mod
+    # the header data of a file without parsing the rest of it, enough for the is_* part type
+    # classification and ldraw_props.set_props but not for is_geometry, since there are no child_nodes
+    # returns the parsed file if there is one, files that are only scanned are cached separately
+    # and are not read into the unparsed file cache, so the whole library can be scanned
     @classmethod
-    def __load_file(cls, filename):
-        # _*_lp_lc_mod
+    def get_header(cls, filename):
+        ldraw_file = cls.__parsed_file_cache.get(filename)
+        if ldraw_file is not None:
+            return ldraw_file
+
+        ldraw_file = cls.__header_file_cache.get(filename)
+        if ldraw_file is not None:
+            return ldraw_file
+
+        ldraw_file = cls.__unparsed_file_cache.get(filename)
+        if ldraw_file is not None:
+            header_file = LDrawFile(ldraw_file.filename)
+            header_file.is_located = ldraw_file.is_located
+            header_file.source_path = ldraw_file.source_path
+            header_file.source_mtime = ldraw_file.source_mtime
+            header_file.__scan_header(ldraw_file.lines, is_section=True)
+        else:
+            header_file = cls.__load_header(filename)
+            if header_file is None:
+                return None
+
+        cls.__header_file_cache[filename] = header_file
+        return header_file
+
+    @classmethod
+    def __load_header(cls, filename):
         result = FileSystem.locate(filename)
         if result is None:
             return None
+
+        if filename.endswith('.io') and zipfile.is_zipfile(filename):
+            with zipfile.ZipFile(filename, 'r') as zip:
+                lines = zip.read('model.ldr').decode('utf-8-sig').splitlines()
         else:
-            if isinstance(result, (list)):
-                archive_library = result[0]
-                filepath = result[1]
-            else:
-                filepath = result
+            lines = cls.__read_lines(result)
+        if lines is None:
+            return None
+
+        header_file = LDrawFile(filename)
+        header_file.is_located = True
+        if not isinstance(result, (list)):
+            header_file.source_path = result
+            header_file.source_mtime = LibraryFingerprint.file_mtime(result)
+        header_file.__scan_header(lines)
+        return header_file
+
+    # header lines are the type 0 lines before the first line of another type
+    # only the header handlers run, so no child files are loaded and no nodes are created
+    # the header of an mpd is the header of its first section
+    def __scan_header(self, lines, is_section=False):
+        for clean_line, line in header_lines(lines, is_section):
+            try:
+                strip_line = line.strip()
+                if self.description is None:
+                    self.__line_description(strip_line)
+
+                keyword = clean_line[2:].split(" ", 1)[0]
+                header_keyword = keyword.lower()
+
+                if header_keyword == "name:" and self.__line_name(clean_line, strip_line): continue
+                if header_keyword == "author:" and self.__line_author(clean_line, strip_line): continue
+                if (self.__part_type_markers.search(clean_line) or self.__part_type_markers.search(strip_line)) and \
+                        self.__line_part_type(clean_line, strip_line): continue
+
+                if keyword in self.__header_keywords:
+                    self.__meta_handlers[keyword](self, clean_line, strip_line)
+            except Exception as e:
+                print(e)
+                import traceback
+                print(traceback.format_exc())
+                continue
+
+    __header_keywords = frozenset(("!LICENSE", "!HELP", "!CATEGORY", "!KEYWORDS", "!CMDLINE", "!HISTORY"))
+    # _*_mod_end
+
+    @classmethod
+    def __load_file(cls, filename):
+        # _*_lp_lc_mod
+        lines = None
+        tokens = None
+        tokenized = cls.__parse_pool.take(filename)
+        prefetched = cls.__prefetcher.take(filename) if tokenized is None else None
+        if tokenized is not None:
+            lines, tokens, references = tokenized
+            result = FileSystem.locate(filename)
+        elif prefetched is not None and prefetched[0] is not None:
+            result, lines = prefetched
+        else:
+            result = FileSystem.locate(filename)
+
+        if result is None:
+            return None
         # _*_mod_end
 
         if filename.endswith('.io') and zipfile.is_zipfile(filename):
             with zipfile.ZipFile(filename, 'r') as zip:
                 model_ldr = zip.read('model.ldr').decode('utf-8-sig')
                 return cls.__read_file(model_ldr.splitlines(), filename)
-            
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8-sig') as file:
-                return cls.__read_file(file, filename)
+
         # _*_lp_lc_mod
+        cache_key = cls.__parse_cache_key(result)
+        ldraw_file = None
+        if cache_key is not None:
+            ldraw_file = cls.__restore_file(filename, cache_key)
+
+        if ldraw_file is None:
+            if lines is None:
+                lines = cls.__read_lines(result)
+            if lines is None:
+                return None
+
+            ldraw_file = cls.__read_file(lines, filename, tokens)
+            if ldraw_file is not None:
+                ldraw_file.cache_key = cache_key
+                if tokens is None:
+                    cls.__prefetch_subfiles(LineView.of(ldraw_file.lines).buffer)
+
+        if ldraw_file is not None:
+            ldraw_file.is_located = True
+            if not isinstance(result, (list)):
+                ldraw_file.source_path = result
+                ldraw_file.source_mtime = LibraryFingerprint.file_mtime(result)
+        return ldraw_file
+
+    # the parse cache key of a located file path or [archive_library, archive_path] list
+    # keyed by the file's source and the options that change how it is read and parsed
+    @staticmethod
+    def __parse_cache_key(result):
+        if not FileSystem.use_parse_cache:
+            return None
+
+        if isinstance(result, (list)):
+            source = FileSystem.archive_source(result[1], result[0])
+            if source is None:
+                return None
+            archive_path, size, mtime = source
+            source = (archive_path, result[1])
+        else:
+            try:
+                stat = os.stat(result)
+            except OSError:
+                return None
+            source, size, mtime = result, stat.st_size, stat.st_mtime_ns
+
+        options = (ImportOptions.meta_texmap, ImportOptions.display_logo, ImportOptions.chosen_logo_value())
+        return ParseCache.key("ImportLDrawMM", source, size, mtime, options)
+
+    __record_fields = ("description", "name", "author", "part_type", "actual_part_type", "optional_qualifier",
+                       "update_date", "license", "help", "category", "keywords", "cmdline", "history", "named")
+
+    # library files that only reference other located files are cached
+    # models, configuration files and mpd sections depend on the file that is being imported
+    def __is_cacheable(self):
+        if not self.is_located or self.is_mpd_section or self.is_like_model() or self.is_configuration():
+            return False
+        for ldraw_node in self.child_nodes:
+            if ldraw_node.file is not None and (not ldraw_node.file.is_located or ldraw_node.file.is_mpd_section):
+                return False
+            if ldraw_node.has_meta_args() and not all(isinstance(value, str) for value in ldraw_node.meta_args.values()):
+                return False
+        return True
+
+    # the parsed file as built-in types, child files are stored by filename and resolved when restored
+    # type 1 geometry_commands are counted again when restored, since they depend on the child files
+    def __to_record(self):
+        header = tuple(getattr(self, field) for field in self.__record_fields)
+        geometry_commands = {key: count for key, count in self.geometry_commands.items() if key != "1"}
+        nodes = []
+        for ldraw_node in self.child_nodes:
+            child_filename = None
+            matrix = None
+            if ldraw_node.file is not None:
+                child_filename = ldraw_node.file.filename
+                matrix = tuple(value for row in ldraw_node.matrix for value in row)
+            meta_args = dict(ldraw_node.meta_args) if ldraw_node.has_meta_args() else {}
+            nodes.append((ldraw_node.meta_command, ldraw_node.line, ldraw_node.color_code, meta_args,
+                          child_filename, matrix, ldraw_node.polygon_index))
+        return header, geometry_commands, self.polygons.to_record(), nodes
+
+    # returns None if there is no valid record or one of its child files cannot be found,
+    # in which case the file is read and parsed
+    @classmethod
+    def __restore_file(cls, filename, cache_key):
+        record = ParseCache.load(cache_key)
+        if record is None:
+            return None
+
+        try:
+            header, geometry_commands, polygons, nodes = record
+            ldraw_file = LDrawFile(filename)
+            for field, value in zip(cls.__record_fields, header):
+                setattr(ldraw_file, field, value)
+            ldraw_file.geometry_commands = dict(geometry_commands)
+            ldraw_file.polygons = PolygonArrays.from_record(polygons)
+
+            for meta_command, line, color_code, meta_args, child_filename, matrix, polygon_index in nodes:
+                ldraw_node = LDrawNode()
+                ldraw_node.meta_command = meta_command
+                ldraw_node.line = line
+                ldraw_node.color_code = LDrawNode.tokens.intern(color_code)
+                if meta_args:
+                    ldraw_node.meta_args = meta_args
+                if child_filename is not None:
+                    ldraw_node.file = cls.get_file(child_filename)
+                    if ldraw_node.file is None:
+                        return None
+                    ldraw_node.matrix = mathutils.Matrix((matrix[0:4], matrix[4:8], matrix[8:12], matrix[12:16]))
+                    if ldraw_node.file.is_geometry():
+                        ldraw_file.geometry_commands.setdefault("1", 0)
+                        ldraw_file.geometry_commands["1"] += 1
+                if polygon_index is not None:
+                    ldraw_node.set_polygon(ldraw_file.polygons, polygon_index)
+                ldraw_file.child_nodes.append(ldraw_node)
+        except (TypeError, ValueError):
+            return None
+
+        ldraw_file.parsed = True
+        ldraw_file.cache_key = cache_key
+        return ldraw_file
+
+    # result is a located file path or an [archive_library, archive_path] list
+    @staticmethod
+    def __read_lines(result):
+        archive_library = FileSystem.all_libraries
+        if isinstance(result, (list)):
+            archive_library = result[0]
+            filepath = result[1]
+        else:
+            filepath = result
+
+        # a single open, the encoding is detected in memory
+        text = read_text(filepath)
+        if text is not None:
+            return split_lines(text)
         elif FileSystem.have_archive_libraries:
             bin_io = FileSystem.get_archive(filepath, library=archive_library)
             if bin_io is not None:
-                return cls.__read_file(bin_io.splitlines(), filename)
+                return bin_io.splitlines()
 
         return None
+
+    # runs on the prefetch thread pool, so it only resolves and reads
+    # misses are left for the main thread to record
+    @classmethod
+    def __fetch_file(cls, filename):
+        result = FileSystem.locate(filename, record_missing=False)
+        if result is None:
+            return None, None
+        return result, cls.__read_lines(result)
+
+    # queue the type 1 references of lines that are not loaded yet
+    # called after __read_file so that mpd subfiles are already cached and every line is already split
+    @classmethod
+    def __prefetch_subfiles(cls, buffer):
+        filenames = []
+        for index in range(len(buffer)):
+            _params = buffer.tokens(index)
+            if len(_params) < 15 or _params[0] != "1":
+                continue
+            # the same name as __line_subfile takes, so the prefetched file is taken for it
+            filename = _params[14] if len(_params) == 15 else buffer.lines[index].strip().split(maxsplit=14)[14]
+            filename = filename.lower()
+            if ImportOptions.display_logo and filename in ldraw_part_types.stud_names:
+                continue
+            if filename.endswith('.io'):
+                continue
+            if filename in cls.__parsed_file_cache or filename in cls.__unparsed_file_cache:
+                continue
+            filenames.append(filename)
+        cls.__prefetcher.prefetch(filenames)
         # _*_mod_end
 
+    # _*_lp_lc_mod
+    # read and tokenize the files the model references in the parse pool worker processes,
+    # the tokenized files are taken by __load_file when they are parsed
+    @classmethod
+    def tokenize_model(cls, filename):
+        if not FileSystem.use_parse_pool:
+            return
+        source = cls.__pool_source(filename)
+        if source is not None:
+            cls.__parse_pool.tokenize_closure(filename, source, cls.__locate_reference)
+
+    # runs on the main thread while the pool tokenizes, reference is an unmodified type 1 filename
+    @classmethod
+    def __locate_reference(cls, reference, parent_filename):
+        filename = cls.__logo_filename(reference.lower())
+        if filename in cls.__parsed_file_cache or filename in cls.__unparsed_file_cache:
+            return None
+        source = cls.__pool_source(filename)
+        if source is None:
+            return None
+        return filename, source
+
+    # .io files and files that cannot be found are loaded without the pool
+    @staticmethod
+    def __pool_source(filename):
+        if filename.endswith('.io'):
+            return None
+        result = FileSystem.locate(filename, record_missing=False)
+        if result is None:
+            return None
+        if isinstance(result, (list)):
+            text = FileSystem.get_archive(result[1], library=result[0])
+            return ("text", text) if text is not None else None
+        return ("path", result)
+    # _*_mod_end
+
     @classmethod
-    def __read_file(cls, file, filename):
+    def __read_file(cls, file, filename, tokens=None):
         hit_not_blank_line = False
         is_mpd = None
         no_file = False
@@ -177,9 +645,13 @@ class LDrawFile:
         current_data_filename = None
         current_data = None
 
-        for line in file:
-            clean_line = helpers.clean_line(line)
-            strip_line = line.strip()
+        # _*_lp_lc_mod
+        sections = {}
+        # every line is split once into the shared buffer, files and mpd sections are views of the buffer
+        buffer = LineBuffer(file if isinstance(file, list) else list(file))
+        for index, line in enumerate(buffer.lines):
+            clean_line = buffer.clean_line(index)
+            # _*_mod_end
 
             if clean_line == "":
                 continue
@@ -191,7 +663,7 @@ class LDrawFile:
                 if texmap.is_texmap_line(clean_line):
                     if ImportOptions.meta_texmap:
                         try:
-                            base64_data = texmap.clean_line(strip_line)
+                            base64_data = texmap.clean_line(line.strip())
                             current_data.append(base64_data)
                         except IndexError as e:
                             print(e)
@@ -216,26 +688,38 @@ class LDrawFile:
 
             # clean up texmap geometry line prefixes
             if ImportOptions.meta_texmap:
-                line = texmap.clean_line(line)
+                # _*_lp_lc_mod
+                buffer.replace(index, texmap.clean_line(line))
+                # _*_mod_end
 
             # not mpd -> regular ldr/dat file
             if not is_mpd:
                 if current_file is None:
                     current_file = LDrawFile(filename)
-                current_file.lines.append(line)
+                    # _*_lp_lc_mod
+                    current_file.lines = LineView(buffer)
+                    current_file.tokens = tokens
+                    # _*_mod_end
+                current_file.lines.add(index)
                 continue
 
             if is_mpd_line:
                 no_file = False
 
             if is_file_line:
-                mpd_filename = strip_line.split(maxsplit=2)[2].lower()
+                mpd_filename = line.strip().split(maxsplit=2)[2].lower()
                 if first_mpd_filename is None:
                     first_mpd_filename = mpd_filename
 
                 if current_mpd_file is not None:
                     cls.__unparsed_file_cache[current_mpd_file.filename] = current_mpd_file
                 current_mpd_file = LDrawFile(mpd_filename)
+                # _*_lp_lc_mod
+                current_mpd_file.lines = LineView(buffer)
+                current_mpd_file.is_mpd_section = True
+                current_mpd_file.tokens = tokens
+                sections[mpd_filename] = current_mpd_file
+                # _*_mod_end
                 continue
 
             if is_nofile_line:
@@ -246,7 +730,7 @@ class LDrawFile:
                 continue
 
             if is_data_line:
-                current_data_filename = strip_line.split(maxsplit=2)[2]
+                current_data_filename = line.strip().split(maxsplit=2)[2]
                 current_data = []
                 continue
 
@@ -254,7 +738,9 @@ class LDrawFile:
                 continue
 
             if current_mpd_file is not None:
-                current_mpd_file.lines.append(line)
+                # _*_lp_lc_mod
+                current_mpd_file.lines.add(index)
+                # _*_mod_end
                 continue
 
         if current_data_filename is not None:
@@ -269,50 +755,92 @@ class LDrawFile:
         if current_file is not None:
             cls.__unparsed_file_cache[current_file.filename] = current_file
 
+        # _*_lp_lc_mod
+        if is_mpd and filename == cls.__section_model:
+            cls.__reuse_sections(buffer, sections)
+        # _*_mod_end
+
         if first_mpd_filename is not None:
             filename = first_mpd_filename
 
+        # _*_lp_lc_mod
+        # a reused section is already parsed
+        ldraw_file = cls.__parsed_file_cache.get(filename)
+        if ldraw_file is not None:
+            return ldraw_file
+        # _*_mod_end
         return cls.__unparsed_file_cache.get(filename)
 
     # create meta nodes when those commands affect the scene
     # process meta command in place if it only affects the file
+    # _*_lp_lc_mod
+    # lines are classified once by their line type and meta keyword and passed straight to their handler
+    # header lines are still matched in their original order of precedence before the meta keyword
+    # lines are views of the buffer built by __read_file, so each line is only split once
     def __parse_file(self):
-        for line in self.lines:
+        self.lines = LineView.of(self.lines)
+        buffer = self.lines.buffer
+        for index in self.lines.indexes():
+            line = buffer.lines[index]
             try:
-                clean_line = helpers.clean_line(line)
+                if self.description is None:
+                    self.__line_description(line.strip())
+
+                # lines tokenized by the parse pool are not split again
+                if self.tokens is not None:
+                    tokenized = self.tokens.get(line)
+                    if tokenized is not None:
+                        self.__line_tokenized(*tokenized)
+                        continue
+
+                clean_line = buffer.clean_line(index)
+                line_type = clean_line[:2]
+
+                if line_type in self.__geometry_line_types:
+                    self.__add_geometry(clean_line, buffer.tokens(index))
+                    continue
+
                 strip_line = line.strip()
 
-                if self.__line_description(strip_line): continue
-                if self.__line_name(clean_line, strip_line): continue
-                if self.__line_author(clean_line, strip_line): continue
-                if self.__line_part_type(clean_line, strip_line): continue
-                if self.__line_license(strip_line): continue
-                if self.__line_help(strip_line): continue
-                if self.__line_category(strip_line): continue
-                if self.__line_keywords(strip_line): continue
-                if self.__line_cmdline(strip_line): continue
-                if self.__line_history(strip_line): continue
-                if self.__line_comment(clean_line): continue
-                if self.__line_color(clean_line): continue
-                if self.__line_geometry(clean_line): continue
-                if self.__line_subfile(clean_line, strip_line): continue
-                if self.__line_bfc(clean_line, strip_line): continue
-                if self.__line_step(clean_line): continue
-                if self.__line_save(clean_line): continue
-                if self.__line_clear(clean_line): continue
-                if self.__line_print(clean_line): continue
-                if self.__line_ldcad(clean_line): continue
-                # _*_lp_lc_mod
-                if self.__line_lp_lc(clean_line): continue
-                # _*_mod_end
-                if self.__line_texmap(clean_line): continue
-                if self.__line_stud_io(clean_line): continue
+                if line_type == "1 ":
+                    self.__line_subfile(clean_line, strip_line, buffer.tokens(index))
+                    continue
+
+                keyword = clean_line[2:].split(" ", 1)[0] if line_type == "0 " else ""
+                header_keyword = keyword.lower()
+
+                if header_keyword == "name:" and self.__line_name(clean_line, strip_line): continue
+                if header_keyword == "author:" and self.__line_author(clean_line, strip_line): continue
+                if (self.__part_type_markers.search(clean_line) or self.__part_type_markers.search(strip_line)) and \
+                        self.__line_part_type(clean_line, strip_line): continue
+
+                if not keyword:
+                    continue
+
+                handler = self.__meta_handlers.get(keyword)
+                if handler is None:
+                    for prefix, prefix_handler in self.__meta_prefix_handlers:
+                        if keyword.startswith(prefix):
+                            handler = prefix_handler
+                            break
+                if handler is not None:
+                    handler(self, clean_line, strip_line)
             except Exception as e:
                 print(e)
                 import traceback
                 print(traceback.format_exc())
                 continue
 
+        self.polygons.finalize()
+        self.tokens = None
+
+    __geometry_line_types = frozenset(("2 ", "3 ", "4 ", "5 "))
+
+    # a line can only be a part type line if it contains one of these, see __line_part_type
+    __part_type_markers = re.compile(r"ORIGINAL|UPDATE|Alias|Physical_Colour|Flexible_Section|"
+                                     r"0 !?LDRAW_ORG |0 Official LCAD |(?i:0 un-?official )")
+    # _*_mod_end
+
     # always return false so that the rest of the line types are parsed even if this is true
     def __line_description(self, strip_line):
         if self.description is None:
@@ -626,59 +1154,107 @@ class LDrawFile:
             return True
         return False
 
-    def __line_subfile(self, clean_line, strip_line):
+    # _*_lp_lc_mod
+    # type 0 line handlers keyed by the first word after the 0
+    __meta_handlers = {
+        "!LICENSE": lambda self, clean_line, strip_line: self.__line_license(strip_line),
+        "!HELP": lambda self, clean_line, strip_line: self.__line_help(strip_line),
+        "!CATEGORY": lambda self, clean_line, strip_line: self.__line_category(strip_line),
+        "!KEYWORDS": lambda self, clean_line, strip_line: self.__line_keywords(strip_line),
+        "!CMDLINE": lambda self, clean_line, strip_line: self.__line_cmdline(strip_line),
+        "!HISTORY": lambda self, clean_line, strip_line: self.__line_history(strip_line),
+        "!COLOUR": lambda self, clean_line, strip_line: self.__line_color(clean_line),
+        "BFC": lambda self, clean_line, strip_line: self.__line_bfc(clean_line, strip_line),
+        "PRINT": lambda self, clean_line, strip_line: self.__line_print(clean_line),
+        "WRITE": lambda self, clean_line, strip_line: self.__line_print(clean_line),
+        "!LDCAD": lambda self, clean_line, strip_line: self.__line_ldcad(clean_line),
+        "!LPUB": lambda self, clean_line, strip_line: self.__line_lp_lc(clean_line),
+        "!LEOCAD": lambda self, clean_line, strip_line: self.__line_lp_lc(clean_line),
+        "!TEXMAP": lambda self, clean_line, strip_line: self.__line_texmap(clean_line),
+    }
+
+    # handlers of meta commands that are matched by prefix, such as 0 STEP and 0 //comment
+    __meta_prefix_handlers = (
+        ("//", lambda self, clean_line, strip_line: self.__line_comment(clean_line)),
+        ("STEP", lambda self, clean_line, strip_line: self.__line_step(clean_line)),
+        ("SAVE", lambda self, clean_line, strip_line: self.__line_save(clean_line)),
+        ("CLEAR", lambda self, clean_line, strip_line: self.__line_clear(clean_line)),
+        ("PE_TEX_", lambda self, clean_line, strip_line: self.__line_stud_io(clean_line)),
+    )
+    # _*_mod_end
+
+    # _*_lp_lc_mod
+    # _params are the already split clean line, if any
+    def __line_subfile(self, clean_line, strip_line, _params=None):
+        # _*_mod_end
         if clean_line.startswith("1 "):
-            _params = clean_line.split(maxsplit=14)
-            _sparams = strip_line.split(maxsplit=14)
-
-            color_code = _params[1]
-
-            (x, y, z, a, b, c, d, e, f, g, h, i) = map(float, _params[2:14])
-            matrix = mathutils.Matrix((
-                (a, b, c, x),
-                (d, e, f, y),
-                (g, h, i, z),
-                (0, 0, 0, 1)
-            ))
-
-            # allows for extra spaces in the filename
-            filename = _sparams[14].lower()
-
-            # filename = "stud-logo.dat"
-            # parts = filename.split(".") => ["stud-logo", "dat"]
-            # name = parts[0] => "stud-logo"
-            # name_parts = name.split('-') => ["stud", "logo"]
-            # stud_name = name_parts[0] => "stud"
-            # chosen_logo = special_bricks.chosen_logo => "logo5"
-            # ext = parts[1] => "dat"
-            # filename = f"{stud_name}-{chosen_logo}.{ext}" => "stud-logo5.dat"
-            if ImportOptions.display_logo and filename in ldraw_part_types.stud_names:
-                parts = filename.split('.')
-                name = parts[0]
-                name_parts = name.split('-')
-                stud_name = name_parts[0]
-                chosen_logo = ImportOptions.chosen_logo_value()
-                ext = parts[1]
-                filename = f"{stud_name}-{chosen_logo}.{ext}"
+            # _*_lp_lc_mod
+            if _params is None:
+                _params = clean_line.split()
+            # allows for extra spaces in the filename, which only a filename of more than one token can have
+            filename = _params[14] if len(_params) == 15 else strip_line.split(maxsplit=14)[14]
+            self.__add_subfile(clean_line, _params[1], tuple(map(float, _params[2:14])), filename.lower())
+            return True
+        return False
 
-            ldraw_file = LDrawFile.get_file(filename)
-            if ldraw_file is None:
-                return True
+    # tokenized lines come from the parse pool, see tokenize_model
+    def __line_tokenized(self, line_type, color_code, coordinates, filename, clean_line):
+        if line_type == "1":
+            self.__add_subfile(clean_line, color_code, coordinates, filename.lower())
+        else:
+            self.__add_geometry(clean_line, (line_type, color_code), coordinates)
 
-            ldraw_node = LDrawNode()
-            ldraw_node.file = ldraw_file
-            ldraw_node.line = clean_line
-            ldraw_node.meta_command = "1"
-            ldraw_node.color_code = color_code
-            ldraw_node.matrix = matrix
-            self.child_nodes.append(ldraw_node)
+    def __add_subfile(self, clean_line, color_code, coordinates, filename):
+        (x, y, z, a, b, c, d, e, f, g, h, i) = coordinates
+        # _*_mod_end
+        matrix = mathutils.Matrix((
+            (a, b, c, x),
+            (d, e, f, y),
+            (g, h, i, z),
+            (0, 0, 0, 1)
+        ))
+
+        # _*_lp_lc_mod
+        filename = self.__logo_filename(filename)
+        # _*_mod_end
 
-            if ldraw_file.is_geometry():
-                self.geometry_commands.setdefault(_params[0], 0)
-                self.geometry_commands[_params[0]] += 1
+        ldraw_file = LDrawFile.get_file(filename)
+        if ldraw_file is None:
+            return
 
-            return True
-        return False
+        ldraw_node = LDrawNode()
+        ldraw_node.file = ldraw_file
+        ldraw_node.line = clean_line
+        ldraw_node.meta_command = "1"
+        # _*_lp_lc_mod
+        ldraw_node.color_code = LDrawNode.tokens.intern(color_code)
+        # _*_mod_end
+        ldraw_node.matrix = matrix
+        self.child_nodes.append(ldraw_node)
+
+        if ldraw_file.is_geometry():
+            self.geometry_commands.setdefault("1", 0)
+            self.geometry_commands["1"] += 1
+
+    # filename = "stud-logo.dat"
+    # parts = filename.split(".") => ["stud-logo", "dat"]
+    # name = parts[0] => "stud-logo"
+    # name_parts = name.split('-') => ["stud", "logo"]
+    # stud_name = name_parts[0] => "stud"
+    # chosen_logo = special_bricks.chosen_logo => "logo5"
+    # ext = parts[1] => "dat"
+    # filename = f"{stud_name}-{chosen_logo}.{ext}" => "stud-logo5.dat"
+    @staticmethod
+    def __logo_filename(filename):
+        if ImportOptions.display_logo and filename in ldraw_part_types.stud_names:
+            parts = filename.split('.')
+            name = parts[0]
+            name_parts = name.split('-')
+            stud_name = name_parts[0]
+            chosen_logo = ImportOptions.chosen_logo_value()
+            ext = parts[1]
+            filename = f"{stud_name}-{chosen_logo}.{ext}"
+        return filename
 
     def __line_geometry(self, clean_line):
         if (clean_line.startswith("2 ") or
@@ -686,44 +1262,34 @@ class LDrawFile:
                 clean_line.startswith("4 ") or
                 clean_line.startswith("5 ")):
             _params = clean_line.split()
-
-            self.geometry_commands.setdefault(_params[0], 0)
-            self.geometry_commands[_params[0]] += 1
-
-            ldraw_node = LDrawNode()
-            ldraw_node.line = clean_line
-            ldraw_node.meta_command = _params[0]
-            ldraw_node.color_code = _params[1]
-            ldraw_node.vertices = self.__parse_face(_params)
-            self.child_nodes.append(ldraw_node)
+            # _*_lp_lc_mod
+            self.__add_geometry(clean_line, _params)
             return True
         return False
 
-    @staticmethod
-    def __parse_face(_params):
-        line_type = _params[0]
-        vert_count = 0
-        if line_type == "2":
-            vert_count = 2
-        elif line_type == "3":
-            vert_count = 3
-        elif line_type == "4":
-            vert_count = 4
-        elif line_type == "5":
-            # 1.148 26.114 -19.076
-            # 6.9   25.8   -18.6
-            # 0     26     -19
-            # 2.121 26.44  -19.293
-            vert_count = 4
-
-        verts = []
-        for i in range(vert_count):
-            x = float(_params[i * 3 + 2])
-            y = float(_params[i * 3 + 3])
-            z = float(_params[i * 3 + 4])
-            vertex = mathutils.Vector((x, y, z))
-            verts.append(vertex)
-        return verts
+    # coordinates are None unless the line was tokenized by the parse pool
+    def __add_geometry(self, clean_line, _params, coordinates=None):
+        # line type 5 has 4 vertices
+        # 1.148 26.114 -19.076
+        # 6.9   25.8   -18.6
+        # 0     26     -19
+        # 2.121 26.44  -19.293
+        polygon_index = self.polygons.add(_params, coordinates=coordinates)
+        # _*_mod_end
+
+        self.geometry_commands.setdefault(_params[0], 0)
+        self.geometry_commands[_params[0]] += 1
+
+        ldraw_node = LDrawNode()
+        ldraw_node.line = clean_line
+        ldraw_node.meta_command = _params[0]
+        # _*_lp_lc_mod
+        ldraw_node.color_code = LDrawNode.tokens.intern(_params[1])
+        # _*_mod_end
+        # _*_lp_lc_mod
+        ldraw_node.set_polygon(self.polygons, polygon_index)
+        # _*_mod_end
+        self.child_nodes.append(ldraw_node)
 
     # if there's a line type specified, determine what that type is
     @staticmethod
@@ -2,6 +2,10 @@ import bpy
 import bmesh
 import mathutils
 
+# _*_lp_lc_mod
+from io_scene_render_ldraw.ldrawlibrary import mesh_builder
+from io_scene_render_ldraw.ldrawlibrary.vertex_weld import weld_faces
+# _*_mod_end
 from .blender_materials import BlenderMaterials
 from .import_options import ImportOptions
 from . import special_bricks
@@ -65,8 +69,20 @@ def create_edge_mesh(key, geometry_data):
 # https://blender.stackexchange.com/questions/188039/how-to-join-only-two-objects-to-create-a-new-object-using-python
 # https://blender.stackexchange.com/questions/23905/select-faces-depending-on-material
 def __process_bmesh(mesh, geometry_data, color_code):
-    bm = __process_bmesh_faces(mesh, geometry_data, color_code)
+    # _*_lp_lc_mod
+    # the faces are written to the mesh in bulk, and only go through bmesh if a bmesh operation needs them
+    face_data = __process_mesh_faces(mesh, geometry_data, color_code)
+    # the bulk faces have no edges yet, they are calculated before validate or bmesh see the mesh
+    mesh.update(calc_edges=True)
+    if not __needs_bmesh(face_data):
+        helpers.finish_mesh(mesh)
+        return
+
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
     helpers.ensure_bmesh(bm)
+    __process_bmesh_texmaps(bm, face_data)
+    # _*_mod_end
     __clean_bmesh(bm)
     __process_bmesh_edges(bm, geometry_data)
     helpers.finish_bmesh(bm, mesh)
@@ -126,48 +142,77 @@ def __process_bmesh_edges(bm, geometry_data):
         bmesh.ops.split_edges(bm, edges=list(edges))
 
 
-def __process_bmesh_faces(mesh, geometry_data, color_code):
-    bm = bmesh.new()
+# _*_lp_lc_mod
+def __needs_bmesh(face_data):
+    if ImportOptions.recalculate_normals:
+        return True
+    if ImportOptions.smooth_type_value() == "bmesh_split":
+        return True
+    return any(data.texmap is not None or data.pe_texmap is not None for data in face_data)
 
-    for face_data in geometry_data.face_data:
-        verts = [bm.verts.new(vertex) for vertex in face_data.vertices]
-        face = bm.faces.new(verts)
 
-        c = color_code if face_data.color_code == "16" else face_data.color_code
+# fills the mesh with vertices, loops and polygons from flat arrays, faces keep their order as they did when
+# they were added to a bmesh one at a time, and share the vertices that are welded instead of remove_doubles
+# returns the face_data of the faces that were kept, so bm.faces[i] is the returned face_data[i]
+def __process_mesh_faces(mesh, geometry_data, color_code):
+    part_slopes = special_bricks.get_part_slopes(geometry_data.file.name)
+    parts_cloth = special_bricks.get_parts_cloth(geometry_data.file.name)
 
-        part_slopes = special_bricks.get_part_slopes(geometry_data.file.name)
-        parts_cloth = special_bricks.get_parts_cloth(geometry_data.file.name)
-        material = BlenderMaterials.get_material(
-            color_code=c,
-            bfc_certified=geometry_data.bfc_certified,
-            part_slopes=part_slopes,
-            parts_cloth=parts_cloth,
-            texmap=face_data.texmap,
-            pe_texmap=face_data.pe_texmap,
-        )
+    vertices, offsets = mesh_builder.face_arrays([face_data.vertices for face_data in geometry_data.face_data])
+    welded = weld_faces(vertices, offsets, ImportOptions.merge_distance if ImportOptions.remove_doubles else None)
+    kept_face_data = [geometry_data.face_data[i] for i in welded.faces.tolist()]
 
-        material_index = mesh.materials.find(material.name)
-        if material_index == -1:
-            # mesh.materials.append(None) #add blank slot
-            mesh.materials.append(material)
-            material_index = mesh.materials.find(material.name)
+    # the material slot of each distinct colour, texmap and pe_texmap of the faces, keyed like the material itself
+    slots = {}
+    material_indices = []
+    for face_data in kept_face_data:
+        c = color_code if face_data.color_code == "16" else face_data.color_code
+        texmap = face_data.texmap
+        pe_texmap = face_data.pe_texmap
+        slot_key = (
+            c,
+            None if texmap is None else (texmap.method, texmap.texture, texmap.glossmap),
+            None if pe_texmap is None else pe_texmap.texture,
+        )
 
-        face.material_index = material_index
-        face.smooth = ImportOptions.shade_smooth
+        material_index = slots.get(slot_key)
+        if material_index is None:
+            material = BlenderMaterials.get_material(
+                color_code=c,
+                bfc_certified=geometry_data.bfc_certified,
+                part_slopes=part_slopes,
+                parts_cloth=parts_cloth,
+                texmap=texmap,
+                pe_texmap=pe_texmap,
+            )
 
+            material_index = mesh.materials.find(material.name)
+            if material_index == -1:
+                # mesh.materials.append(None) #add blank slot
+                mesh.materials.append(material)
+                material_index = mesh.materials.find(material.name)
+            slots[slot_key] = material_index
+        material_indices.append(material_index)
+
+    mesh_builder.build_mesh(mesh, welded.vertices, welded.offsets,
+                            material_indices=material_indices,
+                            smooth=ImportOptions.shade_smooth,
+                            loop_totals=bpy.app.version < (4, 0),
+                            loops=welded.loops)
+    return kept_face_data
+
+
+def __process_bmesh_texmaps(bm, kept_face_data):
+    for face, face_data in zip(bm.faces, kept_face_data):
         if face_data.texmap is not None:
             face_data.texmap.uv_unwrap_face(bm, face)
 
         if face_data.pe_texmap is not None:
             face_data.pe_texmap.uv_unwrap_face(bm, face)
-
-    return bm
+# _*_mod_end
 
 
 def __clean_bmesh(bm):
-    if ImportOptions.remove_doubles:
-        bmesh.ops.remove_doubles(bm, verts=bm.verts[:], dist=ImportOptions.merge_distance)
-
     # recalculate_normals completely overwrites any bfc processing
     if ImportOptions.recalculate_normals:
         bmesh.ops.recalc_face_normals(bm, faces=bm.faces[:])
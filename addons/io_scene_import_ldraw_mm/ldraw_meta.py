@@ -1,6 +1,9 @@
 import bpy
 import mathutils
 
+# _*_lp_lc_mod
+from io_scene_render_ldraw.ldrawlibrary import meta_parser
+# _*_mod_end
 from . import matrices
 from .import_options import ImportOptions
 from .pe_texmap import PETexInfo, PETexmap
@@ -21,6 +24,8 @@ camera = None
 # _*_lp_lc_mod
 lights = []
 light = None
+# unknown keywords and invalid values of the camera and light metas, see report_scene_metas
+scene_meta_report = meta_parser.MetaReport()
 # _*_mod_end
 
 
@@ -41,6 +46,7 @@ def reset_caches():
 # _*_lp_lc_mod
     lights.clear()
     light = None
+    scene_meta_report.clear()
 # _*_mod_end
 
 def meta_bfc(ldraw_node, child_node, matrix, local_cull, winding, invert_next, accum_invert):
@@ -244,6 +250,42 @@ def meta_root_group_nxt(ldraw_node, child_node):
 
 
 # _*_lp_lc_mod
+# the keywords are parsed by the meta_parser tables shared with the legacy importer,
+# the vectors are converted here since each importer has its own coordinate conversion
+def __scene_meta_setters(matrix, is_lpub_meta):
+    def vector(name):
+        def setter(target, value):
+            if is_lpub_meta:
+                setattr(target, name, matrix @ mathutils.Vector(value))
+            else:
+                setattr(target, name, matrix @ mathutils.Vector(value) @ matrices.rotation_matrix)
+        return setter
+
+    return {
+        "latitude": None,
+        "longitude": None,
+        "distance": None,
+        "position": vector("position"),
+        "target_position": vector("target_position"),
+        "up_vector": vector("up_vector"),
+        "rotation": lambda target, value: setattr(target, "rotation", mathutils.Matrix(value)),
+        "color": lambda target, value: setattr(target, "color", mathutils.Vector(value)),
+    }
+
+
+# returns the name of the camera or light if the line completes it, otherwise None
+def __parse_scene_meta(command, target, clean_line, matrix):
+    result = command.parse(clean_line.split(), 3, clean_line)
+    scene_meta_report.record(command.command, result, clean_line)
+    command.apply(target, result, __scene_meta_setters(matrix, clean_line.startswith("0 !LPUB ")))
+    return result.name
+
+
+def report_scene_metas():
+    for message in scene_meta_report.summary():
+        helpers.render_print(f"WARNING: {message}")
+
+
 def meta_lp_lc_camera(child_node, matrix):
     if not ImportOptions.import_cameras:
         return
@@ -252,80 +294,19 @@ def meta_lp_lc_camera(child_node, matrix):
     global cameras
     global camera
 
-    clean_line = child_node.line
-    _params = clean_line.lower().split()[3:]
-
-    # _*_lp_lc_mod
-    is_lpub_meta = clean_line.startswith("0 !LPUB ")
-    # _*_mod_end
-
     if camera is None:
         camera = ldraw_camera.LDrawCamera()
 
     # https://www.leocad.org/docs/meta.html
     # "Camera commands can be grouped in the same line"
-    # _params = _params[1:] at the end bumps promotes _params[2] to _params[1]
-    while len(_params) > 0:
-        if _params[0] == "fov":
-            camera.fov = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "znear":
-            camera.z_near = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "zfar":
-            camera.z_far = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "position":
-            (x, y, z) = map(float, _params[1:4])
-            # _*_lp_lc_mod
-            if is_lpub_meta:
-                vector = matrix @ mathutils.Vector((x, y, z))
-            else:
-                vector = matrix @ mathutils.Vector((x, y, z)) @ matrices.rotation_matrix
-            # _*_mod_end
-            camera.position = vector
-            _params = _params[4:]
-        elif _params[0] == "target_position":
-            (x, y, z) = map(float, _params[1:4])
-            # _*_lp_lc_mod
-            if is_lpub_meta:
-                vector = matrix @ mathutils.Vector((x, y, z))
-            else:
-                vector = matrix @ mathutils.Vector((x, y, z)) @ matrices.rotation_matrix
-            # _*_mod_end
-            camera.target_position = vector
-            _params = _params[4:]
-        elif _params[0] == "up_vector":
-            (x, y, z) = map(float, _params[1:4])
-            # _*_lp_lc_mod
-            if is_lpub_meta:
-                vector = matrix @ mathutils.Vector((x, y, z))
-            else:
-                vector = matrix @ mathutils.Vector((x, y, z)) @ matrices.rotation_matrix
-            # _*_mod_end
-            camera.up_vector = vector
-            _params = _params[4:]
-        elif _params[0] == "orthographic":
-            camera.orthographic = True
-            _params = _params[1:]
-        elif _params[0] == "hidden":
-            camera.hidden = True
-            _params = _params[1:]
-        elif _params[0] == "name":
-            # "0 !LEOCAD CAMERA NAME Camera  2".split("NAME ")[1] => "Camera  2"
-            # "NAME Camera  2".split("NAME ")[1] => "Camera  2"
-            name_args = clean_line.split("NAME ")
-            # _*_lp_lc_mod
-            camera.name = "Imported {0}".format(name_args[1])
-            # _*_mod_end
-
-            # By definition this is the last of the parameters
-            _params = []
+    # _*_lp_lc_mod
+    name = __parse_scene_meta(meta_parser.CAMERA, camera, child_node.line, matrix)
+    if name is not None:
+        camera.name = "Imported {0}".format(name)
+        # _*_mod_end
 
-            cameras.append(camera)
-            camera = None
-        else:
-            _params = _params[1:]
+        cameras.append(camera)
+        camera = None
 
 # _*_lp_lc_mod
 def meta_lp_lc_light(child_node, matrix):
@@ -334,96 +315,17 @@ def meta_lp_lc_light(child_node, matrix):
 
     global lights
     global light
-    
-    clean_line = child_node.line
-    _params = helpers.get_params(clean_line, lowercase=True)[3:]
-
-    is_lpub_meta = clean_line.startswith("0 !LPUB ")
 
     if light is None:
         light = ldraw_light.LDrawLight()
+
     # "Light commands can be grouped in the same line"
-    # _params = _params[1:] at the end bumps promotes _params[2] to _params[1]
-    while len(_params) > 0:
-        if _params[0] == "position":
-            (x, y, z) = map(float, _params[1:4])
-            if is_lpub_meta:
-                vector = matrix @ mathutils.Vector((x, y, z))
-            else:
-                vector = matrix @ mathutils.Vector((x, y, z)) @ matrices.rotation_matrix
-            light.position = vector
-            _params = _params[4:]
-        elif _params[0] == "target_position":
-            (x, y, z) = map(float, _params[1:4])
-            if is_lpub_meta:
-                vector = matrix @ mathutils.Vector((x, y, z))
-            else:
-                vector = matrix @ mathutils.Vector((x, y, z)) @ matrices.rotation_matrix
-            light.target_position = vector
-            _params = _params[4:]
-        elif _params[0] == "rotation":
-            (x1, y1, z1, x2, y2, z2, x3, y3, z3) = map(float, _params[1:10])
-            light.rotation = mathutils.Matrix(((x1, y1, z1), (x2, y2, z2), (x3, y3, z3)))
-            _params = _params[10:]
-        elif _params[0] == "color" or _params[0] == "color_rgb":
-            light.color = mathutils.Vector(
-                (float(_params[1]), float(_params[2]), float(_params[3])))
-            _params = _params[4:]
-        elif _params[0] == "blender_power" or _params[0] == "power" or _params[0] == "strength":
-            light.exponent = float(_params[1])
-            _params = _params[2:]
-        elif  _params[0] == "blender_sun_angle" or _params[0] == "blender_angle" or _params[0] == "blender_directional_angle" or _params[0] == "angle":
-            light.sun_angle = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "blender_radius" or _params[0] == "blender_point_radius" or _params[0] == "blender_spot_radius" or _params[0] == "radius":
-            light.shadow_radius = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "spot_cone_angle" or _params[0] == "spot_size":
-            light.spot_size = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "spot_blend":
-            light.spot_blend = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "spot_penumbra_angle":
-            penumbra_angle = float(_params[1])
-            if penumbra_angle > 0:
-                light.spot_blend = penumbra_angle / light.spot_size
-            _params = _params[2:]
-        elif _params[0] == "area_size_x" or _params[0] == "area_size" or _params[0] == "size" or _params[0] == "width":
-            light.area_size = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "area_size_y" or _params[0] == "height":
-            light.area_size_y = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "area_shape" or _params[0] == "shape":
-            light.shape = _params[1].upper().strip()
-            _params = _params[2:]
-        elif _params[0] == "blender_specular" or _params[0] == "specular":
-            light.specular = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "blender_cutoff_distance" or _params[0] == "cutoff_distance":
-            light.use_cutoff = True
-            light.cutoff_distance = float(_params[1])
-            _params = _params[2:]
-        elif _params[0] == "shadowless":
-            light.use_shadow = False
-            _params = _params[1:]
-        elif _params[0] == "type":
-            light.type = _params[1].upper().strip()
-            if light.type == "DIRECTIONAL":
-                light.type = "SUN"
-            _params = _params[2:]
-        elif _params[0] == "name":
-            name_args = clean_line.split("NAME ")
-            light.name = "Imported {0}".format(name_args[1])
-
-            # By definition this is the last of the light parameters
-            _params = []
-
-            lights.append(light)
-            light = None
-        else:
-            _params = _params[1:]
+    name = __parse_scene_meta(meta_parser.LIGHT, light, child_node.line, matrix)
+    if name is not None:
+        light.name = "Imported {0}".format(name)
+
+        lights.append(light)
+        light = None
 # _*_mod_end
 
 # https://www.ldraw.org/documentation/ldraw-org-file-format-standards/language-extension-for-texture-mapping.html
@@ -508,13 +410,17 @@ def meta_texmap(ldraw_node, child_node, matrix):
             new_texmap.glossmap = glossmap
 
         if ldraw_node.texmap is not None:
-            ldraw_node.texmaps.append(ldraw_node.texmap)
+            # _*_lp_lc_mod
+            ldraw_node.texmap_state.texmaps.append(ldraw_node.texmap)
+            # _*_mod_end
         ldraw_node.texmap = new_texmap
 
 
 def set_texmap_end(ldraw_node):
     try:
-        ldraw_node.texmap = ldraw_node.texmaps.pop()
+        # _*_lp_lc_mod
+        ldraw_node.texmap = ldraw_node.texmap_state.texmaps.pop()
+        # _*_mod_end
     except IndexError as e:
         print(e)
         import traceback
@@ -642,13 +548,16 @@ def meta_pe_tex_info(ldraw_node, child_node):
 
     pe_tex_info.image = image.name
 
+    # _*_lp_lc_mod
+    texmap_state = ldraw_node.texmap_state
+    # _*_mod_end
     if ldraw_node.current_subfile_pe_tex_path is not None:
-        ldraw_node.subfile_pe_tex_infos.setdefault(ldraw_node.current_pe_tex_path, {})
-        ldraw_node.subfile_pe_tex_infos[ldraw_node.current_pe_tex_path].setdefault(ldraw_node.current_subfile_pe_tex_path, [])
-        ldraw_node.subfile_pe_tex_infos[ldraw_node.current_pe_tex_path][ldraw_node.current_subfile_pe_tex_path].append(pe_tex_info)
+        texmap_state.subfile_pe_tex_infos.setdefault(ldraw_node.current_pe_tex_path, {})
+        texmap_state.subfile_pe_tex_infos[ldraw_node.current_pe_tex_path].setdefault(ldraw_node.current_subfile_pe_tex_path, [])
+        texmap_state.subfile_pe_tex_infos[ldraw_node.current_pe_tex_path][ldraw_node.current_subfile_pe_tex_path].append(pe_tex_info)
     else:
-        ldraw_node.pe_tex_infos.setdefault(ldraw_node.current_pe_tex_path, [])
-        ldraw_node.pe_tex_infos[ldraw_node.current_pe_tex_path].append(pe_tex_info)
+        texmap_state.pe_tex_infos.setdefault(ldraw_node.current_pe_tex_path, [])
+        texmap_state.pe_tex_infos[ldraw_node.current_pe_tex_path].append(pe_tex_info)
 
     if ldraw_node.current_pe_tex_path == -1:
         ldraw_node.pe_tex_info = ldraw_node.pe_tex_infos[ldraw_node.current_pe_tex_path]
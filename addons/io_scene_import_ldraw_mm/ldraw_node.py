@@ -1,4 +1,9 @@
 import uuid
+from types import MappingProxyType
+
+import mathutils
+
+from io_scene_render_ldraw.ldrawlibrary.token_table import TokenTable
 
 from .geometry_data import GeometryData
 from .import_options import ImportOptions
@@ -9,23 +14,74 @@ from . import ldraw_meta
 from . import matrices
 
 
+# _*_lp_lc_mod
+class TexmapState:
+    """
+    The texmap and PE_TEX state of a node.
+    Only nodes that have texmap or PE_TEX state allocate one, see LDrawNode.texmap_state.
+    """
+
+    __slots__ = ("texmap_start", "texmap_next", "texmap_fallback", "texmaps", "texmap",
+                 "current_pe_tex_path", "current_subfile_pe_tex_path", "pe_tex_infos", "subfile_pe_tex_infos",
+                 "pe_tex_info", "pe_tex_next_shear")
+
+    def __init__(self):
+        self.texmap_start = False
+        self.texmap_next = False
+        self.texmap_fallback = False
+        self.texmaps = []
+        self.texmap = None
+
+        self.current_pe_tex_path = None
+        self.current_subfile_pe_tex_path = None
+        self.pe_tex_infos = {}
+        self.subfile_pe_tex_infos = {}
+        self.pe_tex_info = []
+        self.pe_tex_next_shear = False
+
+
+# the state of every node without texmap or PE_TEX state, its containers are read only
+empty_texmap_state = TexmapState()
+empty_texmap_state.texmaps = ()
+empty_texmap_state.pe_tex_infos = MappingProxyType({})
+empty_texmap_state.subfile_pe_tex_infos = MappingProxyType({})
+empty_texmap_state.pe_tex_info = ()
+# _*_mod_end
+
+
 class LDrawNode:
     """
     A line of a file that has been processed into something usable.
     """
 
+    # _*_lp_lc_mod
+    # a node is created for every line of every file, so nodes are slotted and
+    # the meta_args and texmap state are only allocated for the nodes that use them
+    __slots__ = ("is_root", "file", "line", "color_code", "matrix", "__vertices", "polygons", "polygon_index",
+                 "bfc_certified", "meta_command", "__meta_args", "__texmap_state")
+    # _*_mod_end
+
     part_count = 0
     current_filename = ""
     current_model_filename = ""
 
     key_map = {}
     geometry_datas = {}
+    # _*_lp_lc_mod
+    # interned filename and color code tokens, geometry_data keys are looked up by their IDs
+    tokens = TokenTable()
+    token_keys = {}
+    # _*_mod_end
 
     @classmethod
     def reset_caches(cls):
         cls.part_count = 0
         cls.key_map.clear()
         cls.geometry_datas.clear()
+        # _*_lp_lc_mod
+        cls.token_keys.clear()
+        cls.tokens.clear()
+        # _*_mod_end
 
     def __init__(self):
         self.is_root = False
@@ -33,23 +89,88 @@ class LDrawNode:
         self.line = ""
         self.color_code = "16"
         self.matrix = matrices.identity_matrix
-        self.vertices = []
+        # _*_lp_lc_mod
+        self.__vertices = None
+        self.polygons = None
+        self.polygon_index = None
+        # _*_mod_end
         self.bfc_certified = None
         self.meta_command = None
-        self.meta_args = {}
-
-        self.texmap_start = False
-        self.texmap_next = False
-        self.texmap_fallback = False
-        self.texmaps = []
-        self.texmap = None
-
-        self.current_pe_tex_path = None
-        self.current_subfile_pe_tex_path = None
-        self.pe_tex_infos = {}
-        self.subfile_pe_tex_infos = {}
-        self.pe_tex_info = []
-        self.pe_tex_next_shear = False
+        # _*_lp_lc_mod
+        self.__meta_args = None
+        self.__texmap_state = None
+        # _*_mod_end
+
+    # _*_lp_lc_mod
+    # a geometry line is stored as a polygon of its file's PolygonArrays
+    def set_polygon(self, polygons, polygon_index):
+        self.polygons = polygons
+        self.polygon_index = polygon_index
+        self.__vertices = None
+
+    # the vertices of a geometry line are only created when they are first used
+    @property
+    def vertices(self):
+        if self.__vertices is None:
+            if self.polygons is None:
+                self.__vertices = []
+            else:
+                self.__vertices = [mathutils.Vector(v) for v in self.polygons.polygon_vertices(self.polygon_index).tolist()]
+        return self.__vertices
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self.__vertices = vertices
+
+    @property
+    def meta_args(self):
+        if self.__meta_args is None:
+            self.__meta_args = {}
+        return self.__meta_args
+
+    @meta_args.setter
+    def meta_args(self, meta_args):
+        self.__meta_args = meta_args
+
+    # reading meta_args allocates them, nodes without meta args do not need to
+    def has_meta_args(self):
+        return bool(self.__meta_args)
+
+    # allocates the texmap state of this node, use it to modify the texmap state containers
+    @property
+    def texmap_state(self):
+        if self.__texmap_state is None:
+            self.__texmap_state = TexmapState()
+        return self.__texmap_state
+
+    # reading a texmap state field does not allocate the state,
+    # neither does setting a field to its unset value while there is no state
+    def __texmap_state_field(name):
+        def get(self):
+            state = self.__texmap_state
+            return getattr(empty_texmap_state if state is None else state, name)
+
+        def set(self, value):
+            if self.__texmap_state is None and \
+                    (value is None or value is False or (type(value) in (list, tuple, dict) and not value)):
+                return
+            setattr(self.texmap_state, name, value)
+
+        return property(get, set)
+
+    texmap_start = __texmap_state_field("texmap_start")
+    texmap_next = __texmap_state_field("texmap_next")
+    texmap_fallback = __texmap_state_field("texmap_fallback")
+    texmaps = __texmap_state_field("texmaps")
+    texmap = __texmap_state_field("texmap")
+    current_pe_tex_path = __texmap_state_field("current_pe_tex_path")
+    current_subfile_pe_tex_path = __texmap_state_field("current_subfile_pe_tex_path")
+    pe_tex_infos = __texmap_state_field("pe_tex_infos")
+    subfile_pe_tex_infos = __texmap_state_field("subfile_pe_tex_infos")
+    pe_tex_info = __texmap_state_field("pe_tex_info")
+    pe_tex_next_shear = __texmap_state_field("pe_tex_next_shear")
+    del __texmap_state_field
+    # _*_mod_end
 
     def load(self,
              color_code="16",
@@ -187,7 +308,9 @@ class LDrawNode:
                         subfile_pe_tex_infos = self.subfile_pe_tex_infos.get(subfile_line_index, {})
                         # don't replace the collection in case this file already has pe_tex_infos
                         for k, v in subfile_pe_tex_infos.items():
-                            child_node.pe_tex_infos.setdefault(k, v)
+                            # _*_lp_lc_mod
+                            child_node.texmap_state.pe_tex_infos.setdefault(k, v)
+                            # _*_mod_end
 
                         child_node.load(
                             color_code=child_current_color,
@@ -333,6 +456,16 @@ class LDrawNode:
     # such as 32527.dat (mirror of 32528.dat) will render
     @staticmethod
     def __build_key(filename, color_code=None, pe_tex_info=None, matrix=None):
+        # _*_lp_lc_mod
+        # keys of just a filename and color code are formatted once and then looked up by token IDs
+        token_key = None
+        if not pe_tex_info and matrix is None and color_code is not None:
+            token_key = (LDrawNode.tokens.id(filename), LDrawNode.tokens.id(color_code))
+            key = LDrawNode.token_keys.get(token_key)
+            if key is not None:
+                return key
+        # _*_mod_end
+
         _key = (filename, color_code,)
 
         if pe_tex_info is not None:
@@ -344,10 +477,15 @@ class LDrawNode:
 
         str_key = str(_key)
         if len(str_key) < 60:
-            return str(str_key)
-
-        key = LDrawNode.key_map.get(_key)
-        if key is None:
-            LDrawNode.key_map[_key] = str(uuid.uuid4())
+            key = str(str_key)
+        else:
             key = LDrawNode.key_map.get(_key)
+            if key is None:
+                LDrawNode.key_map[_key] = str(uuid.uuid4())
+                key = LDrawNode.key_map.get(_key)
+
+        # _*_lp_lc_mod
+        if token_key is not None:
+            LDrawNode.token_keys[token_key] = key
+        # _*_mod_end
         return key
@@ -402,6 +402,24 @@ class IMPORT_OT_do_ldraw_import(bpy.types.Operator, ImportHelper):
         **ImportSettings.settings_dict('use_archive_library'),
     )
 
+    use_parse_cache: bpy.props.BoolProperty(
+        name="Use Parse Cache",
+        description="Keep parsed library parts in an on-disk cache so later imports can skip parsing them",
+        **ImportSettings.settings_dict('use_parse_cache'),
+    )
+
+    use_parse_pool: bpy.props.BoolProperty(
+        name="Use Parse Processes",
+        description="Read and tokenize the referenced parts in worker processes before they are parsed",
+        **ImportSettings.settings_dict('use_parse_pool'),
+    )
+
+    incremental_import: bpy.props.BoolProperty(
+        name="Incremental Import",
+        description="When the same model is imported again, only parse and build the MPD submodels that changed",
+        **ImportSettings.settings_dict('incremental_import'),
+    )
+
     verbose: bpy.props.BoolProperty(
         name="Verbose Output",
         description="Output all messages while working, else only show warnings and errors",
@@ -471,6 +489,9 @@ class IMPORT_OT_do_ldraw_import(bpy.types.Operator, ImportHelper):
             self.camera_border_percent   = self.prefs.get("camera_border_percent", self.camera_border_percent)
             self.import_lights           = self.prefs.get("import_lights", self.import_lights)
             self.search_additional_paths = self.prefs.get("search_additional_paths", self.search_additional_paths)
+            self.use_parse_cache         = self.prefs.get("use_parse_cache", self.use_parse_cache)
+            self.use_parse_pool          = self.prefs.get("use_parse_pool", self.use_parse_pool)
+            self.incremental_import      = self.prefs.get("incremental_import", self.incremental_import)
             self.case_sensitive_filesystem = self.prefs.get("case_sensitive_filesystem", self.case_sensitive_filesystem)            
 
             self.custom_ldconfig_file    = self.prefs.get("custom_ldconfig_file",   self.custom_ldconfig_file)
@@ -536,6 +557,9 @@ class IMPORT_OT_do_ldraw_import(bpy.types.Operator, ImportHelper):
             self.prefs['camera_border_percent']   = self.camera_border_percent
             self.prefs['import_lights']           = self.import_lights
             self.prefs['search_additional_paths'] = self.search_additional_paths
+            self.prefs['use_parse_cache']         = self.use_parse_cache
+            self.prefs['use_parse_pool']          = self.use_parse_pool
+            self.prefs['incremental_import']      = self.incremental_import
             self.prefs['case_sensitive_filesystem'] = self.case_sensitive_filesystem            
 
             self.prefs['custom_ldconfig_file']    = self.custom_ldconfig_file
@@ -671,6 +695,9 @@ class IMPORT_OT_do_ldraw_import(bpy.types.Operator, ImportHelper):
         box.prop(self, "studio_ldraw_path")
         box.prop(self, "studio_custom_parts_path")
         box.prop(self, "search_additional_paths")
+        box.prop(self, "use_parse_cache")
+        box.prop(self, "use_parse_pool")
+        box.prop(self, "incremental_import")
         box.prop(self, "case_sensitive_filesystem")
         if not self.ldraw_model_file_loaded:
             box.prop(self, "environment_file")
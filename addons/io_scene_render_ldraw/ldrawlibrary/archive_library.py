@@ -0,0 +1,271 @@
+""" LDraw archive library access shared by the LDraw importers"""
+import os
+import json
+import zlib
+import struct
+import zipfile
+import threading
+from collections import OrderedDict
+
+
+class MemberCache:
+    """Bounded LRU cache of decompressed archive members with byte-size accounting."""
+
+    # Default budget for decompressed member bytes held in memory
+    max_bytes = 64 * 1024 * 1024
+
+    __members = OrderedDict()
+    __bytes = 0
+    __lock = threading.Lock()
+
+    @classmethod
+    def get(cls, key):
+        with cls.__lock:
+            data = cls.__members.get(key)
+            if data is not None:
+                cls.__members.move_to_end(key)
+            return data
+
+    @classmethod
+    def put(cls, key, data):
+        size = len(data)
+        if size > cls.max_bytes:
+            return
+        with cls.__lock:
+            previous = cls.__members.pop(key, None)
+            if previous is not None:
+                cls.__bytes -= len(previous)
+            cls.__members[key] = data
+            cls.__bytes += size
+            while cls.__bytes > cls.max_bytes:
+                _key, evicted = cls.__members.popitem(last=False)
+                cls.__bytes -= len(evicted)
+
+    @classmethod
+    def size(cls):
+        return cls.__bytes
+
+    @classmethod
+    def clear(cls):
+        with cls.__lock:
+            cls.__members.clear()
+            cls.__bytes = 0
+
+
+class ArchiveIndex:
+    """
+    Persistent sidecar index of archive libraries keyed by archive path, size and mtime.
+    Each entry records the archive role and its lowercase member table with offsets,
+    so a cold start does not parse the zip central directory or classify the archive.
+    """
+
+    index_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".cache", "archive_index.json"))
+    index_version = 1
+
+    official_role = "official"
+    unofficial_role = "unofficial"
+
+    # member table fields: [name, header_offset, compress_type, compress_size, file_size]
+    name_field = 0
+    offset_field = 1
+    compress_type_field = 2
+    compress_size_field = 3
+    file_size_field = 4
+
+    __archives = {}
+    __loaded = False
+    __dirty = False
+
+    @classmethod
+    def load(cls):
+        if cls.__loaded:
+            return
+        cls.__loaded = True
+
+        if not os.path.isfile(cls.index_path):
+            return
+        try:
+            with open(cls.index_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return
+        if index.get("version") != cls.index_version:
+            return
+        cls.__archives.update(index.get("archives", {}))
+
+    @classmethod
+    def save(cls):
+        if not cls.__dirty:
+            return
+        cls.__dirty = False
+
+        index = {
+            "version": cls.index_version,
+            "archives": cls.__archives,
+        }
+        # written to a temporary file and renamed, so a reader never sees a partly written index
+        temp_path = f"{cls.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cls.index_path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+            os.replace(temp_path, cls.index_path)
+        except (OSError, ValueError):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    # returns the index entry for archive_path, rebuilding it when size or mtime changed
+    @classmethod
+    def get(cls, archive_path):
+        cls.load()
+
+        stat = os.stat(archive_path)
+        entry = cls.__archives.get(archive_path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return entry
+
+        entry = cls.build(archive_path, stat)
+        cls.__archives[archive_path] = entry
+        cls.__dirty = True
+        return entry
+
+    # returns a new index entry for archive_path without recording it in the index
+    @classmethod
+    def build(cls, archive_path, stat=None):
+        if stat is None:
+            stat = os.stat(archive_path)
+
+        with zipfile.ZipFile(archive_path) as archive:
+            infolist = archive.infolist()
+        names = [info.filename for info in infolist]
+
+        role = None
+        if "ldraw/LDConfig.ldr" in names and "ldraw/p/1-4cyli.dat" in names:
+            role = cls.official_role
+        elif any(name.endswith((".dat", ".ldr", ".mpd")) for name in names):
+            role = cls.unofficial_role
+
+        members = {}
+        for info in infolist:
+            if not info.is_dir():
+                members[info.filename.lower()] = [info.filename, info.header_offset,
+                                                  info.compress_type, info.compress_size, info.file_size]
+
+        return {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "role": role,
+            "members": members,
+        }
+
+
+class ArchiveFile:
+    """Open archive file that reads members directly from their indexed local header offsets."""
+
+    __local_header = struct.Struct("<4s2B4HL2L2H")
+    __local_signature = b"PK\003\004"
+
+    # Process-wide open library archives, shared by both importers
+    __shared = {}
+
+    # returns the shared open archive for archive_path, reopening it if the archive changed
+    # changed is judged as ArchiveIndex judges it, by size or mtime
+    @classmethod
+    def open_shared(cls, archive_path, entry):
+        archive = cls.__shared.get(archive_path)
+        if archive is None or archive.size != entry["size"] or archive.mtime != entry["mtime"]:
+            if archive is not None:
+                archive.close()
+            archive = cls(archive_path, entry)
+            cls.__shared[archive_path] = archive
+        return archive
+
+    def __init__(self, archive_path, entry):
+        self.path = archive_path
+        self.size = entry["size"]
+        self.mtime = entry["mtime"]
+        self.members = entry["members"]
+        self.__file = open(archive_path, "rb")
+        self.__lock = threading.Lock()
+
+    def read(self, member):
+        offset = member[ArchiveIndex.offset_field]
+        compress_type = member[ArchiveIndex.compress_type_field]
+        compress_size = member[ArchiveIndex.compress_size_field]
+
+        if compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            with zipfile.ZipFile(self.path) as archive:
+                return archive.read(member[ArchiveIndex.name_field])
+
+        with self.__lock:
+            self.__file.seek(offset)
+            header = self.__local_header.unpack(self.__file.read(self.__local_header.size))
+            if header[0] != self.__local_signature:
+                raise zipfile.BadZipFile(f"Bad local header for {member[ArchiveIndex.name_field]} in {self.path}")
+            self.__file.seek(header[-2] + header[-1], os.SEEK_CUR)
+            data = self.__file.read(compress_size)
+
+        if compress_type == zipfile.ZIP_DEFLATED:
+            data = zlib.decompress(data, -15)
+        return data
+
+    def close(self):
+        self.__file.close()
+
+
+class ArchiveLibrary:
+    """
+    Lowercase name index over one or more zip archives.
+    Member tables come from ArchiveIndex, members are decompressed on demand through MemberCache.
+    """
+
+    def __init__(self):
+        self.__archives = []
+        self.__members = {}
+
+    def __contains__(self, key):
+        return key in self.__members
+
+    def __len__(self):
+        return len(self.__members)
+
+    # later archives take precedence over earlier ones, matching dict.update
+    # library archives are indexed persistently and their open files are shared process-wide,
+    # other archives, such as Stud.io models, are opened privately and closed by close()
+    def add(self, archive_path, indexed=True):
+        if indexed:
+            archive = ArchiveFile.open_shared(archive_path, ArchiveIndex.get(archive_path))
+        else:
+            archive = ArchiveFile(archive_path, ArchiveIndex.build(archive_path))
+            self.__archives.append(archive)
+        for key in archive.members:
+            self.__members[key] = archive
+
+    def namelist(self):
+        return list(self.__members.keys())
+
+    # returns (archive path, size, mtime) of the archive that holds key, or None
+    def source(self, key):
+        archive = self.__members.get(key)
+        if archive is None:
+            return None
+        return archive.path, archive.size, archive.mtime
+
+    def read(self, key):
+        archive = self.__members.get(key)
+        if archive is None:
+            return None
+        cache_key = (archive.path, archive.size, archive.mtime, key)
+        data = MemberCache.get(cache_key)
+        if data is None:
+            data = archive.read(archive.members[key])
+            MemberCache.put(cache_key, data)
+        return data
+
+    def close(self):
+        for archive in self.__archives:
+            archive.close()
+        del self.__archives[:]
+        self.__members.clear()
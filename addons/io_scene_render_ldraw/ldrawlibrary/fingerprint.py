@@ -0,0 +1,63 @@
+""" LDraw library content fingerprint shared by the LDraw importers"""
+import os
+import hashlib
+
+
+class LibraryFingerprint:
+    """
+    Hash of the library roots, archives, configuration files and import options that parsed
+    library files depend on. An importer keeps its library caches across imports while the
+    fingerprint is unchanged, and clears them when it changes.
+    Directory mtimes only change when entries are added or removed, so files read from disk
+    are also validated individually with file_mtime before they are kept.
+    """
+
+    def __init__(self):
+        self.value = None
+
+    # roots are directories, hashed by path and mtime
+    # archives and files are hashed by path, size and mtime
+    # options are hashed by their repr
+    @staticmethod
+    def compute(roots=(), archives=(), files=(), options=()):
+        digest = hashlib.sha1()
+
+        def add(*items):
+            digest.update(repr(items).encode("utf-8", "backslashreplace"))
+            digest.update(b"\0")
+
+        for path in roots:
+            try:
+                add("root", path, os.stat(path).st_mtime_ns)
+            except OSError:
+                add("root", path, None)
+
+        for path in list(archives) + list(files):
+            try:
+                stat = os.stat(path)
+                add("file", path, stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                add("file", path, None)
+
+        for option in options:
+            add("option", option)
+
+        return digest.hexdigest()
+
+    # the mtime a cached file is validated against, since editing a file in place
+    # does not change the mtime of its directory, or None if path cannot be read
+    @staticmethod
+    def file_mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    # records value and returns True if it differs from the previous fingerprint
+    def update(self, value):
+        changed = value != self.value
+        self.value = value
+        return changed
+
+    def clear(self):
+        self.value = None
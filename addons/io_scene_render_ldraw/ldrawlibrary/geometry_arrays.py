@@ -0,0 +1,149 @@
+""" Array storage of baked LDraw geometry shared by the LDraw importers"""
+import numpy as np
+
+
+class GeometryArrays:
+    """
+    The faces and edges of a file, or of a node with the geometry of its children baked in, in contiguous arrays.
+    Every face has its own vertices, like the lists the importers build meshes from:
+
+    vertices    float64 (vertex count, 3)
+    offsets     int32 (face count + 1), face i uses vertices[offsets[i]:offsets[i + 1]]
+    flags       uint8 (face count), CULLING and WINDING_CCW, the other bits are defined by the importer
+    colours     colour code strings (face count)
+    edges       float64 (edge count, 2, 3)
+    edge_flags  uint8 (edge count), bits defined by the importer
+
+    A child's geometry is appended with one matrix multiply over its vertices, and the faces that are
+    kept, reversed or doubled for back face culling are selected with masks. Appended arrays are
+    concatenated once, when the arrays are next read.
+    """
+
+    CULLING = 1
+    WINDING_CCW = 2
+
+    def __init__(self):
+        self.__vertices = np.empty((0, 3), dtype=np.float64)
+        self.__offsets = np.zeros(1, dtype=np.int32)
+        self.__flags = np.empty(0, dtype=np.uint8)
+        self.__edges = np.empty((0, 2, 3), dtype=np.float64)
+        self.__edge_flags = np.empty(0, dtype=np.uint8)
+        self.colours = []
+        self.__pending = []
+
+    def __len__(self):
+        return len(self.colours)
+
+    # faces and edges are finalized PolygonArrays, the arrays are shared rather than copied
+    @classmethod
+    def from_polygons(cls, faces=None, edges=None):
+        arrays = cls()
+        if faces is not None and len(faces):
+            arrays.__vertices = faces.vertices
+            arrays.__offsets = faces.offsets
+            arrays.__flags = faces.flags
+            arrays.colours = list(faces.colours)
+        if edges is not None and len(edges):
+            arrays.__edges = edges.vertices.reshape(-1, 2, 3)
+            arrays.__edge_flags = np.zeros(len(edges), dtype=np.uint8)
+        return arrays
+
+    @property
+    def vertices(self):
+        self.__flush()
+        return self.__vertices
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self.__flush()
+        self.__vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+
+    @property
+    def offsets(self):
+        self.__flush()
+        return self.__offsets
+
+    @property
+    def flags(self):
+        self.__flush()
+        return self.__flags
+
+    @property
+    def edges(self):
+        self.__flush()
+        return self.__edges
+
+    @edges.setter
+    def edges(self, edges):
+        self.__flush()
+        self.__edges = np.asarray(edges, dtype=np.float64).reshape(-1, 2, 3)
+        if len(self.__edge_flags) != len(self.__edges):
+            self.__edge_flags = np.zeros(len(self.__edges), dtype=np.uint8)
+
+    @property
+    def edge_flags(self):
+        self.__flush()
+        return self.__edge_flags
+
+    # matrix is a 4x4 transform, cull and invert are the back face culling state the source is appended with
+    # a face that is not culled is added with both windings, unless cull_ambiguous, which adds it once
+    # with its arbitrary winding for normals that are resolved later
+    # keep_flags are the importer bits kept from the source faces, edge_flags are set on every appended edge
+    # colour_map replaces the colours of the appended faces, such as the inherited colour with the child's colour
+    def append(self, source, matrix, cull, invert, cull_ambiguous=False, keep_flags=0, edge_flags=0, colour_map=None):
+        matrix = np.array(matrix, dtype=np.float64)
+        rotation = matrix[:3, :3].T
+        translation = matrix[:3, 3]
+
+        if len(source):
+            source_flags = source.flags
+            ccw = ((source_flags & self.WINDING_CCW) != 0) != invert
+            if cull_ambiguous:
+                culled = np.ones(len(source_flags), dtype=bool)
+            else:
+                culled = ((source_flags & self.CULLING) != 0) & bool(cull)
+
+            # each face is followed by its reversed copy, the pairs are flattened in face order
+            emitted = np.flatnonzero(np.column_stack((ccw | ~culled, ~ccw | ~culled)))
+            faces = emitted >> 1
+            is_reversed = (emitted & 1).astype(bool)
+
+            source_offsets = source.offsets
+            counts = (source_offsets[1:] - source_offsets[:-1])[faces]
+            ends = np.cumsum(counts)
+            positions = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts)
+            positions = np.where(np.repeat(is_reversed, counts), np.repeat(counts, counts) - 1 - positions, positions)
+            indices = np.repeat(source_offsets[:-1][faces], counts) + positions
+
+            vertices = (source.vertices @ rotation + translation)[indices]
+            flags = (source_flags[faces] & keep_flags) | self.CULLING | self.WINDING_CCW
+            colours = source.colours
+            if colour_map:
+                colours = [colour_map.get(colour, colour) for colour in colours]
+            self.colours.extend([colours[face] for face in faces.tolist()])
+        else:
+            vertices = np.empty((0, 3), dtype=np.float64)
+            counts = np.empty(0, dtype=np.int32)
+            flags = np.empty(0, dtype=np.uint8)
+
+        edges = source.edges @ rotation + translation
+        self.__pending.append((vertices, counts, flags.astype(np.uint8),
+                               edges, np.full(len(edges), edge_flags, dtype=np.uint8)))
+
+    # vertex index lists of the faces, for callers that build meshes from lists
+    def face_indices(self):
+        offsets = self.offsets.tolist()
+        return [list(range(offsets[i], offsets[i + 1])) for i in range(len(offsets) - 1)]
+
+    def __flush(self):
+        if not self.__pending:
+            return
+        vertices, counts, flags, edges, edge_flags = zip(*self.__pending)
+        self.__pending = []
+
+        counts = np.concatenate(counts)
+        self.__offsets = np.concatenate((self.__offsets, self.__offsets[-1] + np.cumsum(counts))).astype(np.int32)
+        self.__vertices = np.concatenate((self.__vertices,) + vertices)
+        self.__flags = np.concatenate((self.__flags,) + flags)
+        self.__edges = np.concatenate((self.__edges,) + edges)
+        self.__edge_flags = np.concatenate((self.__edge_flags,) + edge_flags)
@@ -0,0 +1,34 @@
+""" Header-only scanning of LDraw files shared by the LDraw importers"""
+
+
+def clean_line(line):
+    return " ".join(line.split())
+
+
+def is_section_start(clean_line):
+    return clean_line.startswith("0 FILE ") or clean_line.startswith("0 NOFILE")
+
+
+def header_lines(lines, is_section=False):
+    """
+    The header of a file as (clean_line, line) pairs: its type 0 lines before the first line of another type.
+    The header of an mpd is the header of its first section, which ends at the next 0 FILE or 0 NOFILE.
+    lines is read up to the line that ends the header, so the type 1 lines that reference child files
+    are never reached. is_section is set when lines is already one section of an mpd.
+    """
+
+    in_section = is_section
+    for line in lines:
+        clean = clean_line(line)
+        if clean == "":
+            continue
+        if clean[:2] not in ("0", "0 "):
+            return
+
+        if is_section_start(clean):
+            if in_section:
+                return
+            in_section = True
+            continue
+
+        yield clean, line
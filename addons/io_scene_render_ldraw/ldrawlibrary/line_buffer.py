@@ -0,0 +1,82 @@
+""" Shared line storage of LDraw files and their MPD sections shared by the LDraw importers"""
+
+
+class LineBuffer:
+    """
+    The lines of one LDraw file, each split into tokens at most once and only when asked for.
+    The MPD sections of the file are LineViews into the buffer rather than copies of its lines,
+    so splitting a file into sections and parsing the sections share the same tokens.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.__tokens = [None] * len(lines)
+        self.__clean_lines = [None] * len(lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    # the whitespace split line, the list is shared by every caller and must not be modified
+    def tokens(self, index):
+        tokens = self.__tokens[index]
+        if tokens is None:
+            tokens = self.__tokens[index] = self.lines[index].split()
+        return tokens
+
+    # the line with leading, trailing and repeated whitespace removed
+    def clean_line(self, index):
+        clean_line = self.__clean_lines[index]
+        if clean_line is None:
+            clean_line = self.__clean_lines[index] = " ".join(self.tokens(index))
+        return clean_line
+
+    # replaces a line before it is parsed, such as a texmap line without its prefix
+    def replace(self, index, line):
+        if line == self.lines[index]:
+            return
+        self.lines[index] = line
+        self.__tokens[index] = None
+        self.__clean_lines[index] = None
+
+    def view(self, start=0, end=None):
+        return LineView(self, start, len(self.lines) if end is None else end)
+
+
+class LineView:
+    """
+    The lines of one file or MPD section as ranges of line indexes into a LineBuffer.
+    Lines can be added by index while the buffer is scanned, consecutive indexes extend the last range.
+    """
+
+    __slots__ = ("buffer", "ranges")
+
+    def __init__(self, buffer, start=0, end=0):
+        self.buffer = buffer
+        self.ranges = [[start, end]] if end > start else []
+
+    # a view of lines that are not in a buffer yet, such as lines assigned by a caller
+    @classmethod
+    def of(cls, lines):
+        if isinstance(lines, LineView):
+            return lines
+        return LineBuffer(list(lines)).view()
+
+    def add(self, index):
+        if self.ranges and self.ranges[-1][1] == index:
+            self.ranges[-1][1] = index + 1
+        else:
+            self.ranges.append([index, index + 1])
+
+    # buffer line indexes in order, for callers that use the buffer tokens
+    def indexes(self):
+        for start, end in self.ranges:
+            yield from range(start, end)
+
+    def __iter__(self):
+        lines = self.buffer.lines
+        for start, end in self.ranges:
+            for index in range(start, end):
+                yield lines[index]
+
+    def __len__(self):
+        return sum(end - start for start, end in self.ranges)
@@ -0,0 +1,53 @@
+""" Bulk construction of Blender meshes from flat arrays shared by the LDraw importers"""
+from itertools import chain
+
+import numpy as np
+
+
+def face_arrays(faces):
+    """
+    The (vertices, offsets) arrays of faces, each a sequence of (x, y, z) vertices,
+    face i uses vertices[offsets[i]:offsets[i + 1]].
+    """
+
+    counts = np.fromiter((len(face) for face in faces), dtype=np.int32, count=len(faces))
+    offsets = np.zeros(len(faces) + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    vertices = np.fromiter(chain.from_iterable(chain.from_iterable(faces)), dtype=np.float64, count=int(offsets[-1]) * 3)
+    return vertices.reshape(-1, 3), offsets
+
+
+def build_mesh(mesh, vertices, offsets, material_indices=None, smooth=None, loop_totals=False, loops=None):
+    """
+    Fills an empty mesh with faces that each have their own vertices, in order, as mesh.from_pydata would,
+    with one foreach_set per attribute rather than a call per vertex or face.
+    loops are the vertex index of each loop of faces that share their vertices, such as WeldedFaces.loops,
+    face i then uses loops[offsets[i]:offsets[i + 1]].
+    The caller updates the mesh, so the edges are calculated once the mesh is complete.
+    loop_totals is needed before Blender 4.0, which derives the polygon sizes from loop_start.
+    """
+
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    offsets = np.ascontiguousarray(offsets, dtype=np.int32)
+    vertex_count = len(vertices)
+    face_count = len(offsets) - 1
+
+    mesh.vertices.add(vertex_count)
+    mesh.vertices.foreach_set("co", vertices.ravel())
+
+    if loops is None:
+        loops = np.arange(vertex_count, dtype=np.int32)
+    else:
+        loops = np.ascontiguousarray(loops, dtype=np.int32)
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set("vertex_index", loops)
+
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set("loop_start", offsets[:-1])
+    if loop_totals:
+        mesh.polygons.foreach_set("loop_total", np.diff(offsets))
+
+    if material_indices is not None:
+        mesh.polygons.foreach_set("material_index", np.ascontiguousarray(material_indices, dtype=np.int32))
+    if smooth is not None:
+        mesh.polygons.foreach_set("use_smooth", np.full(face_count, bool(smooth)))
@@ -0,0 +1,215 @@
+""" Table driven parsing of the LeoCAD and LPub camera and light metas shared by the LDraw importers"""
+
+
+class MetaKeyword:
+    """
+    A keyword of a meta command: the number of tokens after it, the converter of those tokens,
+    and the setter of the converted value, which is an attribute name or a function of (target, value).
+    """
+
+    __slots__ = ("arity", "converter", "setter")
+
+    def __init__(self, arity, converter, setter):
+        self.arity = arity
+        self.converter = converter
+        self.setter = setter
+
+
+class MetaValues:
+    """
+    The keywords of one meta line in the order they were given, as (setter, value) pairs.
+    name is None unless the line ends with NAME, which completes the camera or light.
+    """
+
+    __slots__ = ("values", "name", "unknown", "errors")
+
+    def __init__(self):
+        self.values = []
+        self.name = None
+        self.unknown = []
+        self.errors = []
+
+
+def to_float(args):
+    return float(args[0])
+
+
+def to_vector(args):
+    return tuple(map(float, args))
+
+
+def to_matrix(args):
+    values = tuple(map(float, args))
+    return values[0:3], values[3:6], values[6:9]
+
+
+def to_upper(args):
+    return args[0].upper().strip()
+
+
+def flag(value):
+    return lambda args: value
+
+
+class MetaCommand:
+    """
+    Parses the keywords of a camera or light meta line in one pass over its tokens.
+    Keywords are matched without case, tokens that are not keywords are skipped and reported.
+    NAME takes the rest of the line and is always the last keyword.
+    """
+
+    def __init__(self, command, keywords):
+        self.command = command
+        self.keywords = {}
+        for names, keyword in keywords:
+            for name in names:
+                self.keywords[name] = keyword
+
+    # tokens are the split line, the keywords start at start
+    # line is the unsplit line, so the name keeps its spacing
+    def parse(self, tokens, start=3, line=None):
+        result = MetaValues()
+        keywords = self.keywords
+        count = len(tokens)
+        index = start
+        while index < count:
+            token = tokens[index].upper()
+            if token == "NAME":
+                result.name = meta_name(line, tokens[index + 1:])
+                break
+
+            keyword = keywords.get(token)
+            if keyword is None:
+                # the values of an unknown keyword are skipped with it
+                if token != "" and not is_number(token):
+                    result.unknown.append(token)
+                index += 1
+                continue
+
+            args = tokens[index + 1:index + 1 + keyword.arity]
+            if len(args) < keyword.arity:
+                result.errors.append(f"{token} expects {keyword.arity} value(s)")
+                break
+            try:
+                result.values.append((keyword.setter, keyword.converter(args)))
+            except ValueError:
+                result.errors.append(f"{token} has an invalid value '{' '.join(args)}'")
+            index += 1 + keyword.arity
+        return result
+
+    # setters maps an attribute name to the importer's own setter, or to None to ignore it
+    @staticmethod
+    def apply(target, result, setters=None):
+        for setter, value in result.values:
+            if setters is not None and not callable(setter) and setter in setters:
+                setter = setters[setter]
+                if setter is None:
+                    continue
+            if callable(setter):
+                setter(target, value)
+            else:
+                setattr(target, setter, value)
+
+
+def is_number(token):
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+
+def meta_name(line, tokens):
+    if line is not None:
+        parts = line.split(" NAME ", 1)
+        if len(parts) == 2:
+            return parts[1].strip()
+    return " ".join(tokens)
+
+
+class MetaReport:
+    """
+    Counts the camera and light metas of an import, the keywords that were not recognised,
+    and the lines with missing or invalid values.
+    """
+
+    def __init__(self):
+        self.lines = 0
+        self.unknown = {}
+        self.errors = []
+
+    def record(self, command, result, line=None):
+        self.lines += 1
+        for token in result.unknown:
+            key = (command, token)
+            self.unknown[key] = self.unknown.get(key, 0) + 1
+        for error in result.errors:
+            self.errors.append(f"{command} {error}: {line}" if line is not None else f"{command} {error}")
+
+    def is_valid(self):
+        return not self.unknown and not self.errors
+
+    def summary(self):
+        messages = []
+        for (command, token), count in sorted(self.unknown.items()):
+            messages.append(f"Unknown {command} keyword '{token}' ({count} time(s))")
+        messages.extend(self.errors)
+        return messages
+
+    def clear(self):
+        self.lines = 0
+        self.unknown.clear()
+        self.errors.clear()
+
+
+def set_spot_penumbra_angle(light, penumbra_angle):
+    if penumbra_angle > 0:
+        light.spot_blend = penumbra_angle / light.spot_size
+
+
+def set_cutoff_distance(light, cutoff_distance):
+    light.use_cutoff = True
+    light.cutoff_distance = cutoff_distance
+
+
+def set_light_type(light, light_type):
+    light.type = "SUN" if light_type == "DIRECTIONAL" else light_type
+
+
+# https://www.leocad.org/docs/meta.html
+# the vectors are LDraw coordinates, each importer converts them in its setters
+CAMERA = MetaCommand("CAMERA", [
+    (("FOV",), MetaKeyword(1, to_float, "fov")),
+    (("ZNEAR",), MetaKeyword(1, to_float, "z_near")),
+    (("ZFAR",), MetaKeyword(1, to_float, "z_far")),
+    (("LATITUDE",), MetaKeyword(1, to_float, "latitude")),
+    (("LONGITUDE",), MetaKeyword(1, to_float, "longitude")),
+    (("DISTANCE",), MetaKeyword(1, to_float, "distance")),
+    (("POSITION",), MetaKeyword(3, to_vector, "position")),
+    (("TARGET_POSITION",), MetaKeyword(3, to_vector, "target_position")),
+    (("UP_VECTOR",), MetaKeyword(3, to_vector, "up_vector")),
+    (("ORTHOGRAPHIC",), MetaKeyword(0, flag(True), "orthographic")),
+    (("HIDDEN",), MetaKeyword(0, flag(True), "hidden")),
+])
+
+LIGHT = MetaCommand("LIGHT", [
+    (("POSITION",), MetaKeyword(3, to_vector, "position")),
+    (("TARGET_POSITION",), MetaKeyword(3, to_vector, "target_position")),
+    (("ROTATION",), MetaKeyword(9, to_matrix, "rotation")),
+    (("COLOR", "COLOR_RGB"), MetaKeyword(3, to_vector, "color")),
+    (("BLENDER_POWER", "POWER", "STRENGTH"), MetaKeyword(1, to_float, "exponent")),
+    (("BLENDER_SUN_ANGLE", "BLENDER_ANGLE", "BLENDER_DIRECTIONAL_ANGLE", "ANGLE"),
+     MetaKeyword(1, to_float, "sun_angle")),
+    (("BLENDER_RADIUS", "BLENDER_POINT_RADIUS", "BLENDER_SPOT_RADIUS", "RADIUS"),
+     MetaKeyword(1, to_float, "shadow_radius")),
+    (("SPOT_CONE_ANGLE", "SPOT_SIZE"), MetaKeyword(1, to_float, "spot_size")),
+    (("SPOT_BLEND",), MetaKeyword(1, to_float, "spot_blend")),
+    (("SPOT_PENUMBRA_ANGLE",), MetaKeyword(1, to_float, set_spot_penumbra_angle)),
+    (("AREA_SIZE_X", "AREA_SIZE", "SIZE", "WIDTH"), MetaKeyword(1, to_float, "area_size")),
+    (("AREA_SIZE_Y", "HEIGHT"), MetaKeyword(1, to_float, "area_size_y")),
+    (("AREA_SHAPE", "SHAPE"), MetaKeyword(1, to_upper, "shape")),
+    (("BLENDER_SPECULAR", "SPECULAR"), MetaKeyword(1, to_float, "specular")),
+    (("BLENDER_CUTOFF_DISTANCE", "CUTOFF_DISTANCE"), MetaKeyword(1, to_float, set_cutoff_distance)),
+    (("SHADOWLESS",), MetaKeyword(0, flag(False), "use_shadow")),
+    (("TYPE",), MetaKeyword(1, to_upper, set_light_type)),
+])
@@ -0,0 +1,61 @@
+""" Persistent cache of parsed LDraw files shared by the LDraw importers"""
+import os
+import sys
+import shutil
+import marshal
+import hashlib
+
+
+class ParseCache:
+    """
+    Optional on-disk cache of parsed LDraw files, one marshal record per file.
+    Entries are keyed by the source path, size and mtime and by the options that change the parse,
+    so an edited file or a changed option misses instead of returning a stale record.
+    Records only hold built-in types and bytes, each importer converts its parsed files to and from records.
+    """
+
+    cache_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".cache", "parsed"))
+
+    # bump when the record layout of either importer changes
+    format_version = 1
+
+    # importer is a short name that keeps the records of the importers apart
+    # marshal data is specific to the Python version, so it is part of the key
+    @classmethod
+    def key(cls, importer, source, size, mtime, options):
+        key = (cls.format_version, sys.version_info[:2], importer, source, size, mtime, options)
+        return hashlib.sha1(repr(key).encode("utf-8", "backslashreplace")).hexdigest()
+
+    # returns the record stored under key, or None
+    @classmethod
+    def load(cls, key):
+        try:
+            with open(cls.__entry_path(key), "rb") as file:
+                return marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    # the record is written to a temporary file first, so concurrent imports never read a partial record
+    @classmethod
+    def store(cls, key, record):
+        path = cls.__entry_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as file:
+                marshal.dump(record, file)
+            os.replace(temp_path, path)
+        except (OSError, ValueError):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    # entries of old file versions are not removed as files change, clear removes all entries
+    @classmethod
+    def clear(cls):
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+    @classmethod
+    def __entry_path(cls, key):
+        return os.path.join(cls.cache_dir, key[:2], f"{key}.bin")
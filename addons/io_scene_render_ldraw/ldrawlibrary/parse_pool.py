@@ -0,0 +1,165 @@
+""" Process pool tokenizing of LDraw files shared by the LDraw importers"""
+import os
+import site
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from .text_reader import read_text, split_lines
+
+# line type: number of coordinates after the colour code
+COORDINATE_COUNTS = {"1": 12, "2": 6, "3": 9, "4": 12, "5": 12}
+
+
+def tokenize_lines(lines):
+    """
+    Tokenize the type 1 to 5 lines of an LDraw file.
+    Returns (tokens, references): tokens maps each valid line to
+    (line type, colour code, coordinates, filename, clean line), where filename is the
+    unmodified type 1 filename or None, and references lists the type 1 filenames once each.
+    Lines that do not tokenize are left for the importer to parse and report.
+    """
+    tokens = {}
+    references = {}
+    for line in lines:
+        if line in tokens:
+            continue
+        parameters = line.split()
+        if len(parameters) < 2:
+            continue
+        count = COORDINATE_COUNTS.get(parameters[0])
+        if count is None or len(parameters) < count + 2:
+            continue
+        try:
+            coordinates = tuple(map(float, parameters[2:count + 2]))
+        except ValueError:
+            continue
+        filename = None
+        if parameters[0] == "1":
+            if len(parameters) < 15:
+                continue
+            filename = line.strip().split(maxsplit=14)[14]
+            references[filename] = None
+        tokens[line] = (parameters[0], parameters[1], coordinates, filename, " ".join(parameters))
+    return tokens, list(references)
+
+
+def tokenize_source(source):
+    """
+    Runs in a pool worker, so it must not import bpy or the importer packages.
+    source is ("path", filepath) for a file on disk or ("text", text) for an archive member.
+    Returns (lines, tokens, references), or None if the file cannot be read.
+    """
+    kind, value = source
+    if kind == "path":
+        text = read_text(value)
+        if text is None:
+            return None
+        lines = split_lines(text)
+    else:
+        lines = value.splitlines()
+    tokens, references = tokenize_lines(lines)
+    return lines, tokens, references
+
+
+class WorkerFunction:
+    """
+    A function of this module as the pool workers import it, from the top level ldrawlibrary package.
+    It pickles as an import in the worker, so the host application never imports ldrawlibrary itself.
+    """
+
+    module_name = "ldrawlibrary.parse_pool"
+
+    def __init__(self, name):
+        self.name = name
+
+    def __reduce__(self):
+        return getattr, (WorkerModule(self.module_name), self.name)
+
+
+class WorkerModule:
+    """A module that pickles as its import in the unpickling process"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __reduce__(self):
+        return importlib.import_module, (self.name,)
+
+
+class ParsePool:
+    """
+    Reads and tokenizes the transitive closure of the files referenced by a model in a pool of
+    worker processes before the importer parses them on the main thread. The workers only run
+    this module and text_reader, which are imported as the top level ldrawlibrary package,
+    since the io_scene_render_ldraw package imports bpy. Only the workers have its parent
+    directory on sys.path.
+    """
+
+    max_workers = max(1, min(8, (os.cpu_count() or 2) - 1))
+
+    def __init__(self):
+        self.__executor = None
+        self.__results = {}
+
+    # locate(reference, parent_key) returns (key, source) or None for a type 1 filename,
+    # keys that are already parsed or located before are not submitted again
+    # the worker processes are stopped once the closure is tokenized, the results are kept until taken
+    def tokenize_closure(self, root_key, root_source, locate):
+        if not self.__start():
+            return False
+
+        tokenize = WorkerFunction("tokenize_source")
+        submitted = {root_key}
+        futures = {self.__executor.submit(tokenize, root_source): root_key}
+        try:
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = futures.pop(future)
+                    result = future.result()
+                    if result is None:
+                        continue
+                    self.__results[key] = result
+                    for reference in result[2]:
+                        located = locate(reference, key)
+                        if located is None or located[0] in submitted:
+                            continue
+                        submitted.add(located[0])
+                        futures[self.__executor.submit(tokenize, located[1])] = located[0]
+        except Exception as e:
+            print(f"LDraw parse pool stopped: {e}")
+            self.shutdown()
+            return False
+        finally:
+            self.__stop()
+        return True
+
+    # returns (lines, tokens, references) for key once, or None
+    def take(self, key):
+        return self.__results.pop(key, None)
+
+    def shutdown(self):
+        self.__results.clear()
+        self.__stop()
+
+    def __stop(self):
+        executor = self.__executor
+        self.__executor = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __start(self):
+        if self.__executor is not None:
+            return True
+        library_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        try:
+            # spawn rather than fork the host application, each worker adds library_parent to its own sys.path
+            self.__executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                  mp_context=multiprocessing.get_context("spawn"),
+                                                  initializer=site.addsitedir,
+                                                  initargs=(library_parent,))
+        except (OSError, ValueError) as e:
+            print(f"LDraw parse pool not started: {e}")
+            return False
+        return True
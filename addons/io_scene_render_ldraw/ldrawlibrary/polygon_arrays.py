@@ -0,0 +1,129 @@
+""" Array storage of LDraw polygon lines shared by the LDraw importers"""
+import sys
+
+import numpy as np
+
+
+class PolygonArrays:
+    """
+    The line type 2, 3, 4 and 5 polygons of one LDraw file in contiguous arrays.
+    Polygons are added while the file is parsed and converted to arrays in a single pass by finalize:
+
+    vertices    float64 (vertex count, 3)
+    offsets     int32 (polygon count + 1), polygon i uses vertices[offsets[i]:offsets[i + 1]]
+    line_types  uint8 (polygon count)
+    flags       uint8 (polygon count), bits defined by the importer, such as culling and winding
+    colours     interned colour code strings, since colour codes are not always decimal integers
+    """
+
+    vertex_counts = {"2": 2, "3": 3, "4": 4, "5": 4}
+
+    def __init__(self):
+        self.vertices = np.empty((0, 3), dtype=np.float64)
+        self.offsets = np.zeros(1, dtype=np.int32)
+        self.line_types = np.empty(0, dtype=np.uint8)
+        self.flags = np.empty(0, dtype=np.uint8)
+        self.colours = []
+        self.finalized = False
+
+        self.__coordinates = []
+        self.__line_types = []
+        self.__flags = []
+
+    def __len__(self):
+        return len(self.colours)
+
+    # params are the whitespace split line, returns the index of the new polygon
+    # coordinates are the already converted coordinates of a tokenized line, see ParsePool
+    # the coordinates are converted here, so a line that does not convert raises ValueError and is not added
+    def add(self, params, flags=0, coordinates=None):
+        line_type = params[0]
+        coordinate_count = self.vertex_counts[line_type] * 3
+        if coordinates is None:
+            coordinates = tuple(map(float, params[2:2 + coordinate_count]))
+        if len(coordinates) != coordinate_count:
+            raise ValueError(f"Line type {line_type} needs {coordinate_count} coordinates: {' '.join(params)}")
+
+        self.__coordinates.extend(coordinates)
+        self.__line_types.append(int(line_type))
+        self.__flags.append(flags)
+        self.colours.append(sys.intern(params[1]))
+        return len(self.colours) - 1
+
+    # matrix is an optional 4x4 transform applied to every vertex, such as a scale matrix
+    # fix_bowties reorders the vertices of complex type 4 quadrilaterals
+    def finalize(self, matrix=None, fix_bowties=False):
+        if self.finalized:
+            return
+        self.finalized = True
+
+        self.vertices = np.array(self.__coordinates, dtype=np.float64).reshape(-1, 3)
+        self.line_types = np.array(self.__line_types, dtype=np.uint8)
+        self.flags = np.array(self.__flags, dtype=np.uint8)
+
+        counts = np.where(self.line_types == 3, 3, np.where(self.line_types == 2, 2, 4))
+        self.offsets = np.zeros(len(counts) + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.offsets[1:])
+
+        self.__coordinates = []
+        self.__line_types = []
+        self.__flags = []
+
+        if matrix is not None and len(self.vertices):
+            matrix = np.array(matrix, dtype=np.float64)
+            self.vertices = self.vertices @ matrix[:3, :3].T + matrix[:3, 3]
+
+        if fix_bowties:
+            self.__fix_bowties()
+
+    # https://wiki.ldraw.org/wiki/LDraw_technical_restrictions#Complex_quadrilaterals
+    def __fix_bowties(self):
+        starts = self.offsets[:-1][self.line_types == 4]
+        if not len(starts):
+            return
+
+        indices = starts[:, None] + np.arange(4)
+        points = self.vertices[indices]
+        p0, p1, p2, p3 = points[:, 0], points[:, 1], points[:, 2], points[:, 3]
+        nA = np.cross(p1 - p0, p2 - p0)
+        nB = np.cross(p2 - p1, p3 - p1)
+        nC = np.cross(p3 - p2, p0 - p2)
+
+        swap_last = np.einsum("ij,ij->i", nA, nB) < 0
+        swap_middle = ~swap_last & (np.einsum("ij,ij->i", nB, nC) < 0)
+        if not swap_last.any() and not swap_middle.any():
+            return
+
+        order = np.tile(np.arange(4), (len(starts), 1))
+        order[swap_last] = (0, 1, 3, 2)
+        order[swap_middle] = (0, 2, 1, 3)
+        self.vertices[indices] = points[np.arange(len(starts))[:, None], order]
+
+    # built-in types and bytes only, for ParseCache
+    def to_record(self):
+        self.finalize()
+        return (self.vertices.tobytes(), self.offsets.tobytes(), self.line_types.tobytes(),
+                self.flags.tobytes(), list(self.colours))
+
+    # the arrays of a restored record are read only
+    @classmethod
+    def from_record(cls, record):
+        vertices, offsets, line_types, flags, colours = record
+        polygons = cls()
+        polygons.vertices = np.frombuffer(vertices, dtype=np.float64).reshape(-1, 3)
+        polygons.offsets = np.frombuffer(offsets, dtype=np.int32)
+        polygons.line_types = np.frombuffer(line_types, dtype=np.uint8)
+        polygons.flags = np.frombuffer(flags, dtype=np.uint8)
+        polygons.colours = [sys.intern(colour) for colour in colours]
+        polygons.finalized = True
+        return polygons
+
+    def polygon_vertices(self, index):
+        return self.vertices[self.offsets[index]:self.offsets[index + 1]]
+
+    # vertex index lists of the polygons, for callers that build meshes from lists
+    def polygon_indices(self, polygons=None):
+        offsets = self.offsets.tolist()
+        if polygons is None:
+            polygons = range(len(self.colours))
+        return [list(range(offsets[i], offsets[i + 1])) for i in polygons]
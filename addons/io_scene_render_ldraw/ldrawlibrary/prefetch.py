@@ -0,0 +1,52 @@
+""" Background prefetch of referenced LDraw files shared by the LDraw importers"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    """
+    Runs loader(key) on a thread pool for keys the parser is expected to request next,
+    so file resolution and reading overlap with parsing on the main thread.
+    The loader must not touch bpy and must be safe to run concurrently.
+    """
+
+    max_workers = 4
+
+    def __init__(self, loader):
+        self.__loader = loader
+        self.__executor = None
+        self.__futures = {}
+        self.__lock = threading.Lock()
+
+    def prefetch(self, keys):
+        with self.__lock:
+            for key in keys:
+                if key in self.__futures:
+                    continue
+                if self.__executor is None:
+                    self.__executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                         thread_name_prefix="ldraw_prefetch")
+                self.__futures[key] = self.__executor.submit(self.__loader, key)
+
+    # returns the loader result for key, waiting for it if necessary,
+    # or None if key was not prefetched, was already taken, or its loader raised
+    # taken keys are remembered so they are not prefetched again
+    def take(self, key):
+        with self.__lock:
+            future = self.__futures.get(key)
+            if future is not None:
+                self.__futures[key] = None
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def shutdown(self):
+        with self.__lock:
+            executor = self.__executor
+            self.__executor = None
+            self.__futures.clear()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
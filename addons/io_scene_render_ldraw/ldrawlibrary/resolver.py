@@ -0,0 +1,384 @@
+""" LDraw library path resolution shared by the LDraw importers"""
+import os
+import json
+import threading
+
+from .archive_library import ArchiveIndex, ArchiveLibrary
+from .text_reader import decode_text
+
+
+class ResolverStats:
+    """Process-wide hit and miss counters for part resolution in both importers."""
+
+    hits = 0
+    archive_hits = 0
+    misses = 0
+    negative_hits = 0
+
+    # locate also runs on prefetch threads
+    __lock = threading.Lock()
+
+    @classmethod
+    def hit(cls):
+        with cls.__lock:
+            cls.hits += 1
+
+    @classmethod
+    def archive_hit(cls):
+        with cls.__lock:
+            cls.archive_hits += 1
+
+    @classmethod
+    def miss(cls):
+        with cls.__lock:
+            cls.misses += 1
+
+    @classmethod
+    def negative_hit(cls):
+        with cls.__lock:
+            cls.negative_hits += 1
+
+    @classmethod
+    def reset(cls):
+        with cls.__lock:
+            cls.hits = 0
+            cls.archive_hits = 0
+            cls.misses = 0
+            cls.negative_hits = 0
+
+    @classmethod
+    def summary(cls):
+        return f"resolved {cls.hits} file(s), {cls.archive_hits} archive file(s), " \
+               f"{cls.misses} miss(es), {cls.negative_hits} repeated miss(es)"
+
+
+class PathIndex:
+    """
+    Process-wide, persistent index of directory listings used to resolve LDraw paths case-insensitively.
+    Every indexed directory records its mtime and is checked at most once per session,
+    so only directories that changed are rescanned.
+    """
+
+    index_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".cache", "path_index.json"))
+    index_version = 1
+
+    __directories = {}
+    __loaded = False
+    __dirty = False
+
+    # per session state
+    __validated = set()
+    __names = {}
+    __resolved = {}
+
+    # starts a new session, directories are checked against their mtime again when next used
+    @classmethod
+    def begin_session(cls):
+        cls.__validated.clear()
+        cls.__names.clear()
+        cls.__resolved.clear()
+
+    @classmethod
+    def reset_caches(cls):
+        cls.begin_session()
+        cls.__directories.clear()
+        cls.__loaded = False
+        cls.__dirty = False
+
+    @classmethod
+    def load(cls):
+        if cls.__loaded:
+            return
+        cls.__loaded = True
+
+        if not os.path.isfile(cls.index_path):
+            return
+        try:
+            with open(cls.index_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return
+        if index.get("version") != cls.index_version:
+            return
+        for path, entry in index.get("directories", {}).items():
+            cls.__directories.setdefault(path, entry)
+
+    @classmethod
+    def save(cls):
+        if not cls.__dirty:
+            return
+        cls.__dirty = False
+
+        index = {
+            "version": cls.index_version,
+            "directories": cls.__directories,
+        }
+        # replaced in one rename, so another Blender process never loads half an index
+        temp_path = f"{cls.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cls.index_path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+            os.replace(temp_path, cls.index_path)
+        except (OSError, ValueError):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    # returns {lowercase relative name: actual relative name} for the files in path
+    # depth 0 indexes the files in path, depth 1 also indexes the files in its subdirectories
+    @classmethod
+    def get_files(cls, path, depth=0):
+        files = {}
+        entry = cls.__get_entry(path)
+        if entry is None:
+            return files
+        for name in entry["files"]:
+            files.setdefault(name.lower(), name)
+
+        if depth > 0:
+            for subdir in entry["subdirs"]:
+                sub_entry = cls.__get_entry(os.path.join(path, subdir))
+                if sub_entry is None:
+                    continue
+                for name in sub_entry["files"]:
+                    files.setdefault(os.path.join(subdir.lower(), name.lower()), os.path.join(subdir, name))
+
+        return files
+
+    # returns the files and subdirectories of path keyed by their actual and lowercase names,
+    # or None if path cannot be listed
+    @classmethod
+    def get_names(cls, path):
+        names = cls.__names.get(path)
+        if names is not None:
+            return names
+
+        entry = cls.__get_entry(path or os.curdir)
+        if entry is None:
+            return None
+        actual = entry["files"] + entry["subdirs"]
+        names = {}
+        for name in actual:
+            names.setdefault(name.lower(), name)
+        # an exact match takes precedence over a different-case match
+        for name in actual:
+            names[name] = name
+        cls.__names[path] = names
+        return names
+
+    # memoized case-insensitive resolution of path
+    # returns None if path does not resolve to an existing file or directory
+    @classmethod
+    def resolve_path(cls, path):
+        try:
+            return cls.__resolved[path]
+        except KeyError:
+            pass
+        resolved = cls.__resolve_path(path)
+        cls.__resolved[path] = resolved
+        return resolved
+
+    # resolve path one component at a time against the indexed directory listings
+    @classmethod
+    def __resolve_path(cls, path):
+        if path == '':
+            return path
+
+        # dir ends with a slash?
+        stripped = path.rstrip(os.sep + (os.altsep or ''))
+        if stripped and stripped != path:
+            resolved = cls.resolve_path(stripped)
+            if resolved is None:
+                return None
+            return resolved + path[len(stripped):]
+
+        base = os.path.basename(path)  # may be a directory or a file
+        dirname = os.path.dirname(path)
+
+        # filesystem root cannot be looked up in a listing
+        if not base or dirname == path:
+            return path if os.path.exists(path) else None
+
+        if dirname:
+            dirname = cls.resolve_path(dirname)
+            if dirname is None:
+                return None
+
+        # neither can relative components
+        if base in (os.curdir, os.pardir):
+            path = os.path.join(dirname, base)
+            return path if os.path.exists(path) else None
+
+        names = cls.get_names(dirname)
+        if names is None:
+            return path if os.path.exists(path) else None
+
+        actual = names.get(base) or names.get(base.lower())
+        if actual is None:
+            return None
+        return os.path.join(dirname, actual)
+
+    # returns the index entry for path, rescanning it if its mtime differs from the indexed one
+    # and it has not been checked this session, or None if path is not a directory
+    @classmethod
+    def __get_entry(cls, path):
+        cls.load()
+
+        if path in cls.__validated:
+            return cls.__directories.get(path)
+        cls.__validated.add(path)
+
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            if cls.__directories.pop(path, None) is not None:
+                cls.__dirty = True
+            return None
+
+        entry = cls.__directories.get(path)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry
+
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for dir_entry in it:
+                    if dir_entry.is_dir():
+                        subdirs.append(dir_entry.name)
+                    else:
+                        files.append(dir_entry.name)
+        except OSError:
+            cls.__directories.pop(path, None)
+            return None
+
+        entry = {
+            "mtime": mtime,
+            "files": files,
+            "subdirs": subdirs,
+        }
+        cls.__directories[path] = entry
+        cls.__dirty = True
+        return entry
+
+
+class LibraryArchives:
+    """
+    Process-wide official and unofficial library archives, shared by both importers.
+    Each import loads the archives its options allow, search-path construction stays in the importer.
+    """
+
+    not_found = -2
+    all_libraries = -1
+    official_library = 0
+    unofficial_library = 1
+
+    has_official = False
+    has_unofficial = False
+
+    # paths of the loaded archives, in load order
+    __paths = []
+
+    # members are decompressed on demand
+    __official = ArchiveLibrary()
+    __unofficial = ArchiveLibrary()
+
+    @classmethod
+    def clear(cls):
+        cls.has_official = False
+        cls.has_unofficial = False
+        cls.__official.close()
+        cls.__unofficial.close()
+        del cls.__paths[:]
+
+    @classmethod
+    def paths(cls):
+        return cls.__paths
+
+    # adds the archives in directory that are not loaded yet, the first official archive is the official library
+    # and every other archive of LDraw files is added to the unofficial library if use_unofficial is set
+    # report is called with a message for each archive that is loaded
+    # returns True if any library archive is loaded
+    @classmethod
+    def load(cls, directory, use_unofficial=True, report=None):
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if not name.endswith((".zip", ".bin")) or path in cls.__paths:
+                continue
+
+            role = ArchiveIndex.get(path)["role"]
+            if not cls.has_official and role == ArchiveIndex.official_role:
+                cls.__official.add(path)
+                cls.has_official = True
+                kind = "official"
+            elif use_unofficial and role is not None:
+                cls.__unofficial.add(path)
+                cls.has_unofficial = True
+                kind = "unofficial"
+            else:
+                continue
+            cls.__paths.append(path)
+            if report is not None:
+                report(f"Load {kind} archive library: {path}")
+        ArchiveIndex.save()
+
+        return cls.has_official or cls.has_unofficial
+
+    @classmethod
+    def file_exists(cls, key):
+        if key in cls.__official:
+            return cls.official_library
+        elif key in cls.__unofficial:
+            return cls.unofficial_library
+        return cls.not_found
+
+    # returns (archive path, size, mtime) of the archive library that holds key, or None
+    @classmethod
+    def source(cls, key, library):
+        if library == cls.official_library:
+            return cls.__official.source(key)
+        elif library == cls.unofficial_library:
+            return cls.__unofficial.source(key)
+        return None
+
+    # returns the decoded text of key, or None
+    # all_libraries searches the official library first, unless prefer_unofficial is set
+    @classmethod
+    def read(cls, key, library=all_libraries, prefer_unofficial=False):
+        if library == cls.official_library:
+            libraries = [cls.__official]
+        elif library == cls.unofficial_library:
+            libraries = [cls.__unofficial]
+        elif prefer_unofficial:
+            libraries = [cls.__unofficial, cls.__official]
+        else:
+            libraries = [cls.__official, cls.__unofficial]
+
+        for archive_library in libraries:
+            data = archive_library.read(key)
+            if data is not None:
+                return decode_text(data)
+        return None
+
+    # returns [library, archive path] of the first member named part_name below one of search_paths, or None
+    @classmethod
+    def locate(cls, part_name, search_paths):
+        for path in search_paths:
+            archive_path = os.path.join(path, part_name.lower()).replace("\\", "/")
+            library = cls.file_exists(archive_path)
+            if library != cls.not_found:
+                ResolverStats.archive_hit()
+                return [library, archive_path]
+        return None
+
+
+# returns the first of the directories that holds part_path, matched case-insensitively, or None
+def locate_file(part_path, directories):
+    for directory in directories:
+        full_path = PathIndex.resolve_path(os.path.join(directory, part_path))
+        if full_path is not None and os.path.isfile(full_path):
+            ResolverStats.hit()
+            return full_path
+    return None
@@ -0,0 +1,73 @@
+""" Content hashes of the MPD sections of an import shared by the LDraw importers"""
+import hashlib
+
+
+class SectionHistory:
+    """
+    The content hashes and type 1 references of the MPD sections of the previous import of a model,
+    to find the sections that changed since then and the sections that contain them.
+    Section names are compared in lower case, like LDraw filenames.
+    """
+
+    def __init__(self):
+        self.__model = None
+        self.__previous = {}
+        self.__current = {}
+        self.__references = {}
+        self.dirty = set()
+
+    @staticmethod
+    def content_hash(lines):
+        digest = hashlib.sha1()
+        for line in lines:
+            digest.update(line.encode("utf-8", "surrogatepass"))
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    # starts an import of model, returns False if the previous import was of another model,
+    # in which case no section is unchanged
+    def begin(self, model):
+        is_same_model = model is not None and model == self.__model
+        self.__model = model
+        self.__previous = self.__current if is_same_model else {}
+        self.__current = {}
+        self.__references = {}
+        self.dirty = set()
+        return is_same_model
+
+    # records a section of this import, returns True if its content is the same as in the previous import
+    def add(self, name, lines, references):
+        name = name.lower()
+        content_hash = self.content_hash(lines)
+        self.__current[name] = content_hash
+        self.__references[name] = {reference.lower() for reference in references}
+        return self.__previous.get(name) == content_hash
+
+    def names(self):
+        return set(self.__current)
+
+    # the sections that are new, changed or removed since the previous import and every section that contains one
+    def finish(self):
+        dirty = {name for name, content_hash in self.__current.items() if self.__previous.get(name) != content_hash}
+        dirty.update(name for name in self.__previous if name not in self.__current)
+
+        parents = {}
+        for name, references in self.__references.items():
+            for reference in references:
+                parents.setdefault(reference, set()).add(name)
+
+        pending = list(dirty)
+        while pending:
+            for parent in parents.get(pending.pop(), ()):
+                if parent not in dirty:
+                    dirty.add(parent)
+                    pending.append(parent)
+
+        self.dirty = dirty
+        return dirty
+
+    def is_dirty(self, name):
+        return name.lower() in self.dirty
+
+    def clear(self):
+        self.begin(None)
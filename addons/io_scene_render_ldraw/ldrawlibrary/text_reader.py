@@ -0,0 +1,39 @@
+""" LDraw text file reading shared by the LDraw importers"""
+import io
+import codecs
+
+# Byte order marks and the codec that decodes (and drops) them
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF8, "utf_8_sig"),
+    (codecs.BOM_UTF16_BE, "utf_16"),
+    (codecs.BOM_UTF16_LE, "utf_16"),
+)
+
+
+def decode_text(data):
+    """Decode file bytes using their byte order mark, LDraw standard UTF-8, or Latin 1 as a last resort."""
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if data.startswith(bom):
+            try:
+                return data.decode(encoding)
+            except UnicodeDecodeError:
+                break
+    try:
+        return data.decode("utf_8")
+    except UnicodeDecodeError:
+        return data.decode("latin_1")
+
+
+def split_lines(text):
+    """Split text into lines with universal newlines, as reading a file in text mode does."""
+    return io.StringIO(text, newline=None).readlines()
+
+
+def read_text(filepath):
+    """Open filepath once and return its decoded text, or None if it cannot be read."""
+    try:
+        with open(filepath, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    return decode_text(data)
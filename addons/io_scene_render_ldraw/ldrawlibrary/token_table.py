@@ -0,0 +1,37 @@
+""" Interned filename and colour code tokens shared by the LDraw importers"""
+import sys
+
+
+class TokenTable:
+    """
+    Interns the filename and colour code tokens of parsed lines and numbers them.
+    Equal tokens share one string object, and each token has a small integer ID,
+    so the geometry and material cache keys are tuples of integers rather than strings.
+    IDs are only valid until the table is cleared.
+    """
+
+    def __init__(self):
+        self.__ids = {}
+        self.__tokens = []
+
+    def __len__(self):
+        return len(self.__tokens)
+
+    def id(self, token):
+        token_id = self.__ids.get(token)
+        if token_id is None:
+            token = sys.intern(token)
+            token_id = self.__ids[token] = len(self.__tokens)
+            self.__tokens.append(token)
+        return token_id
+
+    # the shared string object of token
+    def intern(self, token):
+        return self.__tokens[self.id(token)]
+
+    def token(self, token_id):
+        return self.__tokens[token_id]
+
+    def clear(self):
+        self.__ids.clear()
+        self.__tokens.clear()
@@ -0,0 +1,183 @@
+""" Welding of the coincident vertices of baked LDraw faces shared by the LDraw importers"""
+import numpy as np
+
+# half of the 26 cells around a cell, a pair of neighbouring cells is found once, from its first cell
+NEIGHBOUR_OFFSETS = np.array([(x, y, z)
+                              for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)
+                              if (x, y, z) > (0, 0, 0)], dtype=np.int64)
+
+
+class WeldedFaces:
+    """
+    Faces that share their welded vertices, as an indexed mesh:
+
+    vertices    float64 (welded vertex count, 3), in the order they are first used
+    loops       int32 (loop count), the vertex index of each loop
+    offsets     int32 (face count + 1), face i uses loops[offsets[i]:offsets[i + 1]]
+    faces       int32 (face count), the index of each face in the faces that were welded
+
+    Faces that collapse to fewer than three vertices, use a vertex twice, or repeat an earlier face in the
+    same winding are dropped, so faces maps the welded faces back to their colours and flags.
+    """
+
+    __slots__ = ("vertices", "loops", "offsets", "faces")
+
+    def __init__(self, vertices, loops, offsets, faces):
+        self.vertices = vertices
+        self.loops = loops
+        self.offsets = offsets
+        self.faces = faces
+
+    def __len__(self):
+        return len(self.faces)
+
+
+def weld_faces(vertices, offsets, distance):
+    """
+    Welds the vertices of faces that each have their own vertices, face i uses vertices[offsets[i]:offsets[i + 1]].
+    The vertices are hashed into a grid of cells the size of distance, so the vertices within distance of a vertex
+    are in its cell or a neighbouring cell. A vertex is welded to the first vertex within distance that is not
+    itself welded to an earlier vertex, so no vertex moves further than distance, and the result does not
+    depend on the order the cells are visited in. A distance of None or 0 keeps every vertex.
+    """
+
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    offsets = np.asarray(offsets, dtype=np.int32)
+    face_count = len(offsets) - 1
+    if not distance or not len(vertices):
+        return WeldedFaces(vertices, np.arange(len(vertices), dtype=np.int32), offsets,
+                           np.arange(face_count, dtype=np.int32))
+
+    # a vertex is only welded to an earlier vertex, so the welded vertices keep the order of the source
+    welded, loops = np.unique(_weld_vertices(vertices, distance), return_inverse=True)
+    loops = loops.ravel().astype(np.int32)
+    return _clean_faces(vertices[welded], loops, offsets)
+
+
+# the index of the vertex each vertex is welded to, itself if it is not welded
+# the grid only finds the candidate pairs, a pair is welded if its vertices are within distance
+def _weld_vertices(vertices, distance):
+    # each axis numbers its occupied cell coordinates, so a cell key is unique and fits an int64
+    grid = np.floor(vertices / distance).astype(np.int64)
+    ranks = []
+    steps = []
+    for axis in range(3):
+        values, rank = np.unique(grid[:, axis], return_inverse=True)
+        ranks.append(rank.ravel())
+        # the rank of the coordinate one cell either side of each coordinate, or -1 if it is not occupied
+        step = {}
+        for direction in (-1, 1):
+            shifted = np.minimum(np.searchsorted(values, values + direction), len(values) - 1)
+            step[direction] = np.where(values[shifted] == values + direction, shifted, -1)
+        steps.append(step)
+    sizes = [len(step[1]) for step in steps]
+
+    def cell_key(x, y, z):
+        return (x * sizes[1] + y) * sizes[2] + z
+
+    keys, first, cell_of = np.unique(cell_key(*ranks), return_index=True, return_inverse=True)
+    cell_of = cell_of.ravel()
+    cell_count = len(keys)
+    cell_ranks = [rank[first] for rank in ranks]
+
+    # the vertices of cell c are order[starts[c]:starts[c] + counts[c]], in vertex order
+    order = np.argsort(cell_of, kind="stable")
+    counts = np.bincount(cell_of, minlength=cell_count)
+    starts = np.cumsum(counts) - counts
+
+    # the pairs of cells to search, each cell with more than one vertex with itself, and each cell with its neighbours
+    crowded = np.flatnonzero(counts > 1)
+    cells_a = [crowded]
+    cells_b = [crowded]
+    for offset in NEIGHBOUR_OFFSETS:
+        neighbour_ranks = [rank if direction == 0 else step[direction][rank]
+                           for rank, step, direction in zip(cell_ranks, steps, offset.tolist())]
+        a = np.flatnonzero((neighbour_ranks[0] >= 0) & (neighbour_ranks[1] >= 0) & (neighbour_ranks[2] >= 0))
+        neighbours = cell_key(*(rank[a] for rank in neighbour_ranks))
+        found = np.minimum(np.searchsorted(keys, neighbours), cell_count - 1)
+        matched = keys[found] == neighbours
+        cells_a.append(a[matched])
+        cells_b.append(found[matched])
+    cells_a = np.concatenate(cells_a)
+    cells_b = np.concatenate(cells_b)
+
+    # every vertex of the first cell of a pair with every vertex of the second cell
+    pair_counts = counts[cells_a] * counts[cells_b]
+    pairs = np.repeat(np.arange(len(cells_a)), pair_counts)
+    local = np.arange(len(pairs)) - np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+    columns = counts[cells_b][pairs]
+    a = order[starts[cells_a][pairs] + local // columns]
+    b = order[starts[cells_b][pairs] + local % columns]
+
+    # a pair of vertices in the same cell is found both ways round
+    candidates = (a < b) | (cells_a[pairs] != cells_b[pairs])
+    a = a[candidates]
+    b = b[candidates]
+    close = np.linalg.norm(vertices[a] - vertices[b], axis=1) <= distance
+    low = np.minimum(a[close], b[close])
+    high = np.maximum(a[close], b[close])
+
+    # as remove_doubles, each vertex is welded to the first vertex within distance that is not itself welded,
+    # so vertices are only moved to a vertex within distance, and welds do not chain through the vertices between
+    # a vertex whose first partner has no earlier partner of its own is welded to it, the rest are welded in order
+    first_partner = np.arange(len(vertices))
+    np.minimum.at(first_partner, high, low)
+    resolved = first_partner[first_partner] == first_partner
+    targets = np.where(resolved, first_partner, np.arange(len(vertices))).tolist()
+    remaining = ~resolved[high]
+    low = low[remaining]
+    high = high[remaining]
+    order = np.lexsort((high, low))
+    for i, j in zip(low[order].tolist(), high[order].tolist()):
+        if targets[i] == i and targets[j] == j:
+            targets[j] = i
+    return np.array(targets, dtype=np.int64)
+
+
+def _clean_faces(vertices, loops, offsets):
+    face_count = len(offsets) - 1
+    counts = np.diff(offsets)
+    loop_faces = np.repeat(np.arange(face_count), counts)
+
+    # drop the loops that repeat the vertex of the next loop around their face
+    following = np.arange(1, len(loops) + 1)
+    ends = offsets[1:][counts > 0]
+    following[ends - 1] = offsets[:-1][counts > 0]
+    kept = loops != loops[following]
+    loops = loops[kept]
+    loop_faces = loop_faces[kept]
+    counts = np.bincount(loop_faces, minlength=face_count)
+
+    valid = counts >= 3
+    order = np.lexsort((loops, loop_faces))
+    repeated = (loop_faces[order][1:] == loop_faces[order][:-1]) & (loops[order][1:] == loops[order][:-1])
+    valid[loop_faces[order][1:][repeated]] = False
+
+    faces = np.flatnonzero(valid)
+    if len(faces):
+        # the vertices of each face from its lowest vertex, padded with -1, find the faces that repeat an earlier
+        # face in the same winding, a face and its reversed copy are both kept
+        kept = valid[loop_faces]
+        loops = loops[kept]
+        counts = counts[faces]
+        starts = np.cumsum(counts) - counts
+        positions = np.arange(len(loops)) - np.repeat(starts, counts)
+        lowest = np.repeat(np.minimum.reduceat(loops, starts), counts)
+        rotations = np.repeat(positions[loops == lowest], counts)
+        rows = np.full((len(faces), counts.max()), -1, dtype=np.int64)
+        rows[np.repeat(np.arange(len(faces)), counts), (positions - rotations) % np.repeat(counts, counts)] = loops
+        _, unique = np.unique(rows, axis=0, return_index=True)
+        unique.sort()
+        if len(unique) < len(faces):
+            kept = np.repeat(np.isin(np.arange(len(faces)), unique), counts)
+            loops = loops[kept]
+            counts = counts[unique]
+            faces = faces[unique]
+    else:
+        loops = loops[:0]
+        counts = counts[:0]
+
+    offsets = np.zeros(len(faces) + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    used, loops = np.unique(loops, return_inverse=True)
+    return WeldedFaces(vertices[used], loops.ravel().astype(np.int32), offsets, faces.astype(np.int32))
@@ -61,7 +61,8 @@ class Preferences():
         # Version 1.5 and later attribute updates:
         for section in self.__config.sections():
             if section == "ImportLDraw":
-                addList = ['realgapwidth,0.0002', 'realscale,1.0']
+                addList = ['realgapwidth,0.0002', 'realscale,1.0', 'useparsecache,False', 'useparsepool,False',
+                           'incrementalimport,False']
                 for addItem in addList:
                     pair = addItem.split(",")
                     if not self.__config.has_option(section, pair[0]):
@@ -73,7 +74,8 @@ class Preferences():
                         self.__config[section].pop(popItem)
                         self.__updateIni = True
             elif section == "ImportLDrawMM":
-                addList = ['studiocustompartspath,', 'scalestrategy,mesh']
+                addList = ['studiocustompartspath,', 'scalestrategy,mesh', 'useparsecache,False', 'useparsepool,False',
+                           'incrementalimport,False']
                 addList += ['casesensitivefilesystem,True'] if sys.platform == "linux" else ['casesensitivefilesystem,False']
                 for addItem in addList:
                     pair = addItem.split(",")
@@ -159,6 +161,9 @@ class Preferences():
                 'use_archive_library': self.__config[self.__sectionName]['usearchivelibrary'],
                 'use_colour_scheme': self.__config[self.__sectionName]['usecolourscheme'],
                 'use_freestyle_edges': self.__config[self.__sectionName]['usefreestyleedges'],
+                'use_parse_cache': self.__config[self.__sectionName]['useparsecache'],
+                'use_parse_pool': self.__config[self.__sectionName]['useparsepool'],
+                'incremental_import': self.__config[self.__sectionName]['incrementalimport'],
                 'verbose': self.__config[self.__sectionName]['verbose']
             }
         else:
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# ldrawlibrary does not use bpy, so it is imported without the add-on package that loads it in Blender
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "addons", "io_scene_render_ldraw"))
@@ -0,0 +1,72 @@
+from ldrawlibrary.header_scan import header_lines
+
+MPD = """0 FILE model.ldr
+0 Model
+0 Name: model.ldr
+0 Author: Jane Builder
+0 !LDRAW_ORG Unofficial_Model
+0 !CATEGORY Vehicle
+
+1 4 0 0 0 1 0 0 0 1 0 0 0 1 wheel.ldr
+1 16 0 -24 0 1 0 0 0 1 0 0 0 1 3001.dat
+0 NOFILE
+0 FILE wheel.ldr
+0 Wheel
+0 Name: wheel.ldr
+1 0 0 0 0 1 0 0 0 1 0 0 0 1 3641.dat
+0 NOFILE
+"""
+
+PART = """0 Brick  2 x  4
+0 Name: 3001.dat
+0 Author: James Jessiman
+0 !LDRAW_ORG Part UPDATE 2004-03
+0 !LICENSE Licensed under CC BY 2.0 and CC BY 4.0 : see CAreadme.txt
+
+0 BFC CERTIFY CCW
+
+0 !KEYWORDS brick
+1 16 0 4 0 1 0 0 0 -5 0 0 0 1 s\\3001s01.dat
+4 16 40 24 20 -40 24 20 -40 24 -20 40 24 -20
+"""
+
+
+class ReadLines:
+    """The lines of a text, recording how many were read"""
+
+    def __init__(self, text):
+        self.lines = text.splitlines()
+        self.read = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+
+def test_mpd_header_is_its_first_section_header():
+    lines = ReadLines(MPD)
+    header = [clean for clean, line in header_lines(lines)]
+    assert header == ["0 Model", "0 Name: model.ldr", "0 Author: Jane Builder",
+                      "0 !LDRAW_ORG Unofficial_Model", "0 !CATEGORY Vehicle"]
+    # the scan stops at the first type 1 line, so no child file is referenced
+    assert lines.lines[lines.read - 1].startswith("1 4 ")
+
+
+def test_mpd_section_header_ends_at_the_next_section():
+    lines = ReadLines("\n".join(["0 Model", "0 Name: model.ldr", "0 FILE wheel.ldr", "0 Wheel"]))
+    header = [clean for clean, line in header_lines(lines, is_section=True)]
+    assert header == ["0 Model", "0 Name: model.ldr"]
+    assert lines.read == 3
+
+
+def test_part_header_stops_before_child_files():
+    lines = ReadLines(PART)
+    header = [(clean, line) for clean, line in header_lines(lines)]
+    assert [clean for clean, line in header] == [
+        "0 Brick 2 x 4", "0 Name: 3001.dat", "0 Author: James Jessiman", "0 !LDRAW_ORG Part UPDATE 2004-03",
+        "0 !LICENSE Licensed under CC BY 2.0 and CC BY 4.0 : see CAreadme.txt", "0 BFC CERTIFY CCW",
+        "0 !KEYWORDS brick"]
+    # the unclean line keeps its spacing for the description
+    assert header[0][1] == "0 Brick  2 x  4"
+    assert lines.read == len(PART.splitlines()) - 1
@@ -0,0 +1,58 @@
+import os
+import json
+import zipfile
+
+from ldrawlibrary.archive_library import ArchiveIndex, ArchiveLibrary
+from ldrawlibrary.resolver import PathIndex
+
+
+def test_archive_index_is_replaced_without_leaving_a_temporary_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(ArchiveIndex, "index_path", str(tmp_path / "cache" / "archive_index.json"))
+    archive_path = str(tmp_path / "ldrawunf.zip")
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("parts/3001.dat", "0 Brick 2 x 4")
+
+    ArchiveIndex.get(archive_path)
+    ArchiveIndex.save()
+
+    assert os.listdir(tmp_path / "cache") == ["archive_index.json"]
+    with open(ArchiveIndex.index_path, encoding="utf-8") as file:
+        index = json.load(file)
+    assert index["archives"][archive_path]["role"] == ArchiveIndex.unofficial_role
+
+
+def test_path_index_is_replaced_without_leaving_a_temporary_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(PathIndex, "index_path", str(tmp_path / "cache" / "path_index.json"))
+    PathIndex.reset_caches()
+    (tmp_path / "parts").mkdir()
+    (tmp_path / "parts" / "3001.dat").write_text("0 Brick 2 x 4")
+
+    assert PathIndex.get_files(str(tmp_path / "parts")) == {"3001.dat": "3001.dat"}
+    PathIndex.save()
+    PathIndex.reset_caches()
+
+    assert os.listdir(tmp_path / "cache") == ["path_index.json"]
+    with open(PathIndex.index_path, encoding="utf-8") as file:
+        index = json.load(file)
+    assert index["directories"][str(tmp_path / "parts")]["files"] == ["3001.dat"]
+
+
+def test_shared_archive_is_reopened_when_only_its_size_changed(tmp_path, monkeypatch):
+    monkeypatch.setattr(ArchiveIndex, "index_path", str(tmp_path / "archive_index.json"))
+    archive_path = str(tmp_path / "ldrawunf.zip")
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("parts/3001.dat", "0 Brick 2 x 4")
+    library = ArchiveLibrary()
+    library.add(archive_path)
+    assert library.read("parts/3001.dat") == b"0 Brick 2 x 4"
+    mtime = os.stat(archive_path).st_mtime_ns
+
+    # replaced by a larger archive with the same mtime
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("parts/readme.txt", "padding " * 100)
+        archive.writestr("parts/3001.dat", "0 Brick 2 x 4 replaced")
+    os.utime(archive_path, ns=(mtime, mtime))
+
+    library = ArchiveLibrary()
+    library.add(archive_path)
+    assert library.read("parts/3001.dat") == b"0 Brick 2 x 4 replaced"
@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import subprocess
+
+LIBRARY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "addons", "io_scene_render_ldraw", "ldrawlibrary")
+
+# the pool is loaded as a package that is not ldrawlibrary, as the add-on loads it in Blender
+HOST = """
+import os
+import sys
+import json
+import importlib.util
+
+def load(name, path, package=None):
+    spec = importlib.util.spec_from_file_location(name, path, submodule_search_locations=package)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+if __name__ == "__main__":
+    library, model, part = sys.argv[1:]
+    load("host_library", os.path.join(library, "__init__.py"), [library])
+    parse_pool = load("host_library.parse_pool", os.path.join(library, "parse_pool.py"))
+
+    path = list(sys.path)
+    pool = parse_pool.ParsePool()
+    pool.max_workers = 1
+    sources = {"3001.dat": ("path", part)}
+    tokenized = pool.tokenize_closure("model.ldr", ("path", model),
+                                      lambda reference, key: (reference, sources[reference]))
+    print(json.dumps({
+        "tokenized": tokenized,
+        "references": pool.take("model.ldr")[2],
+        "part_lines": len(pool.take("3001.dat")[0]),
+        "path_unchanged": sys.path == path,
+        "imported": "ldrawlibrary" in sys.modules,
+    }))
+"""
+
+
+def test_workers_import_the_pool_without_changing_the_host_path(tmp_path):
+    (tmp_path / "host.py").write_text(HOST)
+    (tmp_path / "model.ldr").write_text("0 Model\n1 4 0 0 0 1 0 0 0 1 0 0 0 1 3001.dat\n")
+    (tmp_path / "3001.dat").write_text("0 Brick 2 x 4\n4 16 40 24 20 -40 24 20 -40 24 -20 40 24 -20\n")
+
+    output = subprocess.run([sys.executable, str(tmp_path / "host.py"), LIBRARY,
+                             str(tmp_path / "model.ldr"), str(tmp_path / "3001.dat")],
+                            cwd=tmp_path, capture_output=True, text=True, timeout=60, check=True).stdout
+    result = json.loads(output.splitlines()[-1])
+
+    assert result == {
+        "tokenized": True,
+        "references": ["3001.dat"],
+        "part_lines": 2,
+        "path_unchanged": True,
+        "imported": False,
+    }
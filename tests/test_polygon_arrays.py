@@ -0,0 +1,28 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ldrawlibrary.polygon_arrays import PolygonArrays
+
+
+def test_bad_coordinate_fails_only_its_line():
+    polygons = PolygonArrays()
+    polygons.add("3 16 0 0 0 1 0 0 0 1 0".split())
+    with pytest.raises(ValueError):
+        polygons.add("3 16 0 0 0 1 0 0 0 1 x".split())
+    polygons.add("2 24 0 0 0 1 1 1".split())
+
+    polygons.finalize()
+    assert len(polygons) == 2
+    assert polygons.line_types.tolist() == [3, 2]
+    assert polygons.offsets.tolist() == [0, 3, 5]
+    assert polygons.polygon_vertices(1).tolist() == [[0.0, 0.0, 0.0], [1.0, 1.0, 1.0]]
+
+
+def test_missing_coordinate_is_not_added():
+    polygons = PolygonArrays()
+    with pytest.raises(ValueError):
+        polygons.add("4 16 0 0 0 1 0 0 1 1 0".split())
+    polygons.finalize()
+    assert len(polygons) == 0
+    assert polygons.vertices.shape == (0, 3)
@@ -0,0 +1,99 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ldrawlibrary.vertex_weld import weld_faces
+
+
+def faces_arrays(faces):
+    vertices = np.array([vertex for face in faces for vertex in face], dtype=np.float64)
+    offsets = np.concatenate(([0], np.cumsum([len(face) for face in faces]))).astype(np.int32)
+    return vertices, offsets
+
+
+def welded_face(welded, index):
+    loops = welded.loops[welded.offsets[index]:welded.offsets[index + 1]]
+    return [tuple(welded.vertices[loop]) for loop in loops]
+
+
+# a triangle from point, with two corners far enough from the points of the other triangles to stay apart
+def corner_triangle(point, index):
+    return [point, (10.0 * index + 5.0, 0.0, 0.0), (10.0 * index + 5.0, 1.0, 0.0)]
+
+
+def test_points_within_distance_are_welded():
+    vertices, offsets = faces_arrays([corner_triangle((0.0, 0.0, 0.0), 0),
+                                      corner_triangle((0.0, 0.0, 0.0499), 1)])
+    welded = weld_faces(vertices, offsets, 0.05)
+    assert len(welded.vertices) == 5
+    assert welded_face(welded, 1)[0] == (0.0, 0.0, 0.0)
+
+
+def test_points_beyond_distance_are_not_welded():
+    vertices, offsets = faces_arrays([corner_triangle((0.0, 0.0, 0.0), 0),
+                                      corner_triangle((0.0, 0.0, 0.0501), 1)])
+    welded = weld_faces(vertices, offsets, 0.05)
+    assert len(welded.vertices) == 6
+
+
+def test_points_in_one_cell_beyond_distance_are_not_welded():
+    # the diagonal of a cell is longer than the distance
+    vertices, offsets = faces_arrays([corner_triangle((0.001, 0.001, 0.001), 0),
+                                      corner_triangle((0.049, 0.049, 0.049), 1)])
+    welded = weld_faces(vertices, offsets, 0.05)
+    assert len(welded.vertices) == 6
+
+
+def test_points_either_side_of_a_cell_boundary_are_welded():
+    vertices, offsets = faces_arrays([corner_triangle((0.0999999, 0.0, 0.0), 0),
+                                      corner_triangle((0.1000001, 0.0, 0.0), 1)])
+    welded = weld_faces(vertices, offsets, 0.05)
+    assert len(welded.vertices) == 5
+
+
+def test_chain_of_points_does_not_weld_through():
+    points = [(0.04 * i, 0.0, 0.0) for i in range(10)]
+    vertices, offsets = faces_arrays([corner_triangle(point, i) for i, point in enumerate(points)])
+    welded = weld_faces(vertices, offsets, 0.05)
+
+    assert len(welded) == 10
+    # each point is welded to its earlier neighbour, unless that neighbour was welded itself
+    assert [welded_face(welded, i)[0][0] for i in range(10)] == pytest.approx(
+        [0.0, 0.0, 0.08, 0.08, 0.16, 0.16, 0.24, 0.24, 0.32, 0.32])
+    for i, point in enumerate(points):
+        assert np.linalg.norm(np.subtract(welded_face(welded, i)[0], point)) <= 0.05
+
+
+def test_reversed_face_is_kept():
+    face = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)]
+    vertices, offsets = faces_arrays([face, face[::-1]])
+    welded = weld_faces(vertices, offsets, 0.05)
+    assert welded.faces.tolist() == [0, 1]
+    assert len(welded.vertices) == 3
+    assert welded_face(welded, 1) == face[::-1]
+
+
+def test_face_repeated_in_the_same_winding_is_dropped():
+    face = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0), (0.0, 1.0, 0.0)]
+    vertices, offsets = faces_arrays([face, face[2:] + face[:2], face[::-1]])
+    welded = weld_faces(vertices, offsets, 0.05)
+    assert welded.faces.tolist() == [0, 2]
+
+
+def test_collapsed_face_is_dropped():
+    vertices, offsets = faces_arrays([[(0.0, 0.0, 0.0), (0.01, 0.0, 0.0), (0.0, 1.0, 0.0)],
+                                      [(2.0, 0.0, 0.0), (3.0, 0.0, 0.0), (2.0, 1.0, 0.0)]])
+    welded = weld_faces(vertices, offsets, 0.05)
+    assert welded.faces.tolist() == [1]
+    assert len(welded.vertices) == 3
+
+
+@pytest.mark.parametrize("distance", [None, 0])
+def test_no_distance_keeps_every_vertex(distance):
+    face = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)]
+    vertices, offsets = faces_arrays([face, face, face[::-1]])
+    welded = weld_faces(vertices, offsets, distance)
+    assert len(welded) == 3
+    assert len(welded.vertices) == 9
+    assert welded.loops.tolist() == list(range(9))
+    assert welded.offsets.tolist() == [0, 3, 6, 9]
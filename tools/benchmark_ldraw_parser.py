@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+LPub3D Blender LDraw Addon GPLv3 license.
+
+LPub3D Benchmark LDraw MM Parser
+
+Measures the lines per second of the LDraw MM importer LDrawFile line classifier
+over the official library parts and primitives, comparing the chain of __line_*
+predicates in ldraw_file.py at an earlier git revision with the dispatch on line
+type and meta keyword in the working tree.
+
+The earlier ldraw_file.py is read with git show and loaded next to the current
+modules of the io_scene_import_ldraw_mm package, so both classifiers use the same
+FileSystem, LDrawNode and helpers.
+
+Each classifier loads and parses the files once to warm its own file cache, so the
+timed passes only classify and handle lines, and subfile references are resolved
+from the cache.
+
+To Run:
+- Execute Command from the repository root, git must be on the path
+    - <Blender Path>/blender --background --python tools/benchmark_ldraw_parser.py -- <optional arguments>
+- Optional Arguments:
+    -ld, --ldraw_directory  LDraw library directory, default is the located LDraw directory
+    -b,  --before           Git revision of the previous classifier, default is the parent of the commit
+                            that introduced the __meta_handlers dispatch table
+    -r,  --repeat           Number of timed passes per classifier, the best pass is reported
+    -l,  --limit            Only benchmark the first <limit> library files
+"""
+
+import os
+import sys
+import time
+import types
+import subprocess
+
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+
+sys.path.append(str(os.path.join(parent_dir, "setup")))
+sys.path.append(str(os.path.join(parent_dir, "addons")))
+
+from addon_setup.arguments import BlenderArgumentParser
+from io_scene_import_ldraw_mm.filesystem import FileSystem
+from io_scene_import_ldraw_mm.ldraw_file import LDrawFile
+
+LDRAW_FILE_PATH = "addons/io_scene_import_ldraw_mm/ldraw_file.py"
+
+
+def library_filenames(ldraw_directory):
+    """Relative lowercase names of the official parts and primitives"""
+
+    filenames = []
+    for folder in ("parts", "p"):
+        root = os.path.join(ldraw_directory, folder)
+        for dirpath, dirnames, files in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name.lower() != "textures"]
+            for name in files:
+                if name.lower().endswith(".dat"):
+                    filenames.append(os.path.relpath(os.path.join(dirpath, name), root).lower())
+    return sorted(filenames)
+
+
+def git(*args):
+    return subprocess.run(["git", "-C", str(parent_dir), *args], capture_output=True, text=True, check=True).stdout
+
+
+def before_revision():
+    """The last revision that classified lines with the predicate chain, the parent of the first
+    commit that added __meta_handlers to ldraw_file.py"""
+
+    commits = git("log", "--reverse", "--format=%H", "-S", "__meta_handlers", "--", LDRAW_FILE_PATH).split()
+    assert commits, "No commit introduced the dispatch table, use --before to name the previous revision."
+    return f"{commits[0]}~1"
+
+
+def load_ldraw_file_module(revision):
+    """The ldraw_file module of the MM importer at revision, importing the current modules of its package"""
+
+    path = LDRAW_FILE_PATH
+    source = git("show", f"{revision}:{path}")
+
+    module_name = "io_scene_import_ldraw_mm.ldraw_file_before"
+    module = types.ModuleType(module_name)
+    module.__package__ = "io_scene_import_ldraw_mm"
+    module.__file__ = os.path.join(parent_dir, path)
+    sys.modules[module_name] = module
+    exec(compile(source, f"{revision}:{path}", "exec"), module.__dict__)
+    return module
+
+
+def parse(ldraw_file):
+    """The classifier of the module that ldraw_file belongs to"""
+
+    ldraw_file._LDrawFile__parse_file()
+
+
+def load_files(ldraw_file_class, filenames):
+    """(filename, lines) of each file that ldraw_file_class loads, parsing them once to warm its file cache"""
+
+    files = []
+    for filename in filenames:
+        ldraw_file = ldraw_file_class.get_file(filename)
+        if ldraw_file is not None:
+            # plain lists, so that every timed pass splits the lines again
+            files.append((ldraw_file.filename, list(ldraw_file.lines)))
+    return files
+
+
+def time_classifier(ldraw_file_class, files, repeat):
+    """Returns the best lines per second of the ldraw_file_class classifier over repeat passes"""
+
+    line_count = sum(len(lines) for filename, lines in files)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for filename, lines in files:
+            ldraw_file = ldraw_file_class(filename)
+            ldraw_file.lines = lines
+            parse(ldraw_file)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return line_count / best if best else 0.0
+
+
+def benchmark_ldraw_parser():
+    arg_parser = BlenderArgumentParser(
+        description='Benchmark the LDraw MM parser line classifier.')
+    arg_parser.add_argument("-ld", "--ldraw_directory", default=FileSystem.ldraw_path,
+                            help="LDraw library directory")
+    arg_parser.add_argument("-b", "--before", default=None,
+                            help="Git revision of the previous classifier")
+    arg_parser.add_argument("-r", "--repeat", type=int, default=3,
+                            help="Number of timed passes per classifier")
+    arg_parser.add_argument("-l", "--limit", type=int, default=0,
+                            help="Only benchmark the first <limit> library files")
+    options = arg_parser.parse_args()
+
+    assert options.ldraw_directory, "LDraw library path not specified."
+
+    FileSystem.ldraw_path = options.ldraw_directory
+    FileSystem.reset_caches()
+    FileSystem.build_search_paths()
+    LDrawFile.reset_caches()
+    LDrawFile.validate_caches()
+
+    filenames = library_filenames(options.ldraw_directory)
+    if options.limit > 0:
+        filenames = filenames[:options.limit]
+
+    if options.before is None:
+        options.before = before_revision()
+    before_module = load_ldraw_file_module(options.before)
+    before_module.LDrawFile.reset_caches()
+    before_module.LDrawFile.validate_caches()
+
+    print(f"INFO: Loading {len(filenames)} library files...", flush=True)
+    files = load_files(LDrawFile, filenames)
+    before_files = load_files(before_module.LDrawFile, filenames)
+    assert [filename for filename, lines in before_files] == [filename for filename, lines in files], \
+        f"{options.before} loads different library files"
+    line_count = sum(len(lines) for filename, lines in files)
+    print(f"INFO: Benchmarking {len(files)} files, {line_count} lines, best of {options.repeat}", flush=True)
+
+    before = time_classifier(before_module.LDrawFile, before_files, options.repeat)
+    print(f"BEFORE: predicate chain at {options.before} {before:,.0f} lines/second", flush=True)
+
+    after = time_classifier(LDrawFile, files, options.repeat)
+    print(f"AFTER:  dispatch table in the working tree {after:,.0f} lines/second", flush=True)
+
+    if before:
+        print(f"SPEEDUP: {after / before:.2f}x", flush=True)
+
+
+if __name__ == "__main__":
+    benchmark_ldraw_parser()
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+LPub3D Blender LDraw Addon GPLv3 license.
+
+LPub3D Benchmark Mesh Builder
+
+Measures the time to build a Blender mesh from baked LDraw faces, comparing the previous
+paths of the importers with the shared mesh_builder foreach_set path:
+
+- from_pydata   the LDraw importer, a tuple per point and mesh.from_pydata
+- bmesh         the LDraw MM importer, bm.verts.new and bm.faces.new per face, then bm.to_mesh
+- foreach_set   mesh_builder.build_mesh, one foreach_set per attribute from flat arrays
+
+The faces are a grid of triangles and quads that each have their own vertices, as the
+importers bake them, with a material index per face. The meshes built by each path are
+compared, so the benchmark fails if the foreach_set mesh is not identical.
+
+The importers weld the baked faces before they build a mesh, so the same faces are also
+built with their coincident corners shared:
+
+- bmesh remove_doubles  the previous paths, the bmesh mesh above, then bmesh.ops.remove_doubles
+- from_pydata welded    vertex_weld.weld_faces, then mesh.from_pydata with shared vertex indices
+- foreach_set welded    vertex_weld.weld_faces, then mesh_builder.build_mesh with its loops
+
+The foreach_set welded mesh must be identical to the from_pydata welded mesh, and have the
+same vertices as the remove_doubles mesh, whose vertex order differs.
+
+To Run:
+- Execute Command from the repository root
+    - <Blender Path>/blender --background --python tools/benchmark_mesh_builder.py -- <optional arguments>
+- Optional Arguments:
+    -f, --faces     Number of faces per mesh
+    -m, --materials Number of material indices the faces cycle through
+    -r, --repeat    Number of timed builds per path, the best build is reported
+    -w, --weld      Weld distance of the welded builds
+"""
+
+import os
+import sys
+import time
+
+from pathlib import Path
+
+import bpy
+import bmesh
+import numpy as np
+
+parent_dir = Path(__file__).parent.parent
+
+sys.path.append(str(os.path.join(parent_dir, "setup")))
+sys.path.append(str(os.path.join(parent_dir, "addons")))
+
+from addon_setup.arguments import BlenderArgumentParser
+from io_scene_render_ldraw.ldrawlibrary import mesh_builder
+from io_scene_render_ldraw.ldrawlibrary.vertex_weld import weld_faces
+
+
+def grid_faces(face_count):
+    """Alternating triangles and quads on a grid, every face with its own vertices, neighbours share corners"""
+
+    faces = []
+    width = max(1, int(face_count ** 0.5))
+    for i in range(face_count):
+        x, y = float(i % width), float(i // width)
+        if i % 2:
+            faces.append(((x, y, 0.0), (x + 1.0, y, 0.0), (x + 1.0, y + 1.0, 0.0), (x, y + 1.0, 0.0)))
+        else:
+            faces.append(((x, y, 0.0), (x + 1.0, y, 0.0), (x, y + 1.0, 0.0)))
+    return faces
+
+
+def new_mesh(name, material_count):
+    mesh = bpy.data.meshes.new(name)
+    for _ in range(material_count):
+        mesh.materials.append(None)
+    return mesh
+
+
+def build_with_from_pydata(faces, material_indices, material_count):
+    mesh = new_mesh("benchmark_from_pydata", material_count)
+    points = [point for face in faces for point in face]
+    indices = []
+    start = 0
+    for face in faces:
+        indices.append(list(range(start, start + len(face))))
+        start += len(face)
+    mesh.from_pydata(points, [], indices)
+    for polygon, material_index in zip(mesh.polygons, material_indices):
+        polygon.material_index = material_index
+    mesh.validate()
+    mesh.update()
+    return mesh
+
+
+def build_with_bmesh(faces, material_indices, material_count):
+    mesh = new_mesh("benchmark_bmesh", material_count)
+    bm = bmesh.new()
+    for face, material_index in zip(faces, material_indices):
+        verts = [bm.verts.new(vertex) for vertex in face]
+        bm_face = bm.faces.new(verts)
+        bm_face.material_index = material_index
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.validate()
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def build_with_foreach_set(faces, material_indices, material_count):
+    mesh = new_mesh("benchmark_foreach_set", material_count)
+    vertices, offsets = mesh_builder.face_arrays(faces)
+    mesh_builder.build_mesh(mesh, vertices, offsets, material_indices=material_indices,
+                            loop_totals=bpy.app.version < (4, 0))
+    mesh.update(calc_edges=True)
+    mesh.validate()
+    return mesh
+
+
+def build_with_bmesh_remove_doubles(faces, material_indices, material_count, distance):
+    mesh = new_mesh("benchmark_bmesh_remove_doubles", material_count)
+    bm = bmesh.new()
+    for face, material_index in zip(faces, material_indices):
+        verts = [bm.verts.new(vertex) for vertex in face]
+        bm_face = bm.faces.new(verts)
+        bm_face.material_index = material_index
+    bmesh.ops.remove_doubles(bm, verts=bm.verts[:], dist=distance)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.validate()
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def build_with_from_pydata_welded(faces, material_indices, material_count, distance):
+    mesh = new_mesh("benchmark_from_pydata_welded", material_count)
+    vertices, offsets = mesh_builder.face_arrays(faces)
+    welded = weld_faces(vertices, offsets, distance)
+    loops = welded.loops.tolist()
+    welded_offsets = welded.offsets.tolist()
+    indices = [loops[welded_offsets[i]:welded_offsets[i + 1]] for i in range(len(welded))]
+    mesh.from_pydata(welded.vertices.tolist(), [], indices)
+    for polygon, face in zip(mesh.polygons, welded.faces.tolist()):
+        polygon.material_index = material_indices[face]
+    mesh.validate()
+    mesh.update()
+    return mesh
+
+
+def build_with_foreach_set_welded(faces, material_indices, material_count, distance):
+    mesh = new_mesh("benchmark_foreach_set_welded", material_count)
+    vertices, offsets = mesh_builder.face_arrays(faces)
+    welded = weld_faces(vertices, offsets, distance)
+    mesh_builder.build_mesh(mesh, welded.vertices, welded.offsets,
+                            material_indices=np.asarray(material_indices, dtype=np.int32)[welded.faces],
+                            loop_totals=bpy.app.version < (4, 0),
+                            loops=welded.loops)
+    mesh.update(calc_edges=True)
+    mesh.validate()
+    return mesh
+
+
+def mesh_arrays(mesh):
+    """The vertices, polygon vertex indices and material indices of a mesh"""
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", vertices)
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loops)
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    material_indices = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", material_indices)
+    return vertices, loops, loop_starts, material_indices
+
+
+def time_build(build, faces, material_indices, material_count, repeat):
+    """Returns the best seconds over repeat builds, and the last mesh built"""
+
+    best = None
+    mesh = None
+    for _ in range(repeat):
+        if mesh is not None:
+            bpy.data.meshes.remove(mesh)
+        start = time.perf_counter()
+        mesh = build(faces, material_indices, material_count)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, mesh
+
+
+def benchmark_mesh_builder():
+    arg_parser = BlenderArgumentParser(
+        description='Benchmark building LDraw meshes with foreach_set.')
+    arg_parser.add_argument("-f", "--faces", type=int, default=200000,
+                            help="Number of faces per mesh")
+    arg_parser.add_argument("-m", "--materials", type=int, default=4,
+                            help="Number of material indices the faces cycle through")
+    arg_parser.add_argument("-r", "--repeat", type=int, default=3,
+                            help="Number of timed builds per path")
+    arg_parser.add_argument("-w", "--weld", type=float, default=0.01,
+                            help="Weld distance of the welded builds")
+    options = arg_parser.parse_args()
+
+    faces = grid_faces(options.faces)
+    material_indices = [i % options.materials for i in range(len(faces))]
+    vertex_count = sum(len(face) for face in faces)
+    print(f"INFO: Benchmarking {len(faces)} faces, {vertex_count} vertices, best of {options.repeat}", flush=True)
+
+    results = {}
+    for name, build in (("from_pydata", build_with_from_pydata),
+                        ("bmesh", build_with_bmesh),
+                        ("foreach_set", build_with_foreach_set)):
+        elapsed, mesh = time_build(build, faces, material_indices, options.materials, options.repeat)
+        results[name] = (elapsed, mesh_arrays(mesh))
+        bpy.data.meshes.remove(mesh)
+        print(f"{name:<12} {elapsed:.3f} seconds, {len(faces) / elapsed:,.0f} faces/second", flush=True)
+
+    expected = results["from_pydata"][1]
+    for name in ("bmesh", "foreach_set"):
+        for expected_array, array in zip(expected, results[name][1]):
+            assert np.array_equal(expected_array, array), f"{name} mesh differs from the from_pydata mesh"
+    print("INFO: Meshes are identical", flush=True)
+
+    after = results["foreach_set"][0]
+    for name in ("from_pydata", "bmesh"):
+        print(f"SPEEDUP: foreach_set over {name} {results[name][0] / after:.2f}x", flush=True)
+
+    welded_results = {}
+    for name, build in (("bmesh remove_doubles", build_with_bmesh_remove_doubles),
+                        ("from_pydata welded", build_with_from_pydata_welded),
+                        ("foreach_set welded", build_with_foreach_set_welded)):
+        elapsed, mesh = time_build(lambda *args: build(*args, options.weld),
+                                   faces, material_indices, options.materials, options.repeat)
+        welded_results[name] = (elapsed, mesh_arrays(mesh))
+        bpy.data.meshes.remove(mesh)
+        print(f"{name:<20} {elapsed:.3f} seconds, {len(faces) / elapsed:,.0f} faces/second", flush=True)
+
+    expected = welded_results["from_pydata welded"][1]
+    for expected_array, array in zip(expected, welded_results["foreach_set welded"][1]):
+        assert np.array_equal(expected_array, array), "foreach_set welded mesh differs from the from_pydata welded mesh"
+    remove_doubles = welded_results["bmesh remove_doubles"][1]
+    assert len(remove_doubles[2]) == len(expected[2]), "remove_doubles mesh has a different number of faces"
+    assert np.array_equal(np.unique(remove_doubles[0].reshape(-1, 3), axis=0), np.unique(expected[0].reshape(-1, 3), axis=0)), \
+        "remove_doubles mesh has different vertices"
+    print(f"INFO: Welded meshes are identical, {len(expected[0]) // 3} vertices", flush=True)
+
+    after = welded_results["foreach_set welded"][0]
+    for name in ("bmesh remove_doubles", "from_pydata welded"):
+        print(f"SPEEDUP: foreach_set welded over {name} {welded_results[name][0] / after:.2f}x", flush=True)
+
+
+if __name__ == "__main__":
+    benchmark_mesh_builder()